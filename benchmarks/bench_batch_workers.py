@@ -0,0 +1,41 @@
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.synthetic import write_telco_csv
+from src.model.predict_model import make_batch_predictions
+
+# Skalowanie predykcji wsadowych z liczbą procesów (make_batch_predictions --workers N).
+# Uruchomienie: python -m benchmarks.bench_batch_workers --rows 2000000
+
+def main(rows: int, chunksize: int, workers_list: list):
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, "telco.csv")
+        start = time.perf_counter()
+        write_telco_csv(input_file, rows)
+        print(f"Wygenerowano {rows} wierszy ({os.path.getsize(input_file) / 1e6:.0f} MB) "
+              f"w {time.perf_counter() - start:.1f} s")
+
+        baseline = None
+        for workers in workers_list:
+            output_file = os.path.join(tmp, f"predictions_{workers}.csv")
+            start = time.perf_counter()
+            make_batch_predictions(input_file, output_file, chunksize=chunksize, workers=workers)
+            elapsed = time.perf_counter() - start
+
+            throughput = rows / elapsed
+            baseline = baseline or throughput
+            print(f"workers={workers:>2}: {elapsed:7.1f} s  {throughput:12,.0f} wierszy/s  "
+                  f"({throughput / baseline:.2f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    main(args.rows, args.chunksize, args.workers)
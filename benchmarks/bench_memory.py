@@ -0,0 +1,75 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from benchmarks.synthetic import write_telco_data
+
+# Szczytowe zużycie pamięci budowy cech, treningu i batch scoringu: tryb zwykły (one-hot float64 + pd.concat)
+# vs compact (jedna macierz float32). Każdy scenariusz w świeżym procesie:
+#   tracemalloc - szczyt alokacji Pythona/NumPy/pandas w samym mierzonym kroku,
+#   max RSS - cały proces (z wczytaniem danych i pamięcią XGBoost, której tracemalloc nie widzi).
+# Uruchomienie: python -m benchmarks.bench_memory --rows 500000
+
+SCENARIOS = {
+    "featurize": ["legacy", "compact"],
+    "train": ["legacy", "compact"],
+    "batch": ["encode_frame"],
+}
+
+PROBE = """
+import json, resource, tracemalloc
+import pandas as pd
+from src.data.load_data import load_data
+from src.data.preprocess import preprocess_data
+from src.features.build_features import build_features, load_encoder
+
+df_raw = load_data({path!r})
+encoder = load_encoder()  # tylko odczyt - benchmark nie nadpisuje artefaktów w models/
+scenario, mode = {scenario!r}, {mode!r}
+if scenario == "batch":
+    from src.model.predict_model import score_chunk
+    from src.serving.inference import ChurnModel
+    model = ChurnModel()
+
+tracemalloc.start()
+if scenario == "batch":
+    score_chunk(model, df_raw)
+else:
+    features = build_features(preprocess_data(df_raw), train_mode=False, encoder=encoder, compact=mode == "compact")
+    if scenario == "train":
+        import xgboost as xgb
+        xgb.XGBClassifier(n_estimators=20, max_depth=6).fit(features.drop(columns=["churn"]), features["churn"])
+_, peak = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+print(json.dumps({{
+    "traced_peak_mb": peak / 2**20,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+def run_scenario(path: str, scenario: str, mode: str) -> dict:
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    code = PROBE.format(path=path, scenario=scenario, mode=mode)
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", code], env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(rows: int, scenarios: list):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "telco.parquet")
+        write_telco_data(path, rows)
+        print(f"Wiersze: {rows}")
+        for scenario in scenarios:
+            for mode in SCENARIOS[scenario]:
+                r = run_scenario(path, scenario, mode)
+                print(f"{scenario:>10} {mode:>12}: szczyt alokacji={r['traced_peak_mb']:8.1f} MB  "
+                      f"max RSS={r['max_rss_mb']:8.1f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    args = parser.parse_args()
+    main(args.rows, args.scenarios)
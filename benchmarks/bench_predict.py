@@ -0,0 +1,71 @@
+import random
+import time
+import numpy as np
+import pandas as pd
+from src.data.preprocess import preprocess_data
+from src.features.build_features import build_features
+from src.features.encoding_plan import parse_number
+from src.serving.inference import ChurnModel
+
+# Benchmark pojedynczej predykcji: stara ścieżka (pandas) vs skompilowany plan kodowania.
+# Uruchomienie: python -m benchmarks.bench_predict
+
+def pandas_predict_proba(model: ChurnModel, data: dict) -> float:
+    #Dawna ścieżka ChurnModel.predict: DataFrame -> preprocess -> build_features -> predict_proba
+    df_clean = preprocess_data(pd.DataFrame([data]))
+    df_features = build_features(df_clean, train_mode=False, encoder=model.encoder)
+    if 'churn' in df_features.columns:
+        df_features = df_features.drop(columns=['churn'])
+    return model.model.predict_proba(df_features)[0][1]
+
+def random_customer(model: ChurnModel, rng: random.Random) -> dict:
+    data = {col: rng.choice(values) for col, values in model.plan.categories.items()}
+    data["seniorcitizen"] = rng.randint(0, 1)
+    data["tenure"] = rng.randint(0, 72)
+    data["monthlycharges"] = round(rng.uniform(18.0, 120.0), 2)
+    data["totalcharges"] = rng.choice([str(round(data["tenure"] * data["monthlycharges"], 2)), " ", "brak"])
+    # Od czasu do czasu kategoria spoza treningu (encoder ją ignoruje)
+    if rng.random() < 0.1:
+        data["paymentmethod"] = "Crypto"
+    return data
+
+def time_calls(fn, payloads, repeats: int) -> np.ndarray:
+    timings = []
+    for _ in range(repeats):
+        for data in payloads:
+            start = time.perf_counter()
+            fn(data)
+            timings.append(time.perf_counter() - start)
+    return np.array(timings) * 1e6  # mikrosekundy
+
+def main(n_customers: int = 200, repeats: int = 5):
+    # Bez walidacji: porównanie z dawną ścieżką, która przyjmowała nieznane kategorie
+    model = ChurnModel(validate=False)
+    rng = random.Random(42)
+    payloads = [random_customer(model, rng) for _ in range(n_customers)]
+
+    # 1. Poprawność: szybka ścieżka musi dawać identyczne prawdopodobieństwa
+    for data in payloads:
+        expected = pandas_predict_proba(model, data)
+        got = model.predict(data)["churn_probability"]
+        if np.float32(expected) != np.float32(got):
+            raise AssertionError(f"Różne wyniki dla {data}: {expected} != {got}")
+    print(f"Zgodność wyników: OK ({n_customers} klientów)")
+
+    # 2. Opóźnienie na request
+    legacy = time_calls(lambda d: pandas_predict_proba(model, d), payloads, repeats)
+    fast = time_calls(model.predict, payloads, repeats)
+    # Koszt walidacji schematu na tych samych (poprawnych) klientach
+    validated_model = ChurnModel()
+    valid = [data for data in payloads
+             if data["paymentmethod"] in model.plan.categories["paymentmethod"] and parse_number(data["totalcharges"])[1]]
+    validated = time_calls(validated_model.predict, valid, repeats)
+
+    for name, t in [("pandas", legacy), ("plan", fast), ("plan+wal", validated)]:
+        print(f"{name:>8}: p50={np.percentile(t, 50):9.1f} us  p99={np.percentile(t, 99):9.1f} us  mean={t.mean():9.1f} us")
+    print(f"Przyspieszenie (p50): {np.percentile(legacy, 50) / np.percentile(fast, 50):.1f}x")
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+
+# Zimny start API: czas importu src.app.main (wczytanie modelu), pierwsza predykcja i pamięć (max RSS)
+# w osobnym, świeżym procesie dla każdego trybu.
+# Uruchomienie: python -m benchmarks.bench_startup --repeats 3
+
+HEAVY_MODULES = ["gradio", "pandas", "sklearn", "matplotlib"]
+
+MODES = {
+    # API + Gradio (domyślnie)
+    "full": {"env": {"CHURN_UI": "1"}, "block": []},
+    # Samo API w obrazie z pełnym requirements.txt (xgboost sam importuje pandas/sklearn, jeśli są)
+    "api": {"env": {"CHURN_UI": "0"}, "block": []},
+    # Samo API jak w obrazie z requirements-serving.txt (pandas/sklearn/gradio niezainstalowane)
+    "serving": {"env": {"CHURN_UI": "0"}, "block": HEAVY_MODULES},
+    # Spłaszczony model (CHURN_SCORER=flat): bez xgboost i scipy
+    "flat": {"env": {"CHURN_UI": "0", "CHURN_SCORER": "flat"}, "block": HEAVY_MODULES + ["xgboost", "scipy"]},
+}
+
+PROBE = """
+import json, resource, sys, time
+for name in {block!r}:
+    sys.modules[name] = None  # import zakończy się ImportError, jak przy braku pakietu
+start = time.perf_counter()
+import src.app.main as main
+imported = time.perf_counter()
+main.model_service.predict({customer!r})
+predicted = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "first_predict_ms": (predicted - imported) * 1e3,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [m for m in {heavy!r} + ["xgboost"] if sys.modules.get(m) is not None],
+}}))
+"""
+
+# Pełny, poprawny rekord w kształcie CustomerData - walidacja schematu odrzuciłaby rekord z brakującymi polami
+CUSTOMER = {
+    "gender": "Male", "seniorcitizen": 0, "partner": "No", "dependents": "No", "tenure": 12,
+    "phoneservice": "Yes", "multiplelines": "No", "internetservice": "DSL", "onlinesecurity": "No",
+    "onlinebackup": "No", "deviceprotection": "No", "techsupport": "No", "streamingtv": "No",
+    "streamingmovies": "No", "contract": "Month-to-month", "paperlessbilling": "Yes",
+    "paymentmethod": "Electronic check", "monthlycharges": 83.3, "totalcharges": "1000",
+}
+
+def run_mode(mode: dict) -> dict:
+    env = {**os.environ, "PYTHONPATH": os.getcwd(), "CHURN_MODEL_WATCH_S": "0", **mode["env"]}
+    code = PROBE.format(block=mode["block"], heavy=HEAVY_MODULES, customer=CUSTOMER)
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", code], env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(modes: list, repeats: int):
+    for name in modes:
+        runs = [run_mode(MODES[name]) for _ in range(repeats)]
+        import_s = np.median([r["import_s"] for r in runs])
+        first_ms = np.median([r["first_predict_ms"] for r in runs])
+        rss = np.median([r["max_rss_mb"] for r in runs])
+        loaded = ", ".join(runs[-1]["loaded"]) or "-"
+        print(f"{name:>8}: import={import_s:6.2f} s  pierwsza predykcja={first_ms:7.2f} ms  "
+              f"max RSS={rss:7.1f} MB  ciężkie moduły: {loaded}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    main(args.modes, args.repeats)
@@ -0,0 +1,70 @@
+import argparse
+import time
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+from benchmarks.synthetic import generate_telco_frame
+from src.data.preprocess import preprocess_data
+from src.features.build_features import build_features, load_encoder
+from src.model.tune_model import build_tuning_data
+
+# Narzut na trial tuningu: XGBClassifier.fit na pandas (konwersja + szkicowanie kwantyli w każdym trialu)
+# vs xgb.train na QuantileDMatrix zbudowanych raz.
+# Uruchomienie: python -m benchmarks.bench_tuning --rows 200000
+
+TRIAL_PARAMS = {
+    "max_depth": 6, "learning_rate": 0.1, "subsample": 0.8, "colsample_bytree": 0.8,
+    "min_child_weight": 1, "gamma": 0.0, "scale_pos_weight": 3.0,
+    "objective": "binary:logistic", "eval_metric": "logloss", "tree_method": "hist",
+}
+
+def make_feature_splits(rows: int):
+    # Istniejący encoder (tylko odczyt) - benchmark nie nadpisuje artefaktów w models/
+    df = build_features(preprocess_data(generate_telco_frame(rows)), train_mode=False, encoder=load_encoder())
+    X, y = df.drop(columns=["churn"]), df["churn"]
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    return train_test_split(X_train, y_train, test_size=0.2, random_state=42, stratify=y_train)
+
+def trial_sklearn(X_train, y_train, X_valid, y_valid, n_estimators: int, nthread: int):
+    model = xgb.XGBClassifier(**TRIAL_PARAMS, n_estimators=n_estimators, n_jobs=nthread)
+    model.fit(X_train, y_train, eval_set=[(X_valid, y_valid)], verbose=False)
+
+def trial_prebuilt(dtrain, dvalid, n_estimators: int, nthread: int):
+    params = {**TRIAL_PARAMS, "max_bin": dtrain.max_bin, "nthread": nthread}
+    xgb.train(params, dtrain, num_boost_round=n_estimators, evals=[(dvalid, "valid")], verbose_eval=False)
+
+def timed(fn, repeats: int) -> np.ndarray:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return np.array(timings)
+
+def main(rows: int, n_estimators: int, repeats: int, nthread: int):
+    X_train, X_valid, y_train, y_valid = make_feature_splits(rows)
+    print(f"Trening: {X_train.shape}, walidacja: {X_valid.shape}, drzew na trial: {n_estimators}")
+
+    build = timed(lambda: build_tuning_data(X_train, y_train, X_valid, y_valid), repeats)
+    dtrain, dvalid = build_tuning_data(X_train, y_train, X_valid, y_valid)
+
+    sklearn_trials = timed(lambda: trial_sklearn(X_train, y_train, X_valid, y_valid, n_estimators, nthread), repeats)
+    prebuilt_trials = timed(lambda: trial_prebuilt(dtrain, dvalid, n_estimators, nthread), repeats)
+
+    print(f"Budowa QuantileDMatrix (raz na tuning): {build.mean():.3f} s")
+    print(f"Trial XGBClassifier.fit (pandas):      {sklearn_trials.mean():.3f} s")
+    print(f"Trial xgb.train (gotowe dane):         {prebuilt_trials.mean():.3f} s")
+    saved = sklearn_trials.mean() - prebuilt_trials.mean()
+    print(f"Oszczędność na trial: {saved:.3f} s ({saved / sklearn_trials.mean():.0%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--nthread", type=int, default=-1)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    main(args.rows, args.trees, args.repeats, args.nthread)
@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import numpy as np
+
+# Test obciążeniowy API: odtwarza payloady klientów z JSONL na /predict (albo paczkami na /predict_batch).
+# Zamknięta pętla (--concurrency stałych klientów) albo otwarta (--rate requestów/s, przyjścia Poissona).
+# Bez --url aplikacja działa w tym samym procesie (httpx.ASGITransport) - klient zabiera jej część CPU,
+# więc do wymiarowania replik lepiej: uvicorn src.app.main:app ... i --url http://localhost:7860
+# Uruchomienie:
+#   python -m benchmarks.load_test --requests 2000 --concurrency 16
+#   python -m benchmarks.load_test --url http://localhost:7860 --rate 200 --duration 30
+#   python -m benchmarks.load_test --generate 5000 --payloads data/synthetic/customers.jsonl
+
+PAYLOADS_PATH = os.path.join("benchmarks", "data", "customers.jsonl")
+
+def load_payloads(path: str) -> list:
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def generate_payloads(path: str, n_rows: int, seed: int = 42):
+    #Payloady w formacie CustomerData (małe litery, totalcharges jako tekst) z generatora syntetycznego
+    from benchmarks.synthetic import generate_telco_frame
+    df = generate_telco_frame(n_rows, seed=seed).drop(columns=["customerID", "Churn"])
+    df.columns = df.columns.str.lower()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        for record in df.to_dict(orient="records"):
+            record = {k: (v.item() if hasattr(v, "item") else v) for k, v in record.items()}
+            f.write(json.dumps(record) + "\n")
+
+def make_requests(payloads: list, batch_size: int):
+    #Nieskończony strumień (endpoint, body) - payloady w kółko, pojedynczo albo paczkami
+    i = 0
+    while True:
+        if batch_size > 1:
+            body = [payloads[(i + k) % len(payloads)] for k in range(batch_size)]
+            yield "/predict_batch", body
+            i += batch_size
+        else:
+            yield "/predict", payloads[i % len(payloads)]
+            i += 1
+
+class Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+
+    async def send(self, client, endpoint: str, body, started: float):
+        """
+        Jeden request. Opóźnienie liczone od `started` - w otwartej pętli to zaplanowany moment
+        przyjścia, więc czas czekania na wolne połączenie też się wlicza.
+        """
+        try:
+            response = await client.post(endpoint, json=body)
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        self.latencies.append(time.perf_counter() - started)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+async def closed_loop(client, requests, recorder: Recorder, concurrency: int, total: int, deadline: float):
+    # `concurrency` klientów, każdy wysyła następny request po odpowiedzi na poprzedni
+    sent = 0
+
+    async def worker():
+        nonlocal sent
+        while sent < total and time.perf_counter() < deadline:
+            sent += 1
+            endpoint, body = next(requests)
+            await recorder.send(client, endpoint, body, time.perf_counter())
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+async def open_loop(client, requests, recorder: Recorder, rate: float, total: int, deadline: float, seed: int):
+    # Przyjścia Poissona ze średnią `rate`/s, niezależnie od tego, jak szybko serwer odpowiada
+    rng = random.Random(seed)
+    tasks = []
+    next_arrival = time.perf_counter()
+    while len(tasks) < total and next_arrival < deadline:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        endpoint, body = next(requests)
+        tasks.append(asyncio.create_task(recorder.send(client, endpoint, body, next_arrival)))
+        next_arrival += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+
+def summarize(recorder: Recorder, elapsed: float, rows_per_request: int) -> dict:
+    latencies = np.array(recorder.latencies) * 1e3
+    total = len(latencies)
+    ok = recorder.statuses.get(200, 0)
+    summary = {
+        "requests": total,
+        "ok": ok,
+        "error_rate": (total - ok) / total if total else 0.0,
+        "statuses": {str(k): v for k, v in recorder.statuses.items()},
+        "elapsed_s": elapsed,
+        "throughput_rps": ok / elapsed if elapsed else 0.0,
+        "throughput_rows_per_s": ok * rows_per_request / elapsed if elapsed else 0.0,
+    }
+    if total:
+        summary.update({
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "max_ms": float(latencies.max()),
+        })
+    return summary
+
+async def run_load(payloads: list, url: str = None, concurrency: int = 16, rate: float = None,
+                   total: int = 1000, duration: float = None, batch_size: int = 1,
+                   warmup: int = 20, seed: int = 42) -> dict:
+    import httpx
+
+    requests = make_requests(payloads, batch_size)
+    limits = httpx.Limits(max_connections=max(concurrency, 1) * 4)
+
+    async def drive(client) -> dict:
+        # Rozgrzewka (pierwsze requesty, start puli/batchera) poza pomiarem
+        for _ in range(warmup):
+            endpoint, body = next(requests)
+            await client.post(endpoint, json=body)
+
+        recorder = Recorder()
+        start = time.perf_counter()
+        deadline = start + duration if duration else float("inf")
+        if rate:
+            await open_loop(client, requests, recorder, rate, total, deadline, seed)
+        else:
+            await closed_loop(client, requests, recorder, concurrency, total, deadline)
+        return summarize(recorder, time.perf_counter() - start, batch_size)
+
+    if url:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+            return await drive(client)
+
+    import src.app.main as api
+    async with api.app.router.lifespan_context(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://churn", timeout=30.0) as client:
+            return await drive(client)
+
+def print_summary(summary: dict):
+    print(f"Requesty: {summary['requests']} (OK: {summary['ok']}, błędy: {summary['error_rate']:.2%}) "
+          f"statusy: {summary['statuses']}")
+    print(f"Przepustowość: {summary['throughput_rps']:.1f} req/s ({summary['throughput_rows_per_s']:.1f} klientów/s) "
+          f"w {summary['elapsed_s']:.1f} s")
+    if summary["requests"]:
+        print(f"Opóźnienie: p50={summary['p50_ms']:.2f} ms  p95={summary['p95_ms']:.2f} ms  "
+              f"p99={summary['p99_ms']:.2f} ms  max={summary['max_ms']:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Test obciążeniowy API predykcji")
+    parser.add_argument("--payloads", default=PAYLOADS_PATH, help="JSONL, jeden klient (CustomerData) na linię")
+    parser.add_argument("--generate", type=int, default=None, help="Wygeneruj N syntetycznych payloadów i zakończ")
+    parser.add_argument("--url", default=None, help="Adres działającego serwera; bez niego - API w tym procesie")
+    parser.add_argument("--concurrency", type=int, default=16, help="Klienci w zamkniętej pętli")
+    parser.add_argument("--rate", type=float, default=None, help="Otwarta pętla: średnio requestów/s (Poisson)")
+    parser.add_argument("--requests", type=int, default=None, help="Liczba requestów (domyślnie 1000, z --duration bez limitu)")
+    parser.add_argument("--duration", type=float, default=None, help="Limit czasu testu w sekundach")
+    parser.add_argument("--batch-size", type=int, default=1, help=">1 -> /predict_batch z tyloma klientami")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--output", default=None, help="Zapisz podsumowanie jako JSON")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_payloads(args.payloads, args.generate)
+        print(f"Zapisano {args.generate} payloadów do {args.payloads}")
+        return
+
+    import logging
+    logging.disable(logging.INFO)
+
+    summary = asyncio.run(run_load(
+        load_payloads(args.payloads), url=args.url, concurrency=args.concurrency, rate=args.rate,
+        total=args.requests or (float("inf") if args.duration else 1000), duration=args.duration,
+        batch_size=args.batch_size, warmup=args.warmup,
+    ))
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
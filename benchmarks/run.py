@@ -0,0 +1,271 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+# Zestaw benchmarków ścieżek krytycznych (predykcja, batch, cechy, próg, tuning) z wynikiem w JSON
+# i porównaniem z zapisanym baseline.
+# Uruchomienie:
+#   python -m benchmarks.run                              # wszystkie zestawy, porównanie z benchmarks/baseline.json
+#   python -m benchmarks.run --suites predict threshold --rows 1000000
+#   python -m benchmarks.run --save-baseline              # nowy baseline (na tej samej maszynie!)
+
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+DEFAULT_TOLERANCE = 0.15  # zmiana gorsza o > 15% = regresja
+
+# Liczba wierszy dla zestawów wierszowych (--rows nadpisuje wszystkie)
+DEFAULT_ROWS = {"batch": 200_000, "featurize": 200_000, "threshold": 1_000_000, "tuning": 100_000, "evaluate": 25_000}
+
+def metric(value: float, unit: str, better: str) -> dict:
+    return {"value": float(value), "unit": unit, "better": better}
+
+def median_seconds(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def suite_predict(rows: int, repeats: int) -> dict:
+    #Opóźnienie pojedynczej predykcji (ChurnModel.predict), koszt walidacji schematu, przepustowość predict_batch i explain
+    from benchmarks.bench_predict import random_customer, time_calls
+    from src.features.encoding_plan import parse_number
+    from src.serving.inference import ChurnModel
+
+    # Płatności spoza treningu i TotalCharges "brak" w payloadach - pomiar bez walidacji,
+    # porównywalny z wcześniejszymi raportami
+    model = ChurnModel(validate=False)
+    rng = random.Random(42)
+    payloads = [random_customer(model, rng) for _ in range(200)]
+    latency = time_calls(model.predict, payloads, repeats)
+    # Z walidacją tylko poprawne payloady: znane kategorie i TotalCharges jako liczba albo pusty tekst
+    valid = [data for data in payloads
+             if data["paymentmethod"] in model.plan.categories["paymentmethod"] and parse_number(data["totalcharges"])[1]]
+    validated = time_calls(ChurnModel().predict, valid, repeats)
+
+    batch = payloads[:64]
+    batch_s = median_seconds(lambda: model.predict_batch(batch), repeats * 10)
+    explain_batch = valid[:64]
+    explain_s = median_seconds(lambda: model.explain(explain_batch), repeats)
+    return {
+        "predict_p50_us": metric(np.percentile(latency, 50), "us", "lower"),
+        "predict_p99_us": metric(np.percentile(latency, 99), "us", "lower"),
+        "predict_validated_p50_us": metric(np.percentile(validated, 50), "us", "lower"),
+        "predict_batch64_rows_per_s": metric(len(batch) / batch_s, "rows/s", "higher"),
+        "explain_batch64_rows_per_s": metric(len(explain_batch) / explain_s, "rows/s", "higher"),
+    }
+
+def suite_batch(rows: int, repeats: int) -> dict:
+    #Przepustowość make_batch_predictions (plik -> plik, jeden proces)
+    from benchmarks.synthetic import write_telco_data
+    from src.model.predict_model import make_batch_predictions
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("csv", "parquet"):
+            input_file = os.path.join(tmp, f"telco.{fmt}")
+            write_telco_data(input_file, rows)
+            output_file = os.path.join(tmp, f"predictions.{fmt}")
+            seconds = median_seconds(lambda: make_batch_predictions(input_file, output_file), repeats)
+            results[f"batch_{fmt}_rows_per_s"] = metric(rows / seconds, "rows/s", "higher")
+    return results
+
+def suite_featurize(rows: int, repeats: int) -> dict:
+    #Przepustowość preprocess_data, build_features (pandas + sklearn), EncodingPlan.encode_frame i walidacji schematu
+    from benchmarks.synthetic import generate_telco_frame
+    from src.data.preprocess import preprocess_data
+    from src.data.schema import DataSchema
+    from src.features.build_features import build_features, load_encoder
+    from src.features.encoding_plan import EncodingPlan
+
+    df_raw = generate_telco_frame(rows)
+    df_clean = preprocess_data(df_raw)
+    encoder = load_encoder()  # tylko odczyt - benchmark nie nadpisuje artefaktów w models/
+    features = build_features(df_clean, train_mode=False, encoder=encoder)
+    plan = EncodingPlan.from_encoder(encoder, [c for c in features.columns if c != "churn"])
+
+    preprocess_s = median_seconds(lambda: preprocess_data(df_raw), repeats)
+    build_s = median_seconds(lambda: build_features(df_clean, train_mode=False, encoder=encoder), repeats)
+    encode_s = median_seconds(lambda: plan.encode_frame(df_clean), repeats)
+    # Bez schema.json sprawdzane są wszystkie kolumny z nieskończonym zakresem - koszt ten sam
+    schema = DataSchema({}, plan)
+    matrix = plan.encode_frame(df_clean)
+    validate_s = median_seconds(lambda: schema.check(matrix), repeats)
+    return {
+        "preprocess_rows_per_s": metric(rows / preprocess_s, "rows/s", "higher"),
+        "build_features_rows_per_s": metric(rows / build_s, "rows/s", "higher"),
+        "encode_frame_rows_per_s": metric(rows / encode_s, "rows/s", "higher"),
+        "validate_rows_per_s": metric(rows / validate_s, "rows/s", "higher"),
+    }
+
+def suite_threshold(rows: int, repeats: int) -> dict:
+    #Wybór progu F2: siatka z train_model (80 progów) i dokładne cięcia przy każdym wyniku
+    from src.model.threshold_search import best_threshold
+
+    rng = np.random.default_rng(42)
+    y_true = rng.integers(0, 2, rows)
+    y_score = rng.random(rows).astype(np.float32)
+    grid = np.arange(0.1, 0.9, 0.01)
+    return {
+        "threshold_grid_s": metric(median_seconds(lambda: best_threshold(y_true, y_score, thresholds=grid), repeats), "s", "lower"),
+        "threshold_exact_s": metric(median_seconds(lambda: best_threshold(y_true, y_score), repeats), "s", "lower"),
+    }
+
+def suite_tuning(rows: int, repeats: int) -> dict:
+    #Koszt jednego triala tuningu (xgb.train na gotowych QuantileDMatrix) i jednorazowej budowy danych
+    from benchmarks.bench_tuning import make_feature_splits, trial_prebuilt
+    from src.model.tune_model import build_tuning_data
+
+    X_train, X_valid, y_train, y_valid = make_feature_splits(rows)
+    build_s = median_seconds(lambda: build_tuning_data(X_train, y_train, X_valid, y_valid), repeats)
+    dtrain, dvalid = build_tuning_data(X_train, y_train, X_valid, y_valid)
+    trial_s = median_seconds(lambda: trial_prebuilt(dtrain, dvalid, n_estimators=100, nthread=-1), repeats)
+    return {
+        "tuning_data_build_s": metric(build_s, "s", "lower"),
+        "tuning_trial_100_trees_s": metric(trial_s, "s", "lower"),
+    }
+
+def suite_evaluate(rows: int, repeats: int) -> dict:
+    """
+    Pełna ewaluacja krzyżowa (evaluate_model: 5 foldów równolegle, próg, bootstrap, kalibracja) z parametrami treningu
+    vs jeden trening jak w train_model (XGBClassifier.fit na 80% danych). Cel: ewaluacja ~ czas jednego treningu
+    (evaluate_vs_one_fit ~ 1), osiągalny przy co najmniej tylu rdzeniach, ile foldów.
+    """
+    import xgboost as xgb
+    from sklearn.model_selection import train_test_split
+    from benchmarks.synthetic import generate_telco_frame
+    from src.data.preprocess import preprocess_data
+    from src.features.build_features import build_features, load_encoder
+    from src.model.evaluate_model import evaluate_model
+    from src.model.train_model import load_params
+
+    # Istniejący encoder (tylko odczyt) - benchmark nie nadpisuje artefaktów w models/
+    df = build_features(preprocess_data(generate_telco_frame(rows)), train_mode=False, encoder=load_encoder())
+    params = load_params()
+    X_train, _, y_train, _ = train_test_split(df.drop(columns=["churn"]), df["churn"], test_size=0.2,
+                                              random_state=42, stratify=df["churn"])
+    fit_s = median_seconds(lambda: xgb.XGBClassifier(**params).fit(X_train, y_train), repeats)
+    evaluate_s = median_seconds(lambda: evaluate_model(df, n_splits=5, params=params), repeats)
+    return {
+        "evaluate_one_fit_s": metric(fit_s, "s", "lower"),
+        "evaluate_5fold_s": metric(evaluate_s, "s", "lower"),
+        "evaluate_vs_one_fit": metric(evaluate_s / fit_s, "x", "lower"),
+    }
+
+SUITES = {
+    "predict": suite_predict,
+    "batch": suite_batch,
+    "featurize": suite_featurize,
+    "threshold": suite_threshold,
+    "tuning": suite_tuning,
+    "evaluate": suite_evaluate,
+}
+
+def environment() -> dict:
+    import xgboost
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "xgboost": xgboost.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def run_suites(suites: list, rows: int = None, repeats: int = 3) -> dict:
+    results = {}
+    for name in suites:
+        suite_rows = (rows or DEFAULT_ROWS[name]) if name in DEFAULT_ROWS else 0
+        start = time.perf_counter()
+        results[name] = {"rows": suite_rows, "metrics": SUITES[name](suite_rows, repeats)}
+        print(f"[{name}] {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return {"environment": environment(), "results": results}
+
+def compare(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Porównuje metryki z baseline. Zwraca wiersze (zestaw, metryka, baseline, teraz, zmiana, status),
+    gdzie zmiana > 0 oznacza poprawę niezależnie od kierunku metryki.
+    Zestawy liczone na innej liczbie wierszy niż baseline są pomijane.
+    """
+    rows = []
+    for suite, current in report["results"].items():
+        reference = baseline.get("results", {}).get(suite)
+        if reference is None or reference["rows"] != current["rows"]:
+            continue
+        for name, value in current["metrics"].items():
+            if name not in reference["metrics"]:
+                continue
+            before, now = reference["metrics"][name]["value"], value["value"]
+            ratio = now / before if value["better"] == "higher" else before / now
+            change = ratio - 1.0
+            status = "REGRESJA" if change < -tolerance else ("poprawa" if change > tolerance else "ok")
+            rows.append((suite, name, before, now, change, status))
+    return rows
+
+def print_report(report: dict, comparison: list):
+    compared = {(suite, name): row for suite, name, *row in comparison}
+    for suite, data in report["results"].items():
+        print(f"== {suite} (rows={data['rows']})")
+        for name, value in data["metrics"].items():
+            line = f"  {name:<28} {value['value']:>12.6g} {value['unit']:<7}"
+            if (suite, name) in compared:
+                before, _, change, status = compared[(suite, name)]
+                line += f"  baseline {before:>12.6g}  {change:+7.1%}  {status}"
+            print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarki ścieżek krytycznych")
+    parser.add_argument("--suites", nargs="+", default=list(SUITES), choices=list(SUITES))
+    parser.add_argument("--rows", type=int, default=None, help="Liczba wierszy dla wszystkich zestawów")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Plik JSON z wynikami (domyślnie benchmarks/results/)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true", help="Zapisz wyniki jako nowy baseline")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Kod wyjścia 1 przy regresji")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+
+    report = run_suites(args.suites, rows=args.rows, repeats=args.repeats)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    comparison = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r") as f:
+            comparison = compare(report, json.load(f), args.tolerance)
+
+    print_report(report, comparison)
+    print(f"Wyniki: {output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Zapisano baseline: {args.baseline}")
+
+    if args.fail_on_regression and any(row[-1] == "REGRESJA" for row in comparison):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+# Generator syntetycznych danych o schemacie Telco-Customer-Churn.csv (te same kolumny i kategorie).
+# Pozwala mierzyć wydajność na dowolnej liczbie wierszy bez prawdziwego zbioru.
+
+CATEGORIES = {
+    "gender": ["Female", "Male"],
+    "Partner": ["Yes", "No"],
+    "Dependents": ["Yes", "No"],
+    "PhoneService": ["Yes", "No"],
+    "MultipleLines": ["No", "Yes", "No phone service"],
+    "InternetService": ["DSL", "Fiber optic", "No"],
+    "OnlineSecurity": ["No", "Yes", "No internet service"],
+    "OnlineBackup": ["No", "Yes", "No internet service"],
+    "DeviceProtection": ["No", "Yes", "No internet service"],
+    "TechSupport": ["No", "Yes", "No internet service"],
+    "StreamingTV": ["No", "Yes", "No internet service"],
+    "StreamingMovies": ["No", "Yes", "No internet service"],
+    "Contract": ["Month-to-month", "One year", "Two year"],
+    "PaperlessBilling": ["Yes", "No"],
+    "PaymentMethod": ["Electronic check", "Mailed check", "Bank transfer (automatic)", "Credit card (automatic)"],
+}
+
+COLUMNS = [
+    "customerID", "gender", "SeniorCitizen", "Partner", "Dependents", "tenure", "PhoneService",
+    "MultipleLines", "InternetService", "OnlineSecurity", "OnlineBackup", "DeviceProtection",
+    "TechSupport", "StreamingTV", "StreamingMovies", "Contract", "PaperlessBilling", "PaymentMethod",
+    "MonthlyCharges", "TotalCharges", "Churn",
+]
+
+def generate_telco_frame(n_rows: int, seed: int = 42, start_id: int = 0) -> pd.DataFrame:
+    """
+    Losuje n_rows klientów. Churn zależy (logistycznie) od umowy, internetu i stażu,
+    żeby trening/tuning na tych danych zachowywał się podobnie jak na prawdziwych.
+    """
+    rng = np.random.default_rng(seed)
+    data = {"customerID": [f"{i:07d}-SYNT" for i in range(start_id, start_id + n_rows)]}
+
+    for col, values in CATEGORIES.items():
+        data[col] = rng.choice(values, n_rows)
+
+    data["SeniorCitizen"] = (rng.random(n_rows) < 0.16).astype(int)
+    tenure = rng.integers(0, 73, n_rows)
+    monthly = rng.uniform(18.25, 118.75, n_rows).round(2)
+    data["tenure"] = tenure
+    data["MonthlyCharges"] = monthly
+
+    # TotalCharges jak w oryginale: tekst, dla tenure == 0 pusty (" ")
+    total = np.char.mod("%.2f", tenure * monthly)
+    data["TotalCharges"] = np.where(tenure == 0, " ", total)
+
+    logit = (-1.0 + 1.2 * (data["Contract"] == "Month-to-month") + 0.8 * (data["InternetService"] == "Fiber optic")
+             - 0.04 * tenure + 0.5 * data["SeniorCitizen"])
+    churn = rng.random(n_rows) < 1.0 / (1.0 + np.exp(-logit))
+    data["Churn"] = np.where(churn, "Yes", "No")
+
+    return pd.DataFrame(data)[COLUMNS]
+
+def write_telco_data(path: str, n_rows: int, seed: int = 42, chunk_rows: int = 500_000) -> str:
+    """
+    Zapisuje plik porcjami (CSV / Parquet / Arrow - format po rozszerzeniu),
+    więc nawet dziesiątki milionów wierszy nie wymagają dużo RAM.
+    """
+    from src.data.save_data import ChunkWriter
+    with ChunkWriter(path) as writer:
+        part = 0
+        while writer.rows < n_rows or part == 0:
+            rows = min(chunk_rows, n_rows - writer.rows)
+            writer.write(generate_telco_frame(rows, seed=seed + part, start_id=writer.rows))
+            part += 1
+    return path
+
+def write_telco_csv(path: str, n_rows: int, seed: int = 42, chunk_rows: int = 500_000) -> str:
+    return write_telco_data(path, n_rows, seed=seed, chunk_rows=chunk_rows)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Syntetyczne dane Telco do benchmarków")
+    parser.add_argument("--rows", type=int, default=7043)
+    parser.add_argument("--output", default="data/synthetic/telco.csv", help=".csv, .parquet albo .arrow")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import os
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    write_telco_data(args.output, args.rows, seed=args.seed)
+    print(f"Zapisano {args.rows} wierszy do {args.output}")
@@ -1,39 +1,61 @@
-from src.data.load_data import load_data
-from src.data.preprocess import preprocess_data
-from src.features.build_features import build_features
+from src.features.feature_cache import load_features
 from src.model.train_model import train_model
+from src.model.evaluate_model import evaluate_model, save_report, log_to_mlflow, REPORT_PATH
+from src.model.incremental import train_incremental
 from src.model.tune_model import run_tuning
+from src.profiling import StageProfiler, profiling, stage
 from src.utils import get_logger
+import argparse
+import os
 import sys
+import time
 
 # Inicjalizacja loggera
 logger = get_logger("PIPELINE")
 
-def main():
+def main(data_path: str = 'data/raw/Telco-Customer-Churn.csv', use_cache: bool = True,
+         n_trials: int = 30, tuning_jobs: int = 1, tuning_storage: str = None, compact_features: bool = False,
+         incremental: str = None, evaluate_folds: int = 0, profiler: StageProfiler = None):
     try:
         logger.info("START: Uruchamiam Pipeline ML")
-        
-        # Wczytywanie Danych
-        data_path = 'data/raw/Telco-Customer-Churn.csv'
-        logger.info(f"Wczytywanie danych z {data_path}")
-        df = load_data(data_path)
-        
-        # Czyszczenie (Preprocessing)
-        logger.info("Preprocessing...")
-        df_clean = preprocess_data(df)
-        
-        # Inżynieria Cech (Feature Engineeiring)
-        logger.info("Budowanie cech i zapisywanie Encodera...")
-        df_features = build_features(df_clean, train_mode=True)
-        
-        # Tuning Hiperparametrów (Optuna)
-        logger.info("Optymalizacja Hyperparametrów (Optuna)...")
-        run_tuning()  #Ta funkcja zapisze plik 'models/best_params.json'
-        
-        # Trening Modelu 
-        logger.info("Trening finalnego modelu XGBoost")
-        trained_model = train_model(df_features, target_col='churn')
-        
+
+        # Z profilerem każdy etap (i etapy wewnątrz: load/preprocess/build, trials, fit, ...) jest mierzony
+        with profiling(profiler):
+            if incremental:
+                # Douczenie na nowej porcji (bez tuningu); przy dryfie / nowych kategoriach / spadku F2 - pełny trening
+                logger.info(f"Trening przyrostowy z {incremental}")
+                with stage("incremental"):
+                    result = train_incremental(incremental, history_path=data_path, compact=compact_features)
+                logger.info(f"SUKCES: Pipeline zakończony (tryb: {result['mode']}).")
+                return
+
+            # Wczytywanie Danych (CSV, Parquet lub Arrow IPC), Preprocessing i Inżynieria Cech.
+            # Jedna budowa macierzy dla tuningu i treningu; przy niezmienionych danych - z cache.
+            logger.info(f"Wczytywanie danych i budowanie cech z {data_path}")
+            with stage("features"):
+                df_features = load_features(data_path, use_cache=use_cache, compact=compact_features)
+
+            # Tuning Hiperparametrów (Optuna) na tej samej macierzy cech
+            logger.info("Optymalizacja Hyperparametrów (Optuna)...")
+            with stage("tuning"):
+                run_tuning(data_path, df=df_features, n_trials=n_trials, n_jobs=tuning_jobs,
+                           storage=tuning_storage)  #Ta funkcja zapisze plik 'models/best_params.json'
+
+            # Ewaluacja krzyżowa (opcjonalna): stabilny próg F2 z k foldów zamiast progu z jednego podziału 80/20
+            threshold = None
+            if evaluate_folds:
+                logger.info(f"Ewaluacja krzyżowa ({evaluate_folds} foldów)")
+                with stage("evaluate"):
+                    report = evaluate_model(df_features, n_splits=evaluate_folds)
+                    save_report(report, REPORT_PATH)
+                    log_to_mlflow(report, REPORT_PATH)
+                threshold = report["threshold"]["value"]
+
+            # Trening Modelu
+            logger.info("Trening finalnego modelu XGBoost")
+            with stage("train"):
+                trained_model = train_model(df_features, target_col='churn', threshold=threshold)
+
         logger.info("SUKCES: Pipeline zakończony! Model jest zoptymalizowany.")
 
     except Exception as e:
@@ -41,5 +63,51 @@ def main():
         logger.error(f"Szczegóły błędu: {e}")
         sys.exit(1)
 
+    finally:
+        if profiler is not None:
+            save_profile_report(profiler)
+
+def save_profile_report(profiler: StageProfiler):
+    #Raport JSON (także po błędzie - widać, na którym etapie) + metryki w runie MLflow tego treningu
+    report_path = os.path.join(profiler.output_dir, "report.json")
+    profiler.save(report_path)
+    try:
+        import mlflow
+        run = mlflow.last_active_run()
+        if run is not None:
+            profiler.log_to_mlflow(run.info.run_id, report_path)
+            logger.info(f"Metryki profilowania zapisane w runie MLflow {run.info.run_id}")
+    except Exception as e:
+        logger.warning(f"Nie udało się zapisać profilowania w MLflow: {e}")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pipeline treningowy Telco Churn")
+    parser.add_argument("--data", default='data/raw/Telco-Customer-Churn.csv', help="Plik .csv / .parquet / .arrow")
+    parser.add_argument("--no-cache", action="store_true", help="Zawsze buduj cechy od nowa")
+    parser.add_argument("--trials", type=int, default=30, help="Liczba triali Optuny")
+    parser.add_argument("--compact-features", action="store_true",
+                        help="Cechy jako jedna macierz float32 (mniej pamięci przy dużych zbiorach)")
+    parser.add_argument("--incremental", default=None, metavar="DELTA",
+                        help="Douczenie bieżącego modelu na nowej porcji danych (--data = dane poprzedniego treningu)")
+    parser.add_argument("--evaluate", type=int, nargs="?", const=5, default=0, metavar="FOLDS",
+                        help="Ewaluacja krzyżowa przed treningiem (domyślnie 5 foldów); jej próg trafia do modelu")
+    parser.add_argument("--tuning-jobs", type=int, default=1, help="Triale Optuny liczone równolegle")
+    parser.add_argument("--tuning-storage", default=None,
+                        help="Trwałe (wznawialne) study: sqlite:///models/optuna.db albo plik models/optuna.log")
+    parser.add_argument("--profile", action="store_true",
+                        help="Czas, CPU i szczyt RSS każdego etapu -> reports/profile/<czas>/report.json + MLflow")
+    parser.add_argument("--profile-cprofile", action="store_true", help="Z --profile: cProfile każdego etapu (.prof)")
+    parser.add_argument("--profile-sampling", action="store_true",
+                        help="Z --profile: próbkujący py-spy każdego etapu (.speedscope.json, wymaga py-spy)")
+    parser.add_argument("--profile-dir", default=None, help="Katalog raportu (domyślnie reports/profile/<czas>)")
+    args = parser.parse_args()
+
+    profiler = None
+    if args.profile:
+        profile_dir = args.profile_dir or os.path.join("reports", "profile", time.strftime("%Y%m%d-%H%M%S"))
+        profiler = StageProfiler(cprofile=args.profile_cprofile, sampling=args.profile_sampling,
+                                 output_dir=profile_dir)
+    main(args.data, use_cache=not args.no_cache, n_trials=args.trials,
+         tuning_jobs=args.tuning_jobs, tuning_storage=args.tuning_storage,
+         compact_features=args.compact_features, incremental=args.incremental,
+         evaluate_folds=args.evaluate, profiler=profiler)
\ No newline at end of file
@@ -0,0 +1,24 @@
+import argparse
+import os
+import sys
+
+# Uruchamiane jako skrypt (python scripts/run_prediction.py) - katalog projektu na ścieżce, żeby był widoczny src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.model.batch_job import run_batch_job
+from src.model.predict_model import DEFAULT_CHUNKSIZE
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wznawialny batch scoring dużych plików (shardy + manifest SQLite)")
+    parser.add_argument("--input", required=True, help="Plik .csv / .parquet / .arrow")
+    parser.add_argument("--output-dir", required=True, help="Katalog na shardy wyników i manifest.sqlite")
+    parser.add_argument("--output", default=None, help="Opcjonalnie: scal shardy w jeden plik .csv / .parquet / .arrow")
+    parser.add_argument("--shard-rows", type=int, default=DEFAULT_CHUNKSIZE, help="Wierszy na shard (CSV)")
+    parser.add_argument("--workers", type=int, default=1, help="Liczba procesów liczących")
+    parser.add_argument("--no-validate", action="store_true", help="Bez walidacji schematu (wszystkie wiersze liczone)")
+    parser.add_argument("--explain", action="store_true", help="Dodaj wkłady pól (SHAP) i główne powody ryzyka")
+    parser.add_argument("--restart", action="store_true", help="Usuń poprzedni stan zadania i licz od zera")
+    args = parser.parse_args()
+
+    run_batch_job(args.input, args.output_dir, shard_rows=args.shard_rows, workers=args.workers,
+                  validate=not args.no_validate, explain=args.explain, restart=args.restart, output_file=args.output)
@@ -1,11 +1,91 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hmac
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Header
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-import gradio as gr
+from typing import List
+import os
+from src.data.schema import InvalidRecords
 from src.serving.inference import ChurnModel
+from src.serving.batcher import MicroBatcher
+from src.serving.executor import ScoringExecutor, ServiceSaturated
+from src.serving.registry import BundleWatcher
+from src.serving.metrics import REGISTRY, REQUESTS, REQUEST_SECONDS, BATCH_SIZE
 
-# Inicjalizacja Aplikacji i Modelu
-app = FastAPI(title="Telco Churn Prediction API", version="1.0.0")
-model_service = ChurnModel()
+# Cache wyników dla powtarzających się profili: CHURN_CACHE_SIZE (0 = wyłączony), CHURN_CACHE_TTL_S (0 = bez TTL)
+# CHURN_SCORER=flat - predykcja na spłaszczonym modelu (model.flat, samo NumPy) zamiast boostera XGBoost
+# CHURN_VALIDATE=0 - bez walidacji schematu (rekordy z nieznanymi kategoriami liczone jak dawniej)
+model_service = ChurnModel(
+    cache_size=int(os.getenv("CHURN_CACHE_SIZE", "0")),
+    cache_ttl_s=float(os.getenv("CHURN_CACHE_TTL_S", "0")) or None,
+    scorer=os.getenv("CHURN_SCORER", "xgboost"),
+    validate=os.getenv("CHURN_VALIDATE", "1") == "1",
+)
+
+# Dedykowana pula do liczenia predykcji (nie dzieli wątków z Gradio)
+# CHURN_EXECUTOR=thread|process, CHURN_WORKERS, CHURN_MAX_QUEUE, CHURN_XGB_NTHREAD
+scoring = ScoringExecutor(
+    model_service,
+    mode=os.getenv("CHURN_EXECUTOR", "thread"),
+    workers=int(os.getenv("CHURN_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("CHURN_MAX_QUEUE", "64")),
+    nthread=int(os.getenv("CHURN_XGB_NTHREAD", "0")) or None,
+)
+
+# Opcjonalny micro-batching dla /predict (konfiguracja przez zmienne środowiskowe)
+# CHURN_MICROBATCH=1, CHURN_BATCH_MAX_SIZE=64, CHURN_BATCH_MAX_WAIT_MS=5
+batcher = None
+if os.getenv("CHURN_MICROBATCH", "0") == "1":
+    batcher = MicroBatcher(
+        lambda records: scoring.submit("predict_each", records),
+        max_batch_size=int(os.getenv("CHURN_BATCH_MAX_SIZE", "64")),
+        max_wait_ms=float(os.getenv("CHURN_BATCH_MAX_WAIT_MS", "5")),
+        max_queue=int(os.getenv("CHURN_BATCH_MAX_QUEUE", "1024")),
+    )
+
+# Podmiana modelu bez restartu: obserwacja models/bundles/CURRENT co CHURN_MODEL_WATCH_S sekund (0 = wyłączona)
+# i/lub POST /admin/reload - tylko z ustawionym CHURN_ADMIN_TOKEN (wymagany nagłówek X-Admin-Token), bez niego 404
+watch_interval = float(os.getenv("CHURN_MODEL_WATCH_S", "0"))
+admin_token = os.getenv("CHURN_ADMIN_TOKEN")
+
+# Metryki liczone przy odczycie /metrics
+REGISTRY.callback("churn_model_info", "Serwowana wersja modelu (wartość zawsze 1)",
+                  lambda: {(model_service.version, model_service.threshold): 1},
+                  labelnames=("model_version", "threshold"))
+REGISTRY.callback("churn_scoring_inflight", "Zadania w puli predykcji (liczone i czekające)",
+                  lambda: {(): scoring.inflight})
+if batcher is not None:
+    REGISTRY.callback("churn_microbatch_queued", "Wiersze czekające w kolejce micro-batchera",
+                      lambda: {(): batcher.queued})
+if model_service.cache is not None:
+    # W trybie procesowym każdy worker ma własny cache - tu widać tylko liczniki procesu głównego
+    REGISTRY.callback("churn_cache_lookups_total", "Odczyty cache predykcji wg wyniku",
+                      lambda: {("hit",): model_service.cache.hits, ("miss",): model_service.cache.misses},
+                      kind="counter", labelnames=("result",))
+    REGISTRY.callback("churn_cache_entries", "Wpisy w cache predykcji",
+                      lambda: {(): model_service.cache.stats()["size"]})
+
+def observe_request(endpoint: str, status: int, start: float):
+    REQUESTS.inc(endpoint, status)
+    REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    watcher = None
+    if watch_interval > 0:
+        watcher = BundleWatcher(scoring.reload, interval=watch_interval,
+                                served_version=lambda: model_service.version).start()
+    yield
+    if watcher is not None:
+        watcher.stop()
+    if batcher is not None:
+        await batcher.stop()
+    scoring.shutdown()
+
+# Inicjalizacja Aplikacji
+app = FastAPI(title="Telco Churn Prediction API", version="1.0.0", lifespan=lifespan)
 
 # Definicja Danych Wejściowych (Pydantic)
 # Używamy małych liter, żeby pasowało do preprocessingu
@@ -34,84 +114,91 @@ class CustomerData(BaseModel):
 
 @app.get("/")
 def health_check():
-    return {"status": "ok", "threshold": model_service.threshold}
+    status = {"status": "ok", "threshold": model_service.threshold, "model_version": model_service.version}
+    if model_service.cache is not None and scoring.mode == "thread":
+        # W trybie procesowym każdy worker ma własny cache i własne liczniki
+        status["cache"] = model_service.cache.stats()
+    return status
 
 @app.post("/predict")
-def predict_churn_api(data: CustomerData):
+async def predict_churn_api(data: CustomerData):
+    start, status = time.perf_counter(), 200
     try:
-        return model_service.predict(data.dict())
+        if batcher is not None:
+            return await batcher.submit(data.dict())
+        return await scoring.submit("predict", data.dict())
+    except InvalidRecords as e:
+        status = 422
+        raise HTTPException(status_code=422, detail={"errors": e.errors[0]})
+    except ServiceSaturated as e:
+        status = 503
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
+        status = 500
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        observe_request("/predict", status, start)
 
-# GRADIO UI
-# Funkcja wrapper dla Gradio (przyjmuje argumenty pozycyjne)
-def gradio_predict(gender, seniorcitizen, partner, dependents, tenure, phoneservice, 
-                   multiplelines, internetservice, onlinesecurity, onlinebackup, 
-                   deviceprotection, techsupport, streamingtv, streamingmovies, 
-                   contract, paperlessbilling, paymentmethod, monthlycharges, totalcharges):
-    
-    safe_gender = "Female" if gender == "Other" else gender
-    # Budujemy słownik z danych z formularza
-    data_dict = {
-        "gender": safe_gender,
-        "seniorcitizen": int(seniorcitizen),
-        "partner": partner,
-        "dependents": dependents,
-        "tenure": int(tenure),
-        "phoneservice": phoneservice,
-        "multiplelines": multiplelines,
-        "internetservice": internetservice,
-        "onlinesecurity": onlinesecurity,
-        "onlinebackup": onlinebackup,
-        "deviceprotection": deviceprotection,
-        "techsupport": techsupport,
-        "streamingtv": streamingtv,
-        "streamingmovies": streamingmovies,
-        "contract": contract,
-        "paperlessbilling": paperlessbilling,
-        "paymentmethod": paymentmethod,
-        "monthlycharges": float(monthlycharges),
-        "totalcharges": str(totalcharges)
-    }
-    
-    result = model_service.predict(data_dict)
-    
-    # Formatowanie wyniku dla użytkownika
-    emoji = "🚨" if result['churn_prediction'] == 1 else "✅"
-    message = f"{emoji} Wynik: {'ODEJDZIE' if result['churn_prediction'] == 1 else 'ZOSTANIE'}"
-    details = f"Prawdopodobieństwo: {result['churn_probability']:.2%}\nTwój próg decyzji: {result['threshold_used']:.2f}"
-    
-    return message, details
-
-# Definicja Interfejsu
-demo = gr.Interface(
-    fn=gradio_predict,
-    inputs=[
-        gr.Dropdown(["Female", "Male", "Other"], label="Gender", value="Female"),
-        gr.Radio(["0", "1"], label="Senior Citizen"),
-        gr.Radio(["Yes", "No"], label="Partner"),
-        gr.Radio(["Yes", "No"], label="Dependents"),
-        gr.Slider(0, 72, label="Tenure (Miesiące)"),
-        gr.Radio(["Yes", "No"], label="Phone Service"),
-        gr.Radio(["No phone service", "No", "Yes"], label="Multiple Lines"),
-        gr.Radio(["DSL", "Fiber optic", "No"], label="Internet Service"),
-        gr.Radio(["No internet service", "No", "Yes"], label="Online Security"),
-        gr.Radio(["No internet service", "No", "Yes"], label="Online Backup"),
-        gr.Radio(["No internet service", "No", "Yes"], label="Device Protection"),
-        gr.Radio(["No internet service", "No", "Yes"], label="Tech Support"),
-        gr.Radio(["No internet service", "No", "Yes"], label="Streaming TV"),
-        gr.Radio(["No internet service", "No", "Yes"], label="Streaming Movies"),
-        gr.Dropdown(["Month-to-month", "One year", "Two year"], label="Contract"),
-        gr.Radio(["Yes", "No"], label="Paperless Billing"),
-        gr.Dropdown(["Electronic check", "Mailed check", "Bank transfer (automatic)", "Credit card (automatic)"], label="Payment Method"),
-        gr.Number(label="Monthly Charges"),
-        gr.Number(label="Total Charges")
-    ],
-    outputs=[gr.Text(label="Decyzja"), gr.Text(label="Szczegóły")],
-    title="Telco Churn Predictor",
-    description="Wprowadź dane klienta, aby sprawdzić ryzyko odejścia.",
-    flagging_mode="never"
-)
+@app.post("/predict_batch")
+async def predict_batch_api(customers: List[CustomerData]):
+    # Wyniki w tej samej kolejności co lista wejściowa
+    start, status = time.perf_counter(), 200
+    BATCH_SIZE.observe(len(customers), "predict_batch")
+    try:
+        return await scoring.submit("predict_batch", [c.dict() for c in customers])
+    except InvalidRecords as e:
+        # Indeksy odrzuconych klientów na liście wejściowej
+        status = 422
+        raise HTTPException(status_code=422, detail={"errors": e.errors})
+    except ServiceSaturated as e:
+        status = 503
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        status = 500
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        observe_request("/predict_batch", status, start)
+
+@app.post("/explain")
+async def explain_api(customers: List[CustomerData]):
+    # Predykcje + wkłady pól klienta (SHAP, log-odds) i główne powody ryzyka; jeden przebieg pred_contribs na listę
+    start, status = time.perf_counter(), 200
+    BATCH_SIZE.observe(len(customers), "explain")
+    try:
+        return await scoring.submit("explain", [c.dict() for c in customers])
+    except InvalidRecords as e:
+        status = 422
+        raise HTTPException(status_code=422, detail={"errors": e.errors})
+    except ServiceSaturated as e:
+        status = 503
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        status = 500
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        observe_request("/explain", status, start)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_api():
+    # Format tekstowy Prometheusa; czasy etapów modelu (churn_stage_seconds) pochodzą z procesu API,
+    # czyli z trybu CHURN_EXECUTOR=thread
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/admin/reload")
+async def reload_model_api(x_admin_token: str = Header(default=None)):
+    # Ładowanie i rozgrzewka nowej paczki w osobnym wątku - pętla zdarzeń dalej obsługuje requesty
+    # Bez skonfigurowanego tokenu endpoint jest wyłączony - nikt z zewnątrz nie wymusi ładowania paczki
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest((x_admin_token or "").encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Brak uprawnień")
+    try:
+        reloaded = await asyncio.to_thread(scoring.reload)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Nie udało się przeładować modelu: {e}")
+    return {"reloaded": reloaded, "model_version": model_service.version, "threshold": model_service.threshold}
 
-# Montujemy Gradio w FastAPI pod ścieżką /ui
-app = gr.mount_gradio_app(app, demo, path="/ui")
\ No newline at end of file
+# GRADIO UI (opcjonalny): CHURN_UI=0 -> samo API, bez importu gradio przy starcie serwera
+if os.getenv("CHURN_UI", "1") == "1":
+    from src.app.ui import mount_ui
+    app = mount_ui(app, model_service, path="/ui")
@@ -0,0 +1,78 @@
+import functools
+import gradio as gr
+
+# Interfejs Gradio - osobny moduł, importowany przez API tylko gdy UI jest włączone (CHURN_UI=1)
+
+# Funkcja wrapper dla Gradio (przyjmuje argumenty pozycyjne)
+def gradio_predict(predict_fn, gender, seniorcitizen, partner, dependents, tenure, phoneservice, 
+                   multiplelines, internetservice, onlinesecurity, onlinebackup, 
+                   deviceprotection, techsupport, streamingtv, streamingmovies, 
+                   contract, paperlessbilling, paymentmethod, monthlycharges, totalcharges):
+    
+    safe_gender = "Female" if gender == "Other" else gender
+    # Budujemy słownik z danych z formularza
+    data_dict = {
+        "gender": safe_gender,
+        "seniorcitizen": int(seniorcitizen),
+        "partner": partner,
+        "dependents": dependents,
+        "tenure": int(tenure),
+        "phoneservice": phoneservice,
+        "multiplelines": multiplelines,
+        "internetservice": internetservice,
+        "onlinesecurity": onlinesecurity,
+        "onlinebackup": onlinebackup,
+        "deviceprotection": deviceprotection,
+        "techsupport": techsupport,
+        "streamingtv": streamingtv,
+        "streamingmovies": streamingmovies,
+        "contract": contract,
+        "paperlessbilling": paperlessbilling,
+        "paymentmethod": paymentmethod,
+        "monthlycharges": float(monthlycharges),
+        "totalcharges": str(totalcharges)
+    }
+    
+    result = predict_fn(data_dict)
+    
+    # Formatowanie wyniku dla użytkownika
+    emoji = "🚨" if result['churn_prediction'] == 1 else "✅"
+    message = f"{emoji} Wynik: {'ODEJDZIE' if result['churn_prediction'] == 1 else 'ZOSTANIE'}"
+    details = f"Prawdopodobieństwo: {result['churn_probability']:.2%}\nTwój próg decyzji: {result['threshold_used']:.2f}"
+    
+    return message, details
+
+def build_demo(model_service) -> gr.Interface:
+    #Definicja Interfejsu
+    return gr.Interface(
+        fn=functools.partial(gradio_predict, model_service.predict),
+        inputs=[
+            gr.Dropdown(["Female", "Male", "Other"], label="Gender", value="Female"),
+            gr.Radio(["0", "1"], label="Senior Citizen"),
+            gr.Radio(["Yes", "No"], label="Partner"),
+            gr.Radio(["Yes", "No"], label="Dependents"),
+            gr.Slider(0, 72, label="Tenure (Miesiące)"),
+            gr.Radio(["Yes", "No"], label="Phone Service"),
+            gr.Radio(["No phone service", "No", "Yes"], label="Multiple Lines"),
+            gr.Radio(["DSL", "Fiber optic", "No"], label="Internet Service"),
+            gr.Radio(["No internet service", "No", "Yes"], label="Online Security"),
+            gr.Radio(["No internet service", "No", "Yes"], label="Online Backup"),
+            gr.Radio(["No internet service", "No", "Yes"], label="Device Protection"),
+            gr.Radio(["No internet service", "No", "Yes"], label="Tech Support"),
+            gr.Radio(["No internet service", "No", "Yes"], label="Streaming TV"),
+            gr.Radio(["No internet service", "No", "Yes"], label="Streaming Movies"),
+            gr.Dropdown(["Month-to-month", "One year", "Two year"], label="Contract"),
+            gr.Radio(["Yes", "No"], label="Paperless Billing"),
+            gr.Dropdown(["Electronic check", "Mailed check", "Bank transfer (automatic)", "Credit card (automatic)"], label="Payment Method"),
+            gr.Number(label="Monthly Charges"),
+            gr.Number(label="Total Charges")
+        ],
+        outputs=[gr.Text(label="Decyzja"), gr.Text(label="Szczegóły")],
+        title="Telco Churn Predictor",
+        description="Wprowadź dane klienta, aby sprawdzić ryzyko odejścia.",
+        flagging_mode="never"
+    )
+
+def mount_ui(app, model_service, path: str = "/ui"):
+    # Montujemy Gradio w FastAPI pod ścieżką /ui
+    return gr.mount_gradio_app(app, build_demo(model_service), path=path)
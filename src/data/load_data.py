@@ -1,19 +1,156 @@
 import pandas as pd
+import io
 import os
 from src.utils import get_logger
 
 logger = get_logger("LOAD_DATA")
 
-def load_data(file_path: str) -> pd.DataFrame:
-    #Wczytuje dane z CSV z obsługą błędów
+# Obsługiwane formaty (po rozszerzeniu pliku). Parquet i Arrow IPC zachowują typy kolumn
+# (liczby jako liczby, kategorie jako dictionary/category), więc odpada parsowanie tekstu.
+FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+def data_format(file_path: str) -> str:
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Nieobsługiwany format pliku: {file_path} (dozwolone: {sorted(FORMATS)})")
+    return FORMATS[ext]
+
+def _open_arrow(file_path: str):
+    # Arrow IPC: format plikowy (Feather v2) albo strumieniowy; memory-map -> bez kopiowania
+    import pyarrow as pa
+    source = pa.memory_map(file_path, "r")
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+def _arrow_batches(reader):
+    if hasattr(reader, "num_record_batches"):
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+    else:
+        yield from reader
+
+def read_columns(file_path: str) -> list:
+    #Nazwy kolumn bez wczytywania danych
+    fmt = data_format(file_path)
+    if fmt == "csv":
+        return pd.read_csv(file_path, nrows=0).columns.tolist()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_schema(file_path).names
+    return _open_arrow(file_path).schema.names
+
+def load_data(file_path: str, columns: list = None) -> pd.DataFrame:
+    #Wczytuje dane z CSV / Parquet / Arrow IPC z obsługą błędów (columns = projekcja kolumn)
     if not os.path.exists(file_path):
         logger.error(f"Plik nie istnieje: {file_path}")
         raise FileNotFoundError(f"Brak pliku: {file_path}")
-    
+
     try:
-        df = pd.read_csv(file_path)
-        logger.info(f"Wczytano dane pomyślnie. Rozmiar: {df.shape}")
+        fmt = data_format(file_path)
+        if fmt == "csv":
+            df = pd.read_csv(file_path, usecols=columns)
+        elif fmt == "parquet":
+            df = pd.read_parquet(file_path, columns=columns)
+        else:
+            df = pd.read_feather(file_path, columns=columns)
+        logger.info(f"Wczytano dane pomyślnie ({fmt}). Rozmiar: {df.shape}")
         return df
     except Exception as e:
-        logger.error(f"Błąd podczas odczytu CSV: {e}")
-        raise e
\ No newline at end of file
+        logger.error(f"Błąd podczas odczytu pliku: {e}")
+        raise e
+
+def iter_data(file_path: str, chunksize: int, columns: list = None):
+    """
+    Wczytuje plik porcjami po najwyżej `chunksize` wierszy (generator DataFrame'ów).
+    Parquet: po batchach z kolejnych row groups, Arrow: po record batchach z memory-map.
+    """
+    fmt = data_format(file_path)
+    if fmt == "csv":
+        with pd.read_csv(file_path, chunksize=chunksize, usecols=columns) as reader:
+            yield from reader
+        return
+
+    offset = 0
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(file_path).iter_batches(batch_size=chunksize, columns=columns)
+    else:
+        reader = _open_arrow(file_path)
+        batches = _arrow_batches(reader)
+
+    for batch in batches:
+        if columns is not None:
+            batch = batch.select(columns)
+        for start in range(0, batch.num_rows, chunksize):
+            df = batch.slice(start, chunksize).to_pandas()
+            # Ciągły indeks wierszy jak w pd.read_csv(chunksize=...)
+            df.index = pd.RangeIndex(offset, offset + len(df))
+            offset += len(df)
+            yield df
+
+def split_data_parts(file_path: str, chunksize: int) -> list:
+    """
+    Dzieli plik na niezależne części do równoległego przetwarzania:
+    CSV - zakresy bajtów wyrównane do końca linii (ok. `chunksize` wierszy każdy,
+    zakłada brak znaków nowej linii w polach - tak jest w schemacie Telco),
+    Parquet - row groups, Arrow - record batche.
+    """
+    fmt = data_format(file_path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return [("row_group", i) for i in range(pq.ParquetFile(file_path).num_row_groups)]
+    if fmt == "arrow":
+        reader = _open_arrow(file_path)
+        if hasattr(reader, "num_record_batches"):
+            return [("record_batch", i) for i in range(reader.num_record_batches)]
+        return [("stream", 0)]
+
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        f.readline()
+        data_start = f.tell()
+
+        # Średnia długość wiersza z próbki -> rozmiar bloku w bajtach
+        sample = [len(f.readline()) for _ in range(1000)]
+        sample = [n for n in sample if n] or [1]
+        block_size = max(1, chunksize * sum(sample) // len(sample))
+
+        parts = []
+        start = data_start
+        while start < size:
+            f.seek(min(start + block_size, size))
+            f.readline()
+            end = min(f.tell(), size)
+            parts.append(("bytes", (start, end)))
+            start = end
+    return parts
+
+def read_data_part(file_path: str, part: tuple, columns: list = None) -> pd.DataFrame:
+    #Wczytuje jedną część z split_data_parts (wywoływane w procesach-workerach)
+    kind, where = part
+    if kind == "bytes":
+        start, end = where
+        with open(file_path, "rb") as f:
+            header = f.readline()
+            f.seek(start)
+            block = f.read(end - start)
+        return pd.read_csv(io.BytesIO(header + block), usecols=columns)
+    if kind == "row_group":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(file_path).read_row_group(where, columns=columns).to_pandas()
+
+    reader = _open_arrow(file_path)
+    table = reader.get_batch(where) if kind == "record_batch" else reader.read_all()
+    if columns is not None:
+        table = table.select(columns)
+    return table.to_pandas()
@@ -1,21 +1,53 @@
+import numpy as np
 import pandas as pd
 from src.utils import get_logger
 
 logger = get_logger("PREPROCESS")
 
-def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
+def unparseable_numbers(values: pd.Series, parsed: pd.Series) -> np.ndarray:
+    """
+    Maska wartości tekstowych, które nie są liczbą, dla kolumny `values` i wyniku pd.to_numeric(errors="coerce").
+    Sprawdzamy tylko pozycje z NaN po parsowaniu (zwykle nieliczne): brak, pusty tekst (nowy klient bez TotalCharges)
+    i zapis "nan" nie są błędem - tak samo jak parse_number w API.
+    """
+    mask = np.zeros(len(values), dtype=bool)
+    missing = np.flatnonzero(parsed.isna().to_numpy())
+    if missing.size:
+        mask[missing] = [not _blank_or_number(value) for value in values.to_numpy()[missing]]
+    return mask
+
+def _blank_or_number(value) -> bool:
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return True
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def preprocess_data(df: pd.DataFrame, unparsed: dict = None) -> pd.DataFrame:
     #Czyści surowe dane
-    clean = df.copy()
+    #unparsed: opcjonalny słownik wypełniany maskami {kolumna: wartości nieliczbowe przed zamianą na 0} (walidacja)
+    # Płytka kopia: kolumny są tylko podmieniane, nie zmieniane w miejscu - ramka wejściowa zostaje nietknięta
+    clean = df.copy(deep=False)
 
     if "customerID" in clean.columns:
         clean = clean.drop(columns=["customerID"])
     
-    clean["TotalCharges"] = pd.to_numeric(clean["TotalCharges"], errors="coerce").fillna(0)
-
+    # Najpierw ujednolicamy nazwy kolumn - API wysyła je już małymi literami
     clean.columns = clean.columns.str.lower().str.replace(" ", "_")
 
-    if "churn" in clean.columns and clean["churn"].dtype == "object":
-        clean["churn"] = clean["churn"].map({"Yes":1, "No":0})
+    # Z Parquet/Arrow kolumna przychodzi już jako liczba - pomijamy parsowanie tekstu
+    if not pd.api.types.is_numeric_dtype(clean["totalcharges"]):
+        text = clean["totalcharges"].astype(object)
+        parsed = pd.to_numeric(text, errors="coerce")
+        if unparsed is not None:
+            unparsed["totalcharges"] = unparseable_numbers(text, parsed)
+        clean["totalcharges"] = parsed
+    clean["totalcharges"] = clean["totalcharges"].fillna(0)
+
+    if "churn" in clean.columns and not pd.api.types.is_numeric_dtype(clean["churn"]):
+        clean["churn"] = clean["churn"].astype(object).map({"Yes":1, "No":0})
 
     logger.info(f'Preprocessing zakończony')
     return clean
\ No newline at end of file
@@ -0,0 +1,56 @@
+import pandas as pd
+from src.data.load_data import data_format
+from src.utils import get_logger
+
+logger = get_logger("SAVE_DATA")
+
+class ChunkWriter:
+    """
+    Przyrostowy zapis wyników porcjami do CSV / Parquet / Arrow IPC (format po rozszerzeniu).
+    Parquet: każda porcja to osobny row group; Arrow: osobny record batch.
+    Użycie:
+        with ChunkWriter("predictions.parquet") as writer:
+            writer.write(df)
+    """
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.format = data_format(file_path)
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, df: pd.DataFrame):
+        if self.format == "csv":
+            df.to_csv(self.file_path, mode="w" if self.rows == 0 else "a", header=(self.rows == 0), index=False)
+            self.rows += len(df)
+            return
+
+        import pyarrow as pa
+        # Kategorie każdej porcji mają inny słownik - zapisujemy same wartości,
+        # żeby schemat był stały dla całego pliku
+        categorical = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+        if categorical:
+            df = df.astype({c: df[c].cat.categories.dtype for c in categorical})
+
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            if self.format == "parquet":
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.file_path, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self.file_path, self._schema)
+
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,148 @@
+import json
+import numpy as np
+
+# Schemat danych z treningu (dozwolone kategorie, zakresy i typy kolumn numerycznych)
+# skompilowany do wektorowych sprawdzeń na macierzy cech float32 z EncodingPlan.
+# Moduł zależy tylko od NumPy - działa na ścieżce serwowania (każdy request) i w batch scoringu (każda porcja).
+
+SCHEMA_FILE = "schema.json"
+# Dozwolony zakres = obserwowany w treningu + zapas (połowa rozpiętości) w górę, np. dłuższy staż klienta.
+# Kolumny nieujemne w treningu muszą pozostać nieujemne.
+RANGE_SLACK = 0.5
+
+def build_schema(df, num_cols: list, categories: dict, range_slack: float = RANGE_SLACK) -> dict:
+    #Schemat z ramki treningowej po preprocess_data (categories jak models/categories.json)
+    numeric = {}
+    for col in num_cols:
+        values = df[col].to_numpy(dtype=np.float64)
+        low, high = float(np.nanmin(values)), float(np.nanmax(values))
+        span = high - low
+        numeric[col] = {
+            "dtype": "int" if df[col].dtype.kind in "iub" else "float",
+            "observed_min": low,
+            "observed_max": high,
+            "min": 0.0 if low >= 0 else low - range_slack * span,
+            "max": high + range_slack * span,
+        }
+    return {"numeric": numeric, "categorical": {col: list(values) for col, values in categories.items()}}
+
+def export_schema(schema: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(schema, f, indent=2)
+
+def load_schema(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+class InvalidRecords(ValueError):
+    #Rekordy odrzucone przez walidację: {indeks rekordu: [powody]}
+    def __init__(self, errors: dict):
+        self.errors = errors
+        summary = "; ".join(f"{idx}: {', '.join(reasons)}" for idx, reasons in list(errors.items())[:5])
+        super().__init__(f"Niepoprawne dane ({len(errors)} rekordów): {summary}")
+
+    def __reduce__(self):
+        # Przenoszenie między procesami puli (pickle) ze słownikiem błędów
+        return type(self), (self.errors,)
+
+class DataSchema:
+    """
+    Sprawdzenia schematu dla macierzy cech (wiersze x cechy modelu) w jednym przebiegu:
+    - kolumny numeryczne: wartość skończona, całkowita dla typu int, w dozwolonym zakresie,
+    - pola kategoryczne: dokładnie jedna znana kategoria (nieznana = same zera w one-hot),
+    - kolumny numeryczne podane jako tekst, który nie jest liczbą (flagi z kodowania - w macierzy jest już 0).
+    Wynik to maska uint64 na wiersz - każdy bit to jeden powód odrzucenia (0 = wiersz poprawny).
+    Flagi wszystkich powodów trafiają do jednej macierzy bool, pakowanej w maskę przez np.packbits.
+    Schemat bez sekcji "numeric" (artefakty sprzed schema.json) sprawdza tylko kategorie i wartości skończone.
+    """
+    def __init__(self, schema: dict, plan):
+        self.num_cols = list(plan.num_cols)
+        self.categories = {col: list(values) for col, values in plan.categories.items()}
+        positions = {name: idx for idx, name in enumerate(plan.feature_names)}
+
+        specs = [schema.get("numeric", {}).get(col, {}) for col in self.num_cols]
+        self._num_idx = np.array([positions[col] for col in self.num_cols], dtype=np.intp)
+        self._low = np.array([spec.get("min", -np.inf) for spec in specs], dtype=np.float64)
+        self._high = np.array([spec.get("max", np.inf) for spec in specs], dtype=np.float64)
+        self._integer = np.array([spec.get("dtype") == "int" for spec in specs], dtype=bool)
+        self._has_integer = bool(self._integer.any())
+
+        # Kolumny one-hot ułożone polami jedno za drugim - suma pola jednym np.add.reduceat
+        cat_idx, starts = [], []
+        for col, values in self.categories.items():
+            starts.append(len(cat_idx))
+            cat_idx += [positions[f"{col}_{value}"] for value in values]
+        self._cat_idx = np.array(cat_idx, dtype=np.intp)
+        self._cat_starts = np.array(starts, dtype=np.intp)
+
+        # Kolejność powodów = kolejność bitów: wartości numeryczne, zakresy, kategorie, wartości nieliczbowe
+        self.reasons = ([f"{col}: niepoprawna wartość" for col in self.num_cols]
+                        + [f"{col}: poza zakresem {low:g}..{high:g}"
+                           for col, low, high in zip(self.num_cols, self._low, self._high)]
+                        + [f"{col}: nieznana kategoria" for col in self.categories]
+                        + [f"{col}: wartość nie jest liczbą" for col in self.num_cols])
+        if len(self.reasons) > 64:
+            raise ValueError(f"Za dużo sprawdzeń dla maski uint64: {len(self.reasons)}")
+        self._n_bytes = (len(self.reasons) + 7) // 8
+
+    def check(self, matrix: np.ndarray, unparsed: np.ndarray = None) -> np.ndarray:
+        """
+        Maska powodów odrzucenia dla każdego wiersza macierzy (n, n_features).
+        unparsed: opcjonalnie flagi bool (n, len(num_cols)) wartości nieliczbowych sprzed kodowania
+        (EncodingPlan.encode_rows / unparsed_flags).
+        """
+        flags = np.zeros((len(matrix), 8 * self._n_bytes), dtype=bool)
+        k = len(self.num_cols)
+        n_cat = len(self._cat_starts)
+
+        if k:
+            values = matrix[:, self._num_idx]
+            invalid = np.isfinite(values, out=flags[:, :k])
+            np.logical_not(invalid, out=invalid)
+            if self._has_integer:
+                invalid |= self._integer & (values != np.floor(values))
+            np.less(values, self._low, out=flags[:, k:2 * k])
+            flags[:, k:2 * k] |= values > self._high
+
+        if self._cat_idx.size:
+            present = np.add.reduceat(matrix[:, self._cat_idx], self._cat_starts, axis=1)
+            np.equal(present, 0, out=flags[:, 2 * k:2 * k + n_cat])
+
+        if unparsed is not None:
+            flags[:, 2 * k + n_cat:3 * k + n_cat] = unparsed
+
+        # Flagi -> bajty (bit i = flaga i), dopełnione zerami do 8 bajtów na wiersz -> uint64 (little endian)
+        packed = np.zeros((len(matrix), 8), dtype=np.uint8)
+        packed[:, :self._n_bytes] = np.packbits(flags, axis=1, bitorder="little")
+        return packed.view("<u8").ravel()
+
+    def unparsed_flags(self, columns: dict, n: int) -> np.ndarray:
+        #Flagi (n, len(num_cols)) dla check() ze słownika {kolumna: maska} wypełnianego przez preprocess_data
+        flags = np.zeros((n, len(self.num_cols)), dtype=bool)
+        for k, col in enumerate(self.num_cols):
+            if col in columns:
+                flags[:, k] = columns[col]
+        return flags
+
+    def check_columns(self, df):
+        #Sprawdzenie całej porcji (ramka po preprocess_data): brakujące kolumny i typy kolumn numerycznych
+        missing = [col for col in self.num_cols + list(self.categories) if col not in df.columns]
+        if missing:
+            raise ValueError(f"Błędny schemat danych. Brakuje: {missing}")
+        wrong = [col for col in self.num_cols if df[col].dtype.kind not in "iufb"]
+        if wrong:
+            raise ValueError(f"Błędny schemat danych. Kolumny nienumeryczne: {wrong}")
+
+    def describe(self, bits: int) -> list:
+        #Powody odrzucenia zakodowane w masce jednego wiersza
+        return [reason for idx, reason in enumerate(self.reasons) if bits >> idx & 1]
+
+    def errors(self, mask: np.ndarray) -> dict:
+        #{indeks wiersza: [powody]} tylko dla odrzuconych wierszy
+        return {int(idx): self.describe(int(mask[idx])) for idx in np.flatnonzero(mask)}
+
+    def reason_strings(self, mask: np.ndarray) -> list:
+        #Powody jako tekst dla każdego wiersza maski; opis liczony raz na każdą różną kombinację bitów
+        unique, inverse = np.unique(mask, return_inverse=True)
+        texts = ["; ".join(self.describe(int(bits))) for bits in unique]
+        return [texts[idx] for idx in inverse.ravel()]
@@ -2,19 +2,38 @@ import pandas as pd
 import joblib
 import os
 from sklearn.preprocessing import OneHotEncoder
+from src.data.schema import SCHEMA_FILE, build_schema, export_schema
+from src.features.encoding_plan import CATEGORY_TABLE_FILE, EncodingPlan, category_table, export_category_table
 from src.utils import get_logger
 
 logger = get_logger("BUILD_FEATURES")
 
-def build_features(df: pd.DataFrame, train_mode: bool = True) -> pd.DataFrame:
+ARTIFACTS_DIR = "models"
+ENCODER_PATH = os.path.join(ARTIFACTS_DIR, "encoder.joblib")
+CATEGORIES_PATH = os.path.join(ARTIFACTS_DIR, CATEGORY_TABLE_FILE)
+SCHEMA_PATH = os.path.join(ARTIFACTS_DIR, SCHEMA_FILE)
+
+def load_encoder(encoder_path: str = ENCODER_PATH) -> OneHotEncoder:
+    #Wczytuje wytrenowany encoder z dysku (raz, np. przy starcie serwera)
+    if not os.path.exists(encoder_path):
+        raise FileNotFoundError("Brak encodera! Uruchom najpierw trening.")
+    return joblib.load(encoder_path)
+
+def build_features(df: pd.DataFrame, train_mode: bool = True, encoder: OneHotEncoder = None,
+                   compact: bool = False) -> pd.DataFrame:
     """
     Transformuje dane.
     W trybie train: uczy encoder i go zapisuje.
-    W trybie predict (train_mode=False): ładuje encoder i tylko transformuje.
+    W trybie predict (train_mode=False): używa przekazanego encodera
+    (albo ładuje go z dysku, jeśli nie podano) i tylko transformuje.
+    compact=True: wszystkie cechy w jednej macierzy float32 wypełnianej wprost (EncodingPlan),
+    bez ramki one-hot float64 i pd.concat. Te same wartości i te same drzewa XGBoost
+    (liczy w float32), tylko kolumny całkowite stają się float32.
     """
-    df_featured = df.copy()
-    artifacts_dir = "models"
-    encoder_path = os.path.join(artifacts_dir, "encoder.joblib")
+    # Ramka wejściowa jest tylko czytana - bez kopii
+    df_featured = df
+    artifacts_dir = ARTIFACTS_DIR
+    encoder_path = ENCODER_PATH
     
     target_col = 'churn' # Zakładamy lowercase po preprocessingu
     y = None
@@ -23,28 +42,44 @@ def build_features(df: pd.DataFrame, train_mode: bool = True) -> pd.DataFrame:
         df_featured = df_featured.drop(columns=[target_col])
     
     # Wykrywanie kolumn (musimy być pewni, że typy są ok)
-    cat_cols = df_featured.select_dtypes(include=['object']).columns.tolist()
+    # 'category' - kolumny słownikowe z Parquet/Arrow, 'string' - tekst w nowszym pandas
+    cat_cols = df_featured.select_dtypes(include=['object', 'category', 'string']).columns.tolist()
     num_cols = df_featured.select_dtypes(include=['number']).columns.tolist()
     
     if train_mode:
         os.makedirs(artifacts_dir, exist_ok=True)
         encoder = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
-        encoded_array = encoder.fit_transform(df_featured[cat_cols])
+        if compact:
+            encoder.fit(df_featured[cat_cols])
+        else:
+            encoded_array = encoder.fit_transform(df_featured[cat_cols])
         joblib.dump(encoder, encoder_path)
+        # Ta sama informacja jako JSON dla serwowania (bez sklearn/pandas)
+        export_category_table(encoder, CATEGORIES_PATH)
+        # Schemat danych treningowych (kategorie, zakresy, typy) - walidacja w API i batch scoringu
+        export_schema(build_schema(df_featured, num_cols, category_table(encoder)), SCHEMA_PATH)
     else:
-        if not os.path.exists(encoder_path):
-            raise FileNotFoundError("Brak encodera! Uruchom najpierw trening.")
-        encoder = joblib.load(encoder_path)
+        # Encoder w pamięci (np. z ChurnModel) -> zero odczytów z dysku na request
+        if encoder is None:
+            encoder = load_encoder(encoder_path)
         
         # Weryfikacja czy w nowych danych są te same kolumny kategoryczne co przy treningu
         # Encoder wymaga dokładnie tych samych kolumn wejściowych.
-        encoded_array = encoder.transform(df_featured[cat_cols])
+        if not compact:
+            encoded_array = encoder.transform(df_featured[cat_cols])
     
     encoded_cols = encoder.get_feature_names_out(cat_cols)
-    df_encoded = pd.DataFrame(encoded_array, columns=encoded_cols, index=df_featured.index)
-    
-    # Składanie całości
-    df_final = pd.concat([df_featured[num_cols], df_encoded], axis=1)
+    if compact:
+        # Jedna alokacja (wiersze x cechy) float32 - kolejność kolumn jak w trybie zwykłym
+        feature_names = num_cols + list(encoded_cols)
+        plan = EncodingPlan.from_category_table(category_table(encoder), feature_names)
+        df_final = pd.DataFrame(plan.encode_frame(df_featured), columns=feature_names,
+                                index=df_featured.index, copy=False)
+    else:
+        df_encoded = pd.DataFrame(encoded_array, columns=encoded_cols, index=df_featured.index)
+
+        # Składanie całości
+        df_final = pd.concat([df_featured[num_cols], df_encoded], axis=1)
     
     # Jeśli mieliśmy target (np. w zbiorze testowym), doklejamy go
     if y is not None:
@@ -0,0 +1,145 @@
+import json
+import math
+import numpy as np
+
+# Moduł celowo zależy tylko od NumPy - jest używany na ścieżce serwowania,
+# gdzie pandas i sklearn są zbędnym narzutem na każdy request.
+
+# Tabela kategorii encodera jako zwykły JSON - serwowanie nie musi rozpakowywać pickla sklearn
+CATEGORY_TABLE_FILE = "categories.json"
+
+def category_table(encoder) -> dict:
+    #Kolumna -> lista kategorii (w kolejności encodera) z wytrenowanego OneHotEncodera
+    return {col: [str(v) for v in values] for col, values in zip(encoder.feature_names_in_, encoder.categories_)}
+
+def export_category_table(encoder, path: str):
+    with open(path, "w") as f:
+        json.dump({"categories": category_table(encoder)}, f, indent=2)
+
+def load_category_table(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)["categories"]
+
+def to_float(value) -> float:
+    #Odpowiednik pd.to_numeric(errors="coerce").fillna(0) dla pojedynczej wartości
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(number) else number
+
+def parse_number(value) -> tuple:
+    """
+    Jak to_float, ale z informacją, czy wartość dała się odczytać: (liczba, poprawna).
+    Brak i pusty tekst (w danych Telco - nowy klient bez TotalCharges) to 0 i wartość poprawna,
+    tekst, który nie jest liczbą (np. "abc") - 0 i wartość niepoprawna.
+    """
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0, value is None or (isinstance(value, str) and not value.strip())
+    return (0.0 if math.isnan(number) else number), True
+
+class EncodingPlan:
+    """
+    Skompilowany plan kodowania: słownik klienta -> wiersz float32 w kolejności cech modelu.
+    Daje dokładnie te same wartości co preprocess_data + build_features,
+    ale bez DataFrame'ów, kopiowania i pd.concat.
+    """
+    def __init__(self, num_cols: list, categories: dict, feature_names: list):
+        self.num_cols = list(num_cols)
+        self.categories = {col: list(values) for col, values in categories.items()}
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+
+        positions = {name: idx for idx, name in enumerate(self.feature_names)}
+        missing = [c for c in self.num_cols if c not in positions]
+        if missing:
+            raise ValueError(f"Model nie zna kolumn numerycznych: {missing}")
+
+        # (kolumna, indeks w wierszu) dla cech numerycznych
+        self.num_index = [(col, positions[col]) for col in self.num_cols]
+
+        # kolumna -> {kategoria: indeks w wierszu}; nieznana kategoria = same zera
+        # (tak samo jak handle_unknown='ignore' w OneHotEncoder)
+        self.cat_index = {
+            col: {value: positions[f"{col}_{value}"] for value in values}
+            for col, values in self.categories.items()
+        }
+
+    @classmethod
+    def from_category_table(cls, categories: dict, feature_names: list) -> "EncodingPlan":
+        #Buduje plan z tabeli kategorii i kolejności cech modelu (nazwy kolumn one-hot: kolumna_kategoria)
+        encoded_cols = {f"{col}_{value}" for col, values in categories.items() for value in values}
+        num_cols = [c for c in feature_names if c not in encoded_cols]
+        return cls(num_cols, categories, feature_names)
+
+    @classmethod
+    def from_encoder(cls, encoder, feature_names: list) -> "EncodingPlan":
+        #Buduje plan z wytrenowanego OneHotEncodera i kolejności cech modelu
+        return cls.from_category_table(category_table(encoder), feature_names)
+
+    def new_row(self) -> np.ndarray:
+        return np.zeros((1, self.n_features), dtype=np.float32)
+
+    def encode_row(self, data: dict, out: np.ndarray = None, unparsed: np.ndarray = None) -> np.ndarray:
+        """
+        Koduje jednego klienta do wiersza (1, n_features) float32.
+        Jeśli podano `out`, jest on nadpisywany (bez nowej alokacji).
+        unparsed: tablica bool (len(num_cols),) - True dla kolumn numerycznych z tekstem, który nie jest liczbą
+        (wartość w wierszu to 0, jak bez walidacji).
+        """
+        row = self.new_row() if out is None else out
+        row.fill(0.0)
+        values = row[0]
+
+        if unparsed is None:
+            for col, idx in self.num_index:
+                values[idx] = to_float(data.get(col))
+        else:
+            for k, (col, idx) in enumerate(self.num_index):
+                values[idx], valid = parse_number(data.get(col))
+                unparsed[k] = not valid
+
+        for col, mapping in self.cat_index.items():
+            idx = mapping.get(data.get(col))
+            if idx is not None:
+                values[idx] = 1.0
+
+        return row
+
+    def encode_rows(self, records: list, unparsed: np.ndarray = None) -> np.ndarray:
+        #Koduje listę klientów do macierzy (n, n_features) float32 - jedno wywołanie modelu na całą paczkę
+        #unparsed: opcjonalnie tablica bool (n, len(num_cols)) na flagi wartości nieliczbowych (jak w encode_row)
+        matrix = np.zeros((len(records), self.n_features), dtype=np.float32)
+        for i, data in enumerate(records):
+            self.encode_row(data, out=matrix[i:i + 1], unparsed=None if unparsed is None else unparsed[i])
+        return matrix
+
+    def encode_frame(self, df) -> np.ndarray:
+        """
+        Wektorowe kodowanie całej ramki (po preprocess_data) do macierzy float32.
+        Jedna alokacja na wynik - bez kopii ramki i pd.concat jak w build_features.
+        """
+        matrix = np.zeros((len(df), self.n_features), dtype=np.float32)
+
+        for col, idx in self.num_index:
+            matrix[:, idx] = df[col].to_numpy(dtype=np.float32)
+
+        for col, mapping in self.cat_index.items():
+            column = df[col]
+            categories = getattr(column.dtype, "categories", None)
+            if categories is not None:
+                # Kolumna kategoryczna (np. dictionary z Parquet/Arrow): porównujemy kody, nie teksty
+                codes = column.cat.codes.to_numpy()
+                lookup = {value: code for code, value in enumerate(categories)}
+                for value, idx in mapping.items():
+                    code = lookup.get(value)
+                    if code is not None:
+                        matrix[:, idx] = codes == code
+            else:
+                values = column.to_numpy()
+                for value, idx in mapping.items():
+                    matrix[:, idx] = values == value
+
+        return matrix
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from src.data.load_data import load_data
+from src.data.preprocess import preprocess_data
+import src.features.build_features as build_features_module
+from src.features.build_features import build_features
+from src.profiling import stage
+from src.utils import get_logger
+
+logger = get_logger("FEATURE_CACHE")
+
+CACHE_DIR = os.path.join("data", "cache", "features")
+
+# Kod, od którego zależy macierz cech - jego zmiana unieważnia cache
+FEATURE_CODE_FILES = [
+    os.path.join(os.path.dirname(__file__), "..", "data", "load_data.py"),
+    os.path.join(os.path.dirname(__file__), "..", "data", "preprocess.py"),
+    os.path.join(os.path.dirname(__file__), "build_features.py"),
+    # Schemat danych (zakresy, kategorie) zapisywany w cache razem z macierzą
+    os.path.join(os.path.dirname(__file__), "..", "data", "schema.py"),
+    # Tryb compact koduje macierz przez EncodingPlan
+    os.path.join(os.path.dirname(__file__), "encoding_plan.py"),
+]
+
+def _file_hash(path: str, hasher=None):
+    hasher = hasher or hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+    return hasher
+
+def feature_code_version() -> str:
+    hasher = hashlib.sha256()
+    for path in FEATURE_CODE_FILES:
+        _file_hash(path, hasher)
+    return hasher.hexdigest()[:16]
+
+def cache_key(data_path: str, compact: bool = False) -> str:
+    #Klucz = hash zawartości surowych danych + wersja kodu cech (+ tryb compact - inne typy kolumn)
+    data_hash = _file_hash(data_path).hexdigest()
+    key = f"{data_hash}:{feature_code_version()}" + (":compact" if compact else "")
+    return hashlib.sha256(key.encode()).hexdigest()[:24]
+
+def _save_entry(entry_dir: str, df_features: pd.DataFrame, target_col: str):
+    # Zapis do katalogu tymczasowego i atomowa podmiana - przerwany zapis nie zostawia śmieci
+    tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    X = df_features.drop(columns=[target_col])
+    np.save(os.path.join(tmp_dir, "X.npy"), X.to_numpy(dtype=np.float32))
+    np.save(os.path.join(tmp_dir, "y.npy"), df_features[target_col].to_numpy())
+    shutil.copyfile(build_features_module.ENCODER_PATH, os.path.join(tmp_dir, "encoder.joblib"))
+    shutil.copyfile(build_features_module.CATEGORIES_PATH, os.path.join(tmp_dir, "categories.json"))
+    shutil.copyfile(build_features_module.SCHEMA_PATH, os.path.join(tmp_dir, "schema.json"))
+
+    meta = {
+        "columns": X.columns.tolist(),
+        # Kolumny całkowite odtwarzamy jako int (XGBoost zapisuje typy cech w modelu)
+        "int_columns": X.select_dtypes(include=["integer"]).columns.tolist(),
+        "target_col": target_col,
+        "rows": len(df_features),
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+
+def _load_entry(entry_dir: str) -> pd.DataFrame:
+    with open(os.path.join(entry_dir, "meta.json"), "r") as f:
+        meta = json.load(f)
+
+    # Memory-map: dane nie są czytane z dysku, dopóki nie są potrzebne
+    X = np.load(os.path.join(entry_dir, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(entry_dir, "y.npy"))
+
+    df = pd.DataFrame(X, columns=meta["columns"], copy=False)
+    if meta["int_columns"]:
+        df = df.astype({c: np.int64 for c in meta["int_columns"]})
+    df[meta["target_col"]] = y
+
+    # Encoder z tego samego przebiegu co macierz - serwowanie musi używać tych samych kolumn
+    os.makedirs(build_features_module.ARTIFACTS_DIR, exist_ok=True)
+    shutil.copyfile(os.path.join(entry_dir, "encoder.joblib"), build_features_module.ENCODER_PATH)
+    shutil.copyfile(os.path.join(entry_dir, "categories.json"), build_features_module.CATEGORIES_PATH)
+    shutil.copyfile(os.path.join(entry_dir, "schema.json"), build_features_module.SCHEMA_PATH)
+    return df
+
+def load_features(data_path: str, target_col: str = "churn", use_cache: bool = True,
+                  cache_dir: str = CACHE_DIR, compact: bool = False) -> pd.DataFrame:
+    """
+    Zwraca macierz cech (tak jak build_features(train_mode=True)) dla pliku z danymi.
+    Przy niezmienionych danych i kodzie cech - wczytuje ją z cache zamiast budować od nowa.
+    W obu przypadkach models/encoder.joblib (i categories.json) odpowiada zwróconej macierzy.
+    compact=True: cechy jako jeden blok float32 (patrz build_features).
+    """
+    if not os.path.exists(data_path):
+        logger.error(f"Plik nie istnieje: {data_path}")
+        raise FileNotFoundError(f"Brak pliku: {data_path}")
+
+    if use_cache:
+        entry_dir = os.path.join(cache_dir, cache_key(data_path, compact))
+        if os.path.exists(os.path.join(entry_dir, "meta.json")):
+            logger.info(f"Cache cech: trafienie ({entry_dir}) - pomijam preprocessing i budowę cech")
+            with stage("cache_load"):
+                return _load_entry(entry_dir)
+        logger.info("Cache cech: brak wpisu - buduję cechy")
+
+    with stage("load"):
+        df = load_data(data_path)
+    with stage("preprocess"):
+        df_clean = preprocess_data(df)
+    with stage("build"):
+        df_features = build_features(df_clean, train_mode=True, compact=compact)
+
+    if use_cache:
+        with stage("cache_save"):
+            _save_entry(entry_dir, df_features, target_col)
+        logger.info(f"Cache cech: zapisano {entry_dir}")
+    return df_features
@@ -0,0 +1,280 @@
+import glob
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from src.data.load_data import data_format, iter_data, read_data_part, split_data_parts
+from src.data.save_data import ChunkWriter
+from src.model.predict_model import DEFAULT_CHUNKSIZE, RESULT_COLUMNS, input_columns, rejected_path, score_chunk
+from src.serving.inference import ChurnModel
+from src.utils import get_logger
+
+logger = get_logger("BATCH_JOB")
+
+# Wznawialny batch scoring dużych plików:
+# plik wejściowy -> shardy (split_data_parts), każdy shard liczony i zapisywany osobno do output_dir/part-NNNNN.<ext>
+# (zapis do pliku tymczasowego + os.replace, więc shard jest albo kompletny, albo go nie ma),
+# ukończenie sharda zapisane w output_dir/manifest.sqlite. Po awarii kolejne uruchomienie liczy tylko brakujące shardy.
+
+MANIFEST_FILE = "manifest.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS shards (
+    idx INTEGER PRIMARY KEY,
+    part TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    rows INTEGER,
+    rejected INTEGER,
+    seconds REAL,
+    finished_at TEXT
+);
+"""
+
+class JobMismatch(ValueError):
+    #Manifest w output_dir należy do innego zadania (inny plik, model lub parametry)
+    pass
+
+def shard_path(output_dir: str, idx: int, fmt: str) -> str:
+    return os.path.join(output_dir, f"part-{idx:05d}.{fmt}")
+
+def _tmp_path(path: str) -> str:
+    # Rozszerzenie zostaje na końcu - ChunkWriter wybiera po nim format
+    root, ext = os.path.splitext(path)
+    return f"{root}.tmp{ext}"
+
+def _job_spec(input_file: str, shard_rows: int, fmt: str, validate: bool, explain: bool, model_version: str) -> dict:
+    #Parametry, które muszą się zgadzać, żeby wznowić zadanie (zmiana pliku/modelu = inne wyniki)
+    stat = os.stat(input_file)
+    return {
+        "input": os.path.abspath(input_file),
+        "input_size": str(stat.st_size),
+        "input_mtime_ns": str(stat.st_mtime_ns),
+        "shard_rows": str(shard_rows),
+        "format": fmt,
+        "validate": str(int(validate)),
+        "explain": str(int(explain)),
+        "model_version": model_version,
+    }
+
+class Manifest:
+    """
+    Stan zadania w SQLite: parametry zadania (tabela job) i status każdego sharda (tabela shards).
+    Każda zmiana to osobna transakcja - po przerwaniu procesu manifest jest spójny.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def spec(self) -> dict:
+        return dict(self.conn.execute("SELECT key, value FROM job"))
+
+    def init(self, spec: dict, parts: list):
+        with self.conn:
+            self.conn.executemany("INSERT INTO job (key, value) VALUES (?, ?)", spec.items())
+            self.conn.executemany("INSERT INTO shards (idx, part) VALUES (?, ?)",
+                                  [(idx, json.dumps(part)) for idx, part in enumerate(parts)])
+
+    def shards(self) -> list:
+        #[(idx, part, status, rows, rejected)] w kolejności shardów
+        return [(idx, tuple(json.loads(part)), status, rows, rejected)
+                for idx, part, status, rows, rejected
+                in self.conn.execute("SELECT idx, part, status, rows, rejected FROM shards ORDER BY idx")]
+
+    def mark_done(self, idx: int, rows: int, rejected: int, seconds: float):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE shards SET status = 'done', rows = ?, rejected = ?, seconds = ?, "
+                "finished_at = datetime('now') WHERE idx = ?", (rows, rejected, seconds, idx))
+
+# --- Workery: model wczytany raz na proces, każdy worker sam czyta, liczy i zapisuje swój shard ---
+_worker_model = None
+
+def _init_worker(nthread: int, bundle_dir: str = None):
+    global _worker_model
+    # Paczka z procesu głównego (ta zapisana w manifeście jako model_version), a nie "bieżąca" w chwili startu workera
+    _worker_model = ChurnModel(bundle_dir)
+    _worker_model.set_nthread(nthread)
+
+def _write_atomic(df: pd.DataFrame, path: str):
+    tmp = _tmp_path(path)
+    with ChunkWriter(tmp) as writer:
+        writer.write(df)
+    os.replace(tmp, path)
+
+def _score_shard(model: ChurnModel, input_file: str, part: tuple, columns: list, validate: bool, explain: bool,
+                 out_path: str) -> tuple:
+    #Liczy jeden shard i zapisuje wyniki (i ewentualnie odrzucone wiersze); zwraca (wiersze, odrzucone, sekundy)
+    start = time.perf_counter()
+    results, rejects = score_chunk(model, read_data_part(input_file, part, columns=columns), validate, explain)
+    # Najpierw plik odrzuconych - plik wyników jest znacznikiem kompletnego sharda
+    if rejects is not None:
+        _write_atomic(rejects, rejected_path(out_path))
+    _write_atomic(results, out_path)
+    return len(results), 0 if rejects is None else len(rejects), time.perf_counter() - start
+
+def _score_shard_in_worker(*args) -> tuple:
+    return _score_shard(_worker_model, *args)
+
+def _prepare(output_dir: str, spec: dict, input_file: str, shard_rows: int, restart: bool) -> Manifest:
+    #Nowy manifest albo wznowienie istniejącego (JobMismatch, gdy należy do innego zadania)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    if restart:
+        # Tylko pliki zadania - katalog może zawierać też inne dane
+        for path in glob.glob(manifest_path) + glob.glob(os.path.join(output_dir, "part-*")):
+            os.remove(path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = Manifest(manifest_path)
+    previous = manifest.spec()
+    if not previous:
+        parts = split_data_parts(input_file, shard_rows)
+        manifest.init(spec, parts)
+        logger.info(f"Nowe zadanie: {len(parts)} shardów -> {output_dir}")
+        return manifest
+
+    if previous != spec:
+        changed = sorted(key for key in spec if previous.get(key) != spec[key])
+        manifest.close()
+        raise JobMismatch(f"{output_dir} zawiera inne zadanie (różnice: {changed}). Użyj restart=True / --restart.")
+    return manifest
+
+def _format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+def run_batch_job(input_file: str, output_dir: str, shard_rows: int = DEFAULT_CHUNKSIZE, workers: int = 1,
+                  validate: bool = True, explain: bool = False, restart: bool = False, output_file: str = None) -> dict:
+    """
+    Wznawialny batch scoring: input_file (CSV / Parquet / Arrow IPC) dzielony na shardy
+    (CSV - ok. shard_rows wierszy, Parquet - row groups, Arrow - record batche).
+    Każdy shard trafia atomowo do output_dir/part-NNNNN.<ext> (format = format pliku wejściowego),
+    a jego ukończenie do output_dir/manifest.sqlite. Ponowne uruchomienie liczy tylko nieukończone shardy;
+    zmiana pliku wejściowego, modelu lub parametrów -> JobMismatch (restart=True zaczyna od zera).
+    explain=True: wyniki z kolumnami wyjaśnień (predict_model.explanation_columns).
+    output_file: po ukończeniu wszystkich shardów scala je w jeden plik w kolejności wierszy.
+    Zwraca podsumowanie: {"shards", "rows", "rejected", "skipped"}.
+    """
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"Brak pliku: {input_file}")
+
+    fmt = data_format(input_file)
+    model = ChurnModel()
+    columns = input_columns(input_file, model)
+    spec = _job_spec(input_file, shard_rows, fmt, validate, explain, model.version)
+    manifest = _prepare(output_dir, spec, input_file, shard_rows, restart)
+
+    try:
+        shards = manifest.shards()
+        todo = [(idx, part) for idx, part, status, _, _ in shards
+                if status != "done" or not os.path.exists(shard_path(output_dir, idx, fmt))]
+        skipped = len(shards) - len(todo)
+        if skipped:
+            logger.info(f"Wznowienie: {skipped}/{len(shards)} shardów już policzonych")
+
+        done_rows = 0
+        started = time.perf_counter()
+
+        def record(idx: int, rows: int, rejected: int, seconds: float, finished: int):
+            nonlocal done_rows
+            manifest.mark_done(idx, rows, rejected, seconds)
+            done_rows += rows + rejected
+            rate = done_rows / max(time.perf_counter() - started, 1e-9)
+            eta = (len(todo) - finished) * (done_rows / finished) / rate
+            logger.info(f"Shard {idx + 1}/{len(shards)}: {rows + rejected} wierszy w {seconds:.1f} s "
+                        f"({(rows + rejected) / max(seconds, 1e-9):,.0f} wierszy/s) | "
+                        f"zadanie: {finished}/{len(todo)}, {rate:,.0f} wierszy/s, ETA {_format_eta(eta)}")
+
+        if workers > 1 and len(todo) > 1:
+            nthread = max(1, (os.cpu_count() or 1) // workers)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(nthread, model.bundle_dir)) as pool:
+                # Ograniczona liczba zadań w locie - po przerwaniu nie czekamy na całą kolejkę
+                pending = deque()
+                remaining = iter(todo)
+
+                def submit_next():
+                    for idx, part in remaining:
+                        future = pool.submit(_score_shard_in_worker, input_file, part, columns, validate, explain,
+                                             shard_path(output_dir, idx, fmt))
+                        pending.append((idx, future))
+                        return
+
+                for _ in range(2 * workers):
+                    submit_next()
+
+                finished = 0
+                while pending:
+                    idx, future = pending.popleft()
+                    rows, rejected, seconds = future.result()
+                    submit_next()
+                    finished += 1
+                    record(idx, rows, rejected, seconds, finished)
+        else:
+            for finished, (idx, part) in enumerate(todo, start=1):
+                rows, rejected, seconds = _score_shard(model, input_file, part, columns, validate, explain,
+                                                       shard_path(output_dir, idx, fmt))
+                record(idx, rows, rejected, seconds, finished)
+
+        shards = manifest.shards()
+    finally:
+        manifest.close()
+
+    summary = {
+        "shards": len(shards),
+        "rows": sum(rows for _, _, _, rows, _ in shards),
+        "rejected": sum(rejected for _, _, _, _, rejected in shards),
+        "skipped": skipped,
+    }
+    logger.info(f"✅ Zadanie ukończone: {summary['rows']} wierszy z predykcją, "
+                f"{summary['rejected']} odrzuconych ({summary['shards']} shardów w {output_dir})")
+
+    if output_file is not None:
+        merge_shards(output_dir, fmt, shards, output_file, has_ids="customerID" in columns)
+    return summary
+
+def _iter_shard(path: str, fmt: str):
+    # CSV: identyfikatory jako tekst (np. wiodące zera), pozostałe formaty trzymają typy
+    if fmt != "csv":
+        yield from iter_data(path, DEFAULT_CHUNKSIZE)
+        return
+    with pd.read_csv(path, chunksize=DEFAULT_CHUNKSIZE, dtype={"customerID": str}) as reader:
+        yield from reader
+
+def merge_shards(output_dir: str, fmt: str, shards: list, output_file: str, has_ids: bool = True):
+    """
+    Scala shardy w jeden plik wyników (i plik odrzuconych) w kolejności wierszy, porcjami.
+    Bez kolumny customerID identyfikatorem jest globalny numer wiersza - jak w make_batch_predictions.
+    """
+    tmp_output, tmp_rejected = _tmp_path(output_file), _tmp_path(rejected_path(output_file))
+    with ChunkWriter(tmp_output) as writer, ChunkWriter(tmp_rejected) as rejects_writer:
+        offset = 0
+        for idx, _, _, rows, rejected in shards:
+            path = shard_path(output_dir, idx, fmt)
+            for target, source, count in ((writer, path, rows), (rejects_writer, rejected_path(path), rejected)):
+                if not count:
+                    continue
+                for chunk in _iter_shard(source, fmt):
+                    if not has_ids:
+                        chunk["customerID"] = chunk["customerID"].astype("int64") + offset
+                    target.write(chunk)
+            offset += rows + rejected
+        if writer.rows == 0:
+            writer.write(pd.DataFrame(columns=RESULT_COLUMNS))
+        rejected_rows = rejects_writer.rows
+
+    os.replace(tmp_output, output_file)
+    if rejected_rows:
+        os.replace(tmp_rejected, rejected_path(output_file))
+    elif os.path.exists(rejected_path(output_file)):
+        os.remove(rejected_path(output_file))
+    logger.info(f"Shardy scalone w {output_file}")
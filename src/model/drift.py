@@ -0,0 +1,65 @@
+import json
+import numpy as np
+import pandas as pd
+
+# Profil danych treningowych i dryf (PSI) nowych porcji danych względem niego.
+# Profil liczymy na macierzy cech (po build_features), więc nowe dane przechodzą dokładnie
+# to samo kodowanie co dane treningowe.
+
+PROFILE_PATH = "models/training_profile.json"
+PSI_BINS = 10
+PSI_EPS = 1e-4  # zamiast zera w udziałach (log(0))
+
+def psi(expected, actual) -> float:
+    #Population Stability Index dwóch rozkładów (udziały w tych samych koszykach)
+    expected = np.clip(np.asarray(expected, dtype=np.float64), PSI_EPS, None)
+    actual = np.clip(np.asarray(actual, dtype=np.float64), PSI_EPS, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+def _numeric_shares(values: np.ndarray, edges: list) -> np.ndarray:
+    # Koszyki: (-inf, e1), [e1, e2), ..., [ek, inf)
+    counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+    return counts / max(len(values), 1)
+
+def _category_shares(X: pd.DataFrame, field: str, values: list) -> np.ndarray:
+    # Udział każdej kategorii + ostatni koszyk: wiersze bez żadnej znanej kategorii (same zera)
+    onehot = X[[f"{field}_{value}" for value in values]].to_numpy(dtype=np.float32)
+    shares = onehot.mean(axis=0) if len(X) else np.zeros(len(values))
+    return np.append(shares, max(0.0, 1.0 - float(shares.sum())))
+
+def build_profile(X: pd.DataFrame, categories: dict, metrics: dict = None, bins: int = PSI_BINS) -> dict:
+    """
+    Profil macierzy cech: koszyki kwantylowe i udziały dla kolumn numerycznych,
+    udziały kategorii dla pól one-hot (categories jak models/categories.json), plus metryki modelu.
+    """
+    encoded = {f"{field}_{value}" for field, values in categories.items() for value in values}
+    numeric = {}
+    for col in [c for c in X.columns if c not in encoded]:
+        values = X[col].to_numpy(dtype=np.float64)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])).tolist()
+        numeric[col] = {"edges": edges, "shares": _numeric_shares(values, edges).tolist()}
+
+    return {
+        "rows": int(len(X)),
+        "numeric": numeric,
+        "categorical": {field: {"values": list(values), "shares": _category_shares(X, field, values).tolist()}
+                        for field, values in categories.items()},
+        "metrics": metrics or {},
+    }
+
+def save_profile(profile: dict, path: str = PROFILE_PATH):
+    with open(path, "w") as f:
+        json.dump(profile, f, indent=2)
+
+def load_profile(path: str = PROFILE_PATH) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+def drift_report(profile: dict, X: pd.DataFrame) -> dict:
+    #PSI każdej kolumny numerycznej i każdego pola kategorycznego nowych danych względem profilu
+    report = {}
+    for col, ref in profile["numeric"].items():
+        report[col] = psi(ref["shares"], _numeric_shares(X[col].to_numpy(dtype=np.float64), ref["edges"]))
+    for field, ref in profile["categorical"].items():
+        report[field] = psi(ref["shares"], _category_shares(X, field, ref["values"]))
+    return report
@@ -1,15 +1,237 @@
-import xgboost as xgb
+import argparse
+import json
+import os
+import time
+import numpy as np
 import pandas as pd
-from sklearn.metrics import classification_report
+import xgboost as xgb
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from src.features.feature_cache import load_features
+from src.model.threshold_search import threshold_curve, fbeta_scores
+from src.model.train_model import load_params
+from src.profiling import stage
 from src.utils import get_logger
 
-# Ten skrypt zakłada, że masz osobny zbiór testowy, 
-# ale dla uproszczenia tutoriala często go pomijamy,
-# bo MLflow robi robotę w train_model.py.
-# Zostawmy go jako placeholder na przyszłość.
+logger = get_logger("EVALUATION")
+
+# Ewaluacja krzyżowa (stratified k-fold) modelu z parametrami treningu: stabilny próg F2 z przedziałem ufności,
+# Recall / Precision / F2 w tym progu i kalibracja prawdopodobieństw.
+# Jedna macierz cech (cache) dla wszystkich foldów; foldy trenowane równolegle w wątkach
+# (XGBoost zwalnia GIL), wątki XGBoost dzielone między foldy jak w tuningu.
+
+THRESHOLDS = np.arange(0.1, 0.9, 0.01)  # ta sama siatka co w train_model
+N_BOOTSTRAP = 1000
+CONFIDENCE = 0.95
+CALIBRATION_BINS = 10
+REPORT_PATH = "reports/evaluation.json"
+
+def _grid_counts(y_true, y_score, thresholds) -> np.ndarray:
+    """
+    Liczności (2, len(thresholds) + 1): pozytywne / negatywne wg liczby progów siatki <= wynik.
+    Reguła "score >= próg" dla progu j <=> koszyk > j, więc krzywa dla dowolnych wag wierszy
+    to sumy skumulowane koszyków (bez ponownego sortowania).
+    """
+    bins = np.searchsorted(thresholds, np.asarray(y_score, dtype=np.float64), side="right")
+    y_true = np.asarray(y_true).astype(bool)
+    size = len(thresholds) + 1
+    return np.stack([np.bincount(bins[y_true], minlength=size), np.bincount(bins[~y_true], minlength=size)])
+
+def _curves_from_counts(counts: np.ndarray, beta: float = 2.0) -> dict:
+    #Precision / Recall / F-beta na siatce progów z liczności (..., 2, progi + 1) - dowolne wymiary wiodące
+    tail = np.cumsum(counts[..., ::-1], axis=-1)[..., ::-1].astype(np.float64)
+    tp, fp = tail[..., 0, 1:], tail[..., 1, 1:]
+    positives = tail[..., 0, :1]
+    predicted = tp + fp
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, positives, out=np.zeros_like(tp), where=positives > 0)
+    return {"precision": precision, "recall": recall, "fbeta": fbeta_scores(precision, recall, beta)}
+
+def _bootstrap_counts(counts: np.ndarray, n_bootstrap: int, rng) -> np.ndarray:
+    """
+    Próby bootstrap foldu (losowanie wierszy ze zwracaniem) wprost na licznościach koszyków:
+    liczności komórek (klasa, koszyk) próby mają rozkład wielomianowy - koszt O(n_bootstrap * progi), nie O(n).
+    Zwraca (n_bootstrap, 2, progi + 1).
+    """
+    flat = counts.ravel()
+    n = int(flat.sum())
+    return rng.multinomial(n, flat / n, size=n_bootstrap).reshape((n_bootstrap,) + counts.shape)
+
+def _calibration(y_true, y_prob, n_bins: int = CALIBRATION_BINS) -> dict:
+    #Brier, ECE (koszyki równej szerokości) i tabela niezawodności dla predykcji spoza foldu treningowego
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_prob = np.asarray(y_prob, dtype=np.float64)
+    bins = np.minimum((y_prob * n_bins).astype(np.int64), n_bins - 1)
+    count = np.bincount(bins, minlength=n_bins)
+    prob_sum = np.bincount(bins, weights=y_prob, minlength=n_bins)
+    true_sum = np.bincount(bins, weights=y_true, minlength=n_bins)
+    filled = count > 0
+    mean_prob = np.divide(prob_sum, count, out=np.zeros(n_bins), where=filled)
+    observed = np.divide(true_sum, count, out=np.zeros(n_bins), where=filled)
+    return {
+        "brier": float(np.mean((y_prob - y_true) ** 2)),
+        "ece": float(np.sum(count * np.abs(mean_prob - observed)) / len(y_prob)),
+        "bins": [{"lower": idx / n_bins, "upper": (idx + 1) / n_bins, "count": int(count[idx]),
+                  "mean_predicted": float(mean_prob[idx]), "observed_rate": float(observed[idx])}
+                 for idx in np.flatnonzero(filled)],
+    }
+
+def _average_precision(y_true, y_score) -> float:
+    #Pole pod krzywą Precision-Recall (dokładne cięcia, jak average_precision_score w sklearn)
+    curve = threshold_curve(y_true, y_score)
+    return float(np.sum(np.diff(curve["recall"], prepend=0.0) * curve["precision"]))
+
+def _summary(values, ci: tuple = None) -> dict:
+    values = np.asarray(values, dtype=np.float64)
+    summary = {"mean": float(values.mean()), "std": float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+               "folds": values.tolist()}
+    if ci is not None:
+        summary["ci_low"], summary["ci_high"] = float(ci[0]), float(ci[1])
+    return summary
+
+def _fit_fold(X, y, train_idx, test_idx, params: dict, nthread: int) -> tuple:
+    #Trening na części treningowej foldu (parametry jak XGBClassifier w train_model) -> (prawdopodobieństwa, czas)
+    start = time.perf_counter()
+    booster_params = {key: value for key, value in params.items() if key != "n_estimators"}
+    booster_params["nthread"] = nthread
+    dtrain = xgb.QuantileDMatrix(X[train_idx], label=y[train_idx], nthread=nthread)
+    booster = xgb.train(booster_params, dtrain, num_boost_round=int(params["n_estimators"]))
+    probs = booster.inplace_predict(X[test_idx])
+    return probs, time.perf_counter() - start
 
-def evaluate_model():
-    print("Ewaluacja jest wykonywana bezpośrednio w train_model.py i logowana do MLflow.")
+def evaluate_model(df: pd.DataFrame = None, data_path: str = 'data/raw/Telco-Customer-Churn.csv',
+                   n_splits: int = 5, n_jobs: int = None, seed: int = 42, n_bootstrap: int = N_BOOTSTRAP,
+                   params: dict = None, target_col: str = 'churn') -> dict:
+    """
+    Stratified k-fold na jednej macierzy cech (z pipeline'u albo z cache).
+    Stabilny próg = argmax średniej krzywej F2 foldów; przedział ufności progu i metryk w tym progu
+    z bootstrapu wierszy w każdym foldzie (percentyle). n_jobs=None -> tyle foldów naraz, ile rdzeni.
+    Zwraca raport (słownik gotowy do zapisu w JSON).
+    """
+    start = time.perf_counter()
+    if df is None:
+        df = load_features(data_path)
+    params = params or load_params()
+
+    # Jedna macierz float32 dla wszystkich foldów (XGBoost i tak liczy na float32)
+    X = df.drop(columns=[target_col]).to_numpy(dtype=np.float32)
+    y = df[target_col].to_numpy().astype(np.int64)
+
+    folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed).split(X, y))
+    n_jobs = max(1, min(n_splits, n_jobs or os.cpu_count() or 1))
+    nthread = max(1, (os.cpu_count() or 1) // n_jobs)
+    logger.info(f"Ewaluacja krzyżowa: {n_splits} foldów, {len(y)} wierszy, "
+                f"foldy równolegle: {n_jobs}, wątki XGBoost na fold: {nthread}")
+
+    with stage("folds"):
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(lambda fold: _fit_fold(X, y, fold[0], fold[1], params, nthread), folds))
+    fit_seconds = [seconds for _, seconds in results]
+
+    # Krzywe Precision-Recall / F2 wszystkich foldów na wspólnej siatce progów
+    with stage("threshold_search"):
+        counts = np.stack([_grid_counts(y[test_idx], probs, THRESHOLDS)
+                           for (_, test_idx), (probs, _) in zip(folds, results)])  # (foldy, 2, progi + 1)
+        curves = _curves_from_counts(counts)
+        mean_f2 = curves["fbeta"].mean(axis=0)
+        best_idx = int(np.argmax(mean_f2))
+        threshold = float(THRESHOLDS[best_idx])
+        fold_best = THRESHOLDS[np.argmax(curves["fbeta"], axis=1)]
+
+    # Bootstrap: te same kroki (średnia krzywa foldów -> argmax) na próbach wierszy każdego foldu
+    with stage("bootstrap"):
+        rng = np.random.default_rng(seed)
+        boot = _curves_from_counts(np.stack([_bootstrap_counts(c, n_bootstrap, rng) for c in counts], axis=1))
+        alpha = (1 - CONFIDENCE) / 2 * 100
+        quantiles = (alpha, 100 - alpha)
+        boot_thresholds = THRESHOLDS[np.argmax(boot["fbeta"].mean(axis=1), axis=1)]
+        threshold_ci = np.percentile(boot_thresholds, quantiles)
+        at_threshold = {name: (curves[key][:, best_idx], np.percentile(boot[key][:, :, best_idx].mean(axis=1), quantiles))
+                        for name, key in (("recall", "recall"), ("precision", "precision"), ("f2", "fbeta"))}
+
+    with stage("calibration"):
+        oof = np.empty(len(y), dtype=np.float64)
+        for (_, test_idx), (probs, _) in zip(folds, results):
+            oof[test_idx] = probs
+        fold_scores = [(y[test_idx], probs) for (_, test_idx), (probs, _) in zip(folds, results)]
+        calibration = _calibration(y, oof)
+
+    metrics = {name: _summary(values, ci) for name, (values, ci) in at_threshold.items()}
+    metrics["roc_auc"] = _summary([roc_auc_score(y_fold, p) for y_fold, p in fold_scores])
+    metrics["average_precision"] = _summary([_average_precision(y_fold, p) for y_fold, p in fold_scores])
+    metrics["brier"] = _summary([_calibration(y_fold, p)["brier"] for y_fold, p in fold_scores])
+    metrics["ece"] = _summary([_calibration(y_fold, p)["ece"] for y_fold, p in fold_scores])
+
+    report = {
+        "n_splits": n_splits,
+        "n_rows": int(len(y)),
+        "positives": int(y.sum()),
+        "seed": seed,
+        "confidence": CONFIDENCE,
+        "n_bootstrap": n_bootstrap,
+        "params": params,
+        "threshold": {
+            "value": threshold,
+            "ci_low": float(threshold_ci[0]),
+            "ci_high": float(threshold_ci[1]),
+            "fold_best": _summary(fold_best),
+        },
+        "metrics": metrics,
+        "calibration": calibration,
+        "curve": {
+            "thresholds": THRESHOLDS.tolist(),
+            "f2_mean": mean_f2.tolist(),
+            "f2_std": curves["fbeta"].std(axis=0, ddof=1).tolist() if n_splits > 1 else [0.0] * len(THRESHOLDS),
+        },
+        "timing": {"wall_s": time.perf_counter() - start, "fit_s": fit_seconds, "n_jobs": n_jobs, "nthread": nthread},
+    }
+    logger.info(f"Stabilny próg (F2): {threshold:.2f} ({CONFIDENCE:.0%} CI {threshold_ci[0]:.2f}-{threshold_ci[1]:.2f}); "
+                f"Recall {metrics['recall']['mean']:.4f}, Precision {metrics['precision']['mean']:.4f}, "
+                f"F2 {metrics['f2']['mean']:.4f}, Brier {calibration['brier']:.4f}, ECE {calibration['ece']:.4f}")
+    logger.info(f"Czas ewaluacji: {report['timing']['wall_s']:.1f} s (trening foldów: {sum(fit_seconds):.1f} s łącznie)")
+    return report
+
+def save_report(report: dict, path: str = REPORT_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Raport ewaluacji zapisany w {path}")
+
+def log_to_mlflow(report: dict, report_path: str = None):
+    #Osobny run MLflow z metrykami cv_* (średnie foldów i granice przedziałów ufności)
+    import mlflow
+    mlflow.set_experiment("Telco_Churn_Pro_Edition")
+    metrics = {"cv_threshold": report["threshold"]["value"],
+               "cv_threshold_ci_low": report["threshold"]["ci_low"],
+               "cv_threshold_ci_high": report["threshold"]["ci_high"],
+               "cv_calibration_ece": report["calibration"]["ece"],
+               "cv_wall_s": report["timing"]["wall_s"]}
+    for name, summary in report["metrics"].items():
+        metrics[f"cv_{name}"] = summary["mean"]
+        metrics[f"cv_{name}_std"] = summary["std"]
+        if "ci_low" in summary:
+            metrics[f"cv_{name}_ci_low"] = summary["ci_low"]
+            metrics[f"cv_{name}_ci_high"] = summary["ci_high"]
+    with mlflow.start_run(run_name="cv_evaluation"):
+        mlflow.log_params({"cv_folds": report["n_splits"], "cv_seed": report["seed"], **report["params"]})
+        mlflow.log_metrics(metrics)
+        if report_path is not None:
+            mlflow.log_artifact(report_path, artifact_path="evaluation")
 
 if __name__ == "__main__":
-    evaluate_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ewaluacja krzyżowa modelu: stabilny próg F2, metryki, kalibracja")
+    parser.add_argument("--data", default='data/raw/Telco-Customer-Churn.csv', help="Plik .csv / .parquet / .arrow")
+    parser.add_argument("--folds", type=int, default=5, help="Liczba foldów (stratified k-fold)")
+    parser.add_argument("--jobs", type=int, default=None, help="Foldy liczone równolegle (domyślnie: liczba rdzeni)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--bootstrap", type=int, default=N_BOOTSTRAP, help="Liczba prób bootstrap dla przedziałów")
+    parser.add_argument("--output", default=REPORT_PATH, help="Raport JSON")
+    parser.add_argument("--no-mlflow", action="store_true", help="Bez zapisu runu w MLflow")
+    args = parser.parse_args()
+
+    report = evaluate_model(data_path=args.data, n_splits=args.folds, n_jobs=args.jobs, seed=args.seed,
+                            n_bootstrap=args.bootstrap)
+    save_report(report, args.output)
+    if not args.no_mlflow:
+        log_to_mlflow(report, args.output)
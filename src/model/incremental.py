@@ -0,0 +1,193 @@
+import argparse
+import math
+import os
+import mlflow
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+from src.data.load_data import load_data
+from src.data.preprocess import preprocess_data
+from src.features.build_features import CATEGORIES_PATH, build_features
+from src.features.encoding_plan import EncodingPlan, load_category_table
+from src.model.drift import PROFILE_PATH, drift_report, load_profile, save_profile
+from src.model.threshold_search import best_threshold
+from src.model.train_model import load_params, save_artifacts, train_model
+from src.utils import get_logger
+
+logger = get_logger("INCREMENTAL")
+
+MODEL_PATH = "models/xgb_model.json"
+DEFAULT_ROUNDS = 50        # nowe drzewa na jedną porcję danych
+DEFAULT_MAX_PSI = 0.2      # PSI > 0.2 = istotna zmiana rozkładu
+DEFAULT_MAX_F2_DROP = 0.05  # dopuszczalny spadek F2 względem ostatniego pełnego treningu
+MIN_CLASS_ROWS = 10        # minimum wierszy każdej klasy w porcji (podział na trening i holdout z obiema klasami)
+TEST_SIZE = 0.2            # holdout w train_model - do sprawdzenia, że --history to dane ostatniego pełnego treningu
+
+class FullRetrainRequired(Exception):
+    #Porcja danych nie nadaje się do douczenia - potrzebny pełny trening (powód w komunikacie)
+    pass
+
+def find_new_categories(df: pd.DataFrame, categories: dict) -> dict:
+    #Pole -> kategorie, których encoder nie zna (one-hot dałby dla nich same zera)
+    new = {}
+    for field, known in categories.items():
+        if field in df.columns:
+            unseen = set(df[field].dropna().astype(str).unique()) - set(known)
+            if unseen:
+                new[field] = sorted(unseen)
+    return new
+
+def continue_training(df_delta: pd.DataFrame, rounds: int = DEFAULT_ROUNDS, max_psi: float = DEFAULT_MAX_PSI,
+                      max_f2_drop: float = DEFAULT_MAX_F2_DROP, holdout_size: float = 0.2,
+                      target_col: str = "churn") -> str:
+    """
+    Douczenie bieżącego modelu (warm start: kolejne `rounds` drzew) na nowej porcji danych po preprocess_data.
+    Próg F2 jest liczony od nowa wyłącznie na świeżym holdoucie z tej porcji.
+    FullRetrainRequired, gdy: pojawiły się nowe kategorie, PSI którejś cechy > max_psi
+    albo F2 na holdoucie spadło o więcej niż max_f2_drop względem ostatniego pełnego treningu.
+    Zwraca wersję opublikowanej paczki.
+    """
+    if not os.path.exists(PROFILE_PATH):
+        raise FullRetrainRequired(f"brak profilu danych treningowych ({PROFILE_PATH})")
+    profile = load_profile()
+    categories = load_category_table(CATEGORIES_PATH)
+
+    # 1. Nowe kategorie zmieniają zestaw kolumn one-hot - tego nie da się dołożyć do istniejących drzew
+    new_categories = find_new_categories(df_delta, categories)
+    if new_categories:
+        raise FullRetrainRequired(f"nowe kategorie: {new_categories}")
+
+    # 2. To samo kodowanie co przy serwowaniu, w kolejności cech modelu
+    booster = xgb.Booster(model_file=MODEL_PATH)
+    plan = EncodingPlan.from_category_table(categories, booster.feature_names)
+    X = pd.DataFrame(plan.encode_frame(df_delta), columns=booster.feature_names, copy=False)
+    y = df_delta[target_col].to_numpy()
+
+    # Podział ze stratyfikacją potrzebuje obu klas w treningu i w holdoucie
+    classes, counts = np.unique(y, return_counts=True)
+    if len(classes) < 2 or counts.min() < MIN_CLASS_ROWS:
+        raise FullRetrainRequired(f"za mało danych / jedna klasa w porcji "
+                                  f"({len(y)} wierszy, klasy: {dict(zip(classes.tolist(), counts.tolist()))})")
+
+    # 3. Dryf względem danych ostatniego pełnego treningu
+    psi = drift_report(profile, X)
+    worst = max(psi, key=psi.get)
+    logger.info(f"Dryf (PSI): najwyższy {worst}={psi[worst]:.3f}")
+    if psi[worst] > max_psi:
+        raise FullRetrainRequired(f"dryf cechy {worst}: PSI {psi[worst]:.3f} > {max_psi}")
+
+    X_train, X_holdout, y_train, y_holdout = train_test_split(
+        X, y, test_size=holdout_size, random_state=42, stratify=y)
+
+    # 4. Warm start: te same parametry, nowe drzewa dokładane do istniejących
+    params = load_params()
+    params.pop("n_estimators", None)
+    grid = np.arange(0.1, 0.9, 0.01)
+    before = best_threshold(y_holdout, booster.inplace_predict(X_holdout), thresholds=grid)
+    updated = xgb.train(params, xgb.DMatrix(X_train, label=y_train), num_boost_round=rounds, xgb_model=booster)
+
+    # 5. Próg i F2 tylko na świeżym holdoucie
+    after = best_threshold(y_holdout, updated.inplace_predict(X_holdout), thresholds=grid)
+    baseline_f2 = profile["metrics"].get("f2")
+    logger.info(f"F2 na holdoucie: przed {before['fbeta']:.4f}, po {after['fbeta']:.4f} "
+                f"(pełny trening: {baseline_f2}), próg {after['threshold']:.2f}")
+    if baseline_f2 is not None and baseline_f2 - after["fbeta"] > max_f2_drop:
+        raise FullRetrainRequired(f"spadek F2: {baseline_f2:.4f} -> {after['fbeta']:.4f}")
+
+    metrics = {
+        "recall": after["recall"],
+        "precision": after["precision"],
+        "f2": after["fbeta"],
+        "f2_before_update": before["fbeta"],
+        "threshold": after["threshold"],
+        "psi_max": psi[worst],
+    }
+
+    mlflow.set_experiment("Telco_Churn_Pro_Edition")
+    with mlflow.start_run() as run:
+        mlflow.set_tag("training_mode", "incremental")
+        mlflow.log_params({"rounds": rounds, "delta_rows": len(df_delta), "total_trees": updated.num_boosted_rounds()})
+        mlflow.log_metrics({**metrics, **{f"psi_{name}": value for name, value in psi.items()}})
+        mlflow.xgboost.log_model(xgb_model=updated, name="model")
+        version = save_artifacts(updated, after["threshold"],
+                                 {"mlflow_run_id": run.info.run_id, "training_mode": "incremental", **metrics})
+        mlflow.set_tag("model_bundle", version)
+    return version
+
+def _load_applied_delta(delta: dict) -> pd.DataFrame:
+    #Porcja wliczona już w bieżący model - musi istnieć i mieć tyle samo wierszy co przy douczeniu
+    if not os.path.exists(delta["path"]):
+        raise FileNotFoundError(f"Brak porcji {delta['path']} wliczonej w bieżący model - pełny trening bez niej "
+                                f"miałby mniej danych niż model, który zastępuje")
+    df = load_data(delta["path"])
+    if len(df) != delta["rows"]:
+        raise ValueError(f"Porcja {delta['path']} zmieniła się: {len(df)} wierszy, przy douczeniu {delta['rows']}")
+    return df
+
+def _check_history(profile: dict, history_rows: int, deltas: list):
+    """
+    Dane ostatniego pełnego treningu = history + porcje wliczone pełnym treningiem;
+    ich część treningowa (bez holdoutu train_model) musi mieć tyle wierszy, ile zapisano w profilu.
+    """
+    if "rows" not in profile:
+        return
+    full_rows = history_rows + sum(d["rows"] for d in deltas if d["mode"] == "full")
+    expected = full_rows - math.ceil(TEST_SIZE * full_rows)
+    if expected != profile["rows"]:
+        raise ValueError(f"--history ({history_rows} wierszy) nie odpowiada danym ostatniego pełnego treningu: "
+                         f"{expected} wierszy treningowych zamiast {profile['rows']} z profilu {PROFILE_PATH}")
+
+def _record_deltas(deltas: list):
+    #Lista porcji wliczonych w bieżący model zapisana w profilu danych (pełny trening bez tej listy ją zeruje)
+    profile = load_profile()
+    profile["deltas"] = deltas
+    save_profile(profile)
+
+def train_incremental(delta_path: str, history_path: str = None, rounds: int = DEFAULT_ROUNDS,
+                      max_psi: float = DEFAULT_MAX_PSI, max_f2_drop: float = DEFAULT_MAX_F2_DROP,
+                      compact: bool = False) -> dict:
+    """
+    Trening przyrostowy z porcji danych delta_path; gdy strażnik (nowe kategorie, dryf, spadek F2) go odrzuci -
+    pełny trening na history_path + wszystkich porcjach wliczonych już w model + delta_path
+    (encoder uczony od nowa, nowy profil danych).
+    history_path: dane ostatniego pełnego treningu z run_pipeline (bez porcji - te są zapisane w profilu).
+    Zwraca {"mode": "incremental" | "full", "reason": ...}.
+    """
+    profile = load_profile() if os.path.exists(PROFILE_PATH) else {}
+    deltas = profile.get("deltas", [])
+    df_delta_raw = load_data(delta_path)
+    entry = {"path": os.path.abspath(delta_path), "rows": int(len(df_delta_raw))}
+    try:
+        continue_training(preprocess_data(df_delta_raw), rounds=rounds, max_psi=max_psi, max_f2_drop=max_f2_drop)
+        _record_deltas(deltas + [{**entry, "mode": "incremental"}])
+        logger.info("Model douczony na nowej porcji danych.")
+        return {"mode": "incremental", "reason": None}
+    except FullRetrainRequired as e:
+        reason = str(e)
+
+    logger.warning(f"Douczenie odrzucone ({reason}) - pełny trening.")
+    if history_path is None:
+        raise FullRetrainRequired(f"{reason}; do pełnego treningu potrzebne są dane historyczne")
+    df_history = load_data(history_path)
+    _check_history(profile, len(df_history), deltas)
+    applied = [_load_applied_delta(delta) for delta in deltas]
+    if deltas:
+        logger.info(f"Pełny trening z {len(deltas)} wcześniejszymi porcjami: {[d['path'] for d in deltas]}")
+
+    df = pd.concat([df_history, *applied, df_delta_raw], ignore_index=True)
+    train_model(build_features(preprocess_data(df), train_mode=True, compact=compact))
+    _record_deltas([{**delta, "mode": "full"} for delta in deltas] + [{**entry, "mode": "full"}])
+    return {"mode": "full", "reason": reason}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Douczenie modelu na nowej porcji danych")
+    parser.add_argument("--delta", required=True, help="Nowe dane z etykietami (.csv / .parquet / .arrow)")
+    parser.add_argument("--history", default=None, help="Dane ostatniego pełnego treningu (run_pipeline --data) - do pełnego treningu awaryjnego")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--max-psi", type=float, default=DEFAULT_MAX_PSI)
+    parser.add_argument("--max-f2-drop", type=float, default=DEFAULT_MAX_F2_DROP)
+    args = parser.parse_args()
+
+    train_incremental(args.delta, args.history, rounds=args.rounds, max_psi=args.max_psi,
+                      max_f2_drop=args.max_f2_drop)
@@ -1,66 +1,206 @@
+import numpy as np
 import pandas as pd
-import xgboost as xgb
+import argparse
+import multiprocessing
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from src.utils import get_logger
 
 # importuje logikę:
+from src.data.load_data import iter_data, read_columns, split_data_parts, read_data_part
 from src.data.preprocess import preprocess_data
-from src.features.build_features import build_features
+from src.data.save_data import ChunkWriter
+from src.serving.explain import EXPLAIN_TOP_K
+from src.serving.inference import ChurnModel
 
 logger = get_logger("PREDICT_MODEL")
 
-def make_batch_predictions(input_file: str, output_file: str):
+# Ile wierszy wczytujemy i liczymy naraz - pamięć zależy od tej liczby, a nie od rozmiaru pliku
+DEFAULT_CHUNKSIZE = 100_000
+
+RESULT_COLUMNS = ['customerID', 'prediction', 'probability']
+REJECTED_COLUMNS = ['customerID', 'reasons']
+
+def rejected_path(output_file: str) -> str:
+    #Plik z odrzuconymi wierszami obok wyników: predictions.csv -> predictions.rejected.csv
+    root, ext = os.path.splitext(output_file)
+    return f"{root}.rejected{ext}"
+
+def explanation_columns(model: ChurnModel, contributions, k: int = EXPLAIN_TOP_K) -> dict:
     """
-    Wczytuje surowe dane CSV, przepuszcza przez ten sam pipeline co trening,
-    i generuje predykcje.
+    Kolumny wyjaśnień dla wyników wsadowych: contrib_<pole> (wkład w log-odds) dla każdego pola klienta
+    i reason_1..reason_k - pola o największym dodatnim wkładzie (puste, gdy wkład <= 0). Bez pętli po wierszach.
     """
-    # 1. Ładowanie danych
-    if not os.path.exists(input_file):
-        raise FileNotFoundError(f"Brak pliku: {input_file}")
-    
-    df_raw = pd.read_csv(input_file)
-    logger.info(f"Wczytano {len(df_raw)} wierszy.")
+    explainer = model.explainer
+    columns = {f"contrib_{field}": contributions[:, idx] for idx, field in enumerate(explainer.fields)}
+    order, top = explainer.top_reasons(contributions, k)
+    names = np.array(explainer.fields, dtype=object)[order]
+    for i in range(order.shape[1]):
+        columns[f"reason_{i + 1}"] = np.where(top[:, i] > 0, names[:, i], "")
+    return columns
 
+def score_chunk(model: ChurnModel, df_raw: pd.DataFrame, validate: bool = True, explain: bool = False) -> tuple:
+    """
+    Liczy predykcje dla jednej porcji surowych danych.
+    Ten sam preprocessing co przy treningu, kodowanie encoderem z pamięci
+    i JEDNO przejście modelu (predykcja = prawdopodobieństwo > 0.5, jak XGBClassifier.predict).
+    validate=True: wiersze niezgodne ze schematem danych treningowych nie są liczone.
+    explain=True: dodatkowe kolumny wyjaśnień z jednego przebiegu pred_contribs na porcję (explanation_columns).
+    Zwraca (wyniki, odrzucone wiersze z powodami albo None).
+    """
     # Zachowaj ID do wyników, jeśli istnieją
     customer_ids = df_raw['customerID'] if 'customerID' in df_raw.columns else df_raw.index
+    customer_ids = pd.Series(customer_ids).reset_index(drop=True)
+
+    # Wartości nieliczbowe (np. TotalCharges = "abc") zapamiętane przed zamianą na 0 - walidacja je odrzuca
+    unparsed = {}
+    df_clean = preprocess_data(df_raw, unparsed=unparsed if validate else None)
+    probs, mask, contributions = model.score_frame(df_clean, validate=validate, explain=explain, unparsed=unparsed)
 
-    # 2. REUŻYCIE PIPELINE'U (Preprocessing)
-    # To samo czyszczenie co przy treningu!
-    df_clean = preprocess_data(df_raw)
-    
-    # 3. REUŻYCIE PIPELINE'U (Feature Engineering)
-    # train_mode=False -> ładuje zapisany encoder z folderu models/
-    try:
-        df_features = build_features(df_clean, train_mode=False)
-    except Exception as e:
-        logger.error(f"Błąd podczas budowania cech. Czy uruchomiłeś trening? {e}")
-        return
-
-    # 4. Ładowanie modelu
-    model_path = "models/xgb_model.json"
-    if not os.path.exists(model_path):
-        raise FileNotFoundError("Brak modelu! Uruchom 'run_pipeline.py' najpierw.")
-    
-    model = xgb.XGBClassifier()
-    model.load_model(model_path)
-    
-    # Upewnij się, że nie ma kolumny target w danych do predykcji (xgboost by zgłupiał)
-    if 'churn' in df_features.columns:
-        df_features = df_features.drop(columns=['churn'])
-
-    # 5. Predykcja
-    preds = model.predict(df_features)
-    probs = model.predict_proba(df_features)[:, 1]
-    
-    # 6. Zapis
     results = pd.DataFrame({
         'customerID': customer_ids,
-        'prediction': preds,
-        'probability': probs
+        'prediction': (probs > 0.5).astype(int),
+        'probability': probs,
+        **(explanation_columns(model, contributions) if explain else {}),
     })
-    
-    results.to_csv(output_file, index=False)
-    logger.info(f"✅ Wyniki zapisane w {output_file}")
+    if not mask.any():
+        return results, None
+
+    rejected = mask != 0
+    rejects = pd.DataFrame({
+        'customerID': customer_ids[rejected].reset_index(drop=True),
+        'reasons': model.schema.reason_strings(mask[rejected]),
+    })
+    return results[~rejected].reset_index(drop=True), rejects
+
+# --- Tryb wieloprocesowy: każdy worker wczytuje model i encoder raz ---
+_worker_model = None
+
+def _init_worker(nthread: int, bundle_dir: str = None):
+    global _worker_model
+    # Ta sama paczka co w procesie głównym (a nie "bieżąca" w chwili startu workera)
+    _worker_model = ChurnModel(bundle_dir)
+    _worker_model.set_nthread(nthread)
+
+def _score_part(input_file: str, part: tuple, columns: list, validate: bool, explain: bool) -> tuple:
+    # Worker sam czyta i parsuje swoją część pliku - parsowanie też idzie równolegle
+    return score_chunk(_worker_model, read_data_part(input_file, part, columns=columns), validate, explain)
+
+def input_columns(input_file: str, model: ChurnModel = None) -> list:
+    """
+    Projekcja kolumn: wczytujemy tylko customerID i cechy, których używa model
+    (np. bez kolumny Churn). Bez modelu - wszystkie kolumny z pliku.
+    """
+    columns = read_columns(input_file)
+    if model is None:
+        return columns
+    needed = set(model.num_cols) | set(model.cat_cols) | {"customerid"}
+    return [c for c in columns if c.lower().replace(" ", "_") in needed]
+
+def _make_batch_predictions_parallel(input_file: str, writer: ChunkWriter, rejects_writer: ChunkWriter,
+                                     chunksize: int, workers: int, validate: bool, explain: bool) -> int:
+    parts = split_data_parts(input_file, chunksize)
+    model = ChurnModel()
+    columns = input_columns(input_file, model)
+    has_ids = 'customerID' in columns
+    nthread = max(1, (os.cpu_count() or 1) // workers)
+    logger.info(f"Tryb równoległy: {workers} workerów, {len(parts)} części pliku, model {model.version}")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(nthread, model.bundle_dir)) as pool:
+        # Ograniczona liczba zadań w locie (pamięć) + zapis w oryginalnej kolejności wierszy
+        pending = deque()
+        remaining = iter(parts)
+
+        def submit_next():
+            for part in remaining:
+                pending.append(pool.submit(_score_part, input_file, part, columns, validate, explain))
+                return
+
+        for _ in range(2 * workers):
+            submit_next()
+
+        i = 0
+        processed = 0
+        while pending:
+            results, rejects = pending.popleft().result()
+            submit_next()
+
+            if not has_ids:
+                # Bez customerID identyfikatorem jest globalny numer wiersza
+                results['customerID'] += processed
+                if rejects is not None:
+                    rejects['customerID'] += processed
+            processed += len(results) + (len(rejects) if rejects is not None else 0)
+            writer.write(results)
+            if rejects is not None:
+                rejects_writer.write(rejects)
+            i += 1
+            logger.info(f"Część {i}/{len(parts)}: {len(results)} wierszy (łącznie {writer.rows})")
+
+    return writer.rows
+
+def make_batch_predictions(input_file: str, output_file: str, chunksize: int = DEFAULT_CHUNKSIZE,
+                           workers: int = 1, validate: bool = True, explain: bool = False) -> int:
+    """
+    Wczytuje surowe dane (CSV / Parquet / Arrow IPC) porcjami, przepuszcza przez ten sam
+    pipeline co trening i dopisuje predykcje do pliku wynikowego na bieżąco (stałe zużycie pamięci).
+    Format wyniku wynika z rozszerzenia output_file (.csv / .parquet / .arrow).
+    workers > 1: plik jest dzielony na części liczone w osobnych procesach,
+    a wyniki są scalane w oryginalnej kolejności wierszy.
+    validate=True: wiersze niezgodne ze schematem trafiają z powodami do pliku *.rejected.* zamiast do wyników.
+    explain=True: wyniki z kolumnami wkładów pól i głównych powodów (explanation_columns).
+    Zwraca liczbę wierszy z predykcją.
+    """
+    # 1. Ładowanie danych
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"Brak pliku: {input_file}")
+
+    # Plik odrzuconych powstaje tylko, gdy są odrzucone wiersze - nie zostawiamy starego z poprzedniego uruchomienia
+    if os.path.exists(rejected_path(output_file)):
+        os.remove(rejected_path(output_file))
+
+    with ChunkWriter(output_file) as writer, ChunkWriter(rejected_path(output_file)) as rejects_writer:
+        if workers > 1:
+            _make_batch_predictions_parallel(input_file, writer, rejects_writer, chunksize, workers, validate, explain)
+        else:
+            # 2. Ładowanie modelu i encodera (raz, dla wszystkich porcji)
+            try:
+                model = ChurnModel()
+            except Exception as e:
+                logger.error(f"Nie udało się wczytać artefaktów. Czy uruchomiłeś trening? {e}")
+                raise
+
+            # 3. Predykcja porcjami + zapis przyrostowy
+            columns = input_columns(input_file, model)
+            for i, chunk in enumerate(iter_data(input_file, chunksize, columns=columns)):
+                results, rejects = score_chunk(model, chunk, validate, explain)
+                writer.write(results)
+                if rejects is not None:
+                    rejects_writer.write(rejects)
+                logger.info(f"Porcja {i + 1}: {len(results)} wierszy (łącznie {writer.rows})")
+
+        total_rows = writer.rows
+        if total_rows == 0:
+            # Pusty plik wejściowy -> pusty plik wynikowy z nagłówkiem
+            writer.write(pd.DataFrame(columns=RESULT_COLUMNS))
+        rejected_rows = rejects_writer.rows
+
+    logger.info(f"✅ Wyniki zapisane w {output_file} ({total_rows} wierszy)")
+    if rejected_rows:
+        logger.warning(f"Odrzucono {rejected_rows} wierszy niezgodnych ze schematem -> {rejected_path(output_file)}")
+    return total_rows
 
 if __name__ == "__main__":
-    make_batch_predictions("data/Telco-Customer-Churn.csv", "data/predictions.csv")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Predykcje wsadowe churnu")
+    parser.add_argument("--input", default="data/Telco-Customer-Churn.csv", help="Plik .csv / .parquet / .arrow")
+    parser.add_argument("--output", default="data/predictions.csv", help="Plik .csv / .parquet / .arrow")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Wierszy na porcję")
+    parser.add_argument("--workers", type=int, default=1, help="Liczba procesów liczących")
+    parser.add_argument("--no-validate", action="store_true", help="Bez walidacji schematu (wszystkie wiersze liczone)")
+    parser.add_argument("--explain", action="store_true", help="Dodaj wkłady pól (SHAP) i główne powody ryzyka")
+    args = parser.parse_args()
+
+    make_batch_predictions(args.input, args.output, chunksize=args.chunksize, workers=args.workers,
+                           validate=not args.no_validate, explain=args.explain)
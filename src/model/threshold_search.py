@@ -0,0 +1,66 @@
+import numpy as np
+
+# Wektorowy silnik wyboru progu decyzji.
+# Jedno sortowanie wyników + sumy skumulowane -> precision/recall dla WSZYSTKICH progów naraz,
+# O(n log n) zamiast O(liczba_progów * n) z osobnymi wywołaniami sklearn dla każdego progu.
+
+def threshold_curve(y_true, y_score, thresholds=None) -> dict:
+    """
+    Precision i Recall dla reguły "score >= próg".
+    thresholds=None -> dokładne cięcia: każdy unikalny wynik jest progiem (malejąco),
+    inaczej dowolna siatka progów (np. np.arange(0.1, 0.9, 0.01) albo dużo gęstsza).
+    Zwraca słownik tablic: thresholds, precision, recall, tp, fp.
+    Brak predykcji pozytywnych -> precision = 0 (jak zero_division=0 w sklearn).
+    """
+    y_true = np.asarray(y_true).astype(np.int64).ravel()
+    y_score = np.asarray(y_score, dtype=np.float64).ravel()
+    n = len(y_score)
+
+    # Wyniki malejąco; tp_cum[k] / fp_cum[k] = TP / FP wśród k najwyżej ocenionych
+    order = np.argsort(y_score, kind="mergesort")[::-1]
+    scores_desc = y_score[order]
+    tp_cum = np.concatenate([[0], np.cumsum(y_true[order])])
+    fp_cum = np.arange(n + 1) - tp_cum
+
+    if thresholds is None:
+        # Ostatnia pozycja każdego bloku równych wyników
+        last = np.r_[np.flatnonzero(np.diff(scores_desc)), n - 1] if n else np.array([], dtype=np.int64)
+        thresholds = scores_desc[last]
+        k = last + 1
+    else:
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        # Liczba wyników >= próg
+        k = n - np.searchsorted(scores_desc[::-1], thresholds, side="left")
+
+    tp = tp_cum[k]
+    fp = fp_cum[k]
+    positives = tp_cum[-1]
+
+    predicted = tp + fp
+    precision = np.divide(tp, predicted, out=np.zeros(len(k)), where=predicted > 0)
+    recall = tp / positives if positives else np.zeros(len(k))
+
+    return {"thresholds": thresholds, "precision": precision, "recall": recall, "tp": tp, "fp": fp}
+
+def fbeta_scores(precision, recall, beta: float = 2.0) -> np.ndarray:
+    #F-beta dla całych tablic (beta=2 -> nacisk na Recall); 0 tam, gdzie mianownik = 0
+    beta2 = beta ** 2
+    numerator = (1 + beta2) * precision * recall
+    denominator = beta2 * precision + recall
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=np.float64), where=denominator != 0)
+
+def best_threshold(y_true, y_score, beta: float = 2.0, thresholds=None) -> dict:
+    """
+    Próg maksymalizujący F-beta (przy remisie - pierwszy, czyli najniższy na siatce rosnącej).
+    Zwraca: threshold, fbeta, precision, recall, index.
+    """
+    curve = threshold_curve(y_true, y_score, thresholds)
+    scores = fbeta_scores(curve["precision"], curve["recall"], beta)
+    idx = int(np.argmax(scores))
+    return {
+        "threshold": float(curve["thresholds"][idx]),
+        "fbeta": float(scores[idx]),
+        "precision": float(curve["precision"][idx]),
+        "recall": float(curve["recall"][idx]),
+        "index": idx,
+    }
@@ -9,11 +9,58 @@ import json
 import os
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, recall_score, precision_score, f1_score, confusion_matrix
+from src.model.drift import build_profile, save_profile
+from src.model.threshold_search import threshold_curve, fbeta_scores
+from src.features.encoding_plan import load_category_table
+from src.serving.flat_model import export_flat_model
+from src.profiling import stage
+from src.serving.registry import publish_bundle
 from src.utils import get_logger
 
 logger = get_logger("TRAIN_MODEL")
 
-def train_model(df: pd.DataFrame, target_col: str = 'churn'):
+def load_params(params_path: str = "models/best_params.json") -> dict:
+    #Parametry XGBoost: wynik tuningu (Optuna) nałożony na domyślne
+    default_params = {
+        "n_estimators": 100, 
+        "max_depth": 6, 
+        "learning_rate": 0.1,
+        "scale_pos_weight": 3.0,  # Domyślna waga
+        "objective": "binary:logistic",
+        "eval_metric": "logloss",
+    }
+
+    if os.path.exists(params_path):
+        with open(params_path, "r") as f:
+            loaded_params = json.load(f)
+        logger.info("Załadowano parametry z Optuny.")
+        return {**default_params, **loaded_params}
+
+    logger.warning("Używam parametrów domyślnych.")
+    return default_params
+
+def save_artifacts(model, threshold: float, metadata: dict) -> str:
+    """
+    Zapisuje model, próg i spłaszczony model w models/ i publikuje z nich wersjonowaną paczkę.
+    model: XGBClassifier albo Booster. Zwraca wersję paczki.
+    """
+    model.save_model("models/xgb_model.json")
+
+    # Zapisujemy próg do pliku, żeby API wiedziało, jak decydować
+    with open("models/threshold.json", "w") as f:
+        json.dump({"threshold": float(threshold)}, f)
+
+    logger.info("Model zapisany. Próg zapisany w models/threshold.json")
+
+    # Spłaszczony model (drzewa + kategorie + próg w jednym pliku) dla serwowania bez xgboost
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    export_flat_model(booster, load_category_table("models/categories.json"), threshold, "models/model.flat")
+
+    # Wersjonowana paczka (model + encoder + próg z tego treningu) - serwer podmieni model bez restartu
+    return publish_bundle(metadata=metadata)
+
+def train_model(df: pd.DataFrame, target_col: str = 'churn', threshold: float = None):
+    #threshold: stały próg (np. stabilny próg z ewaluacji krzyżowej); None - próg F2 wybrany na zbiorze testowym
     X = df.drop(columns=[target_col])
     y = df[target_col]
     
@@ -24,62 +71,41 @@ def train_model(df: pd.DataFrame, target_col: str = 'churn'):
     
     with mlflow.start_run() as run:
         # Ładowanie parametrów
-        params_path = "models/best_params.json"
-        default_params = {
-            "n_estimators": 100, 
-            "max_depth": 6, 
-            "learning_rate": 0.1,
-            "scale_pos_weight": 3.0,  # Domyślna waga
-            "objective": "binary:logistic",
-            "eval_metric": "logloss",
-        }
-
-        if os.path.exists(params_path):
-            with open(params_path, "r") as f:
-                loaded_params = json.load(f)
-            params = {**default_params, **loaded_params}
-            logger.info("Załadowano parametry z Optuny.")
-        else:
-            params = default_params
-            logger.warning("Używam parametrów domyślnych.")
-
+        params = load_params()
         mlflow.log_params(params)
         
         # Trening
         model = xgb.XGBClassifier(**params)
-        model.fit(X_train, y_train)
+        with stage("fit"):
+            model.fit(X_train, y_train)
         
         # THRESHOLD TUNING (Program sam decyduje)
         # Pobieramy prawdopodobieństwo (od 0.0 do 1.0) zamiast sztywnej decyzji (0 lub 1)
-        y_probs = model.predict_proba(X_test)[:, 1]
+        with stage("predict_test"):
+            y_probs = model.predict_proba(X_test)[:, 1]
         
+        # Wektorowo: jedno sortowanie + sumy skumulowane zamiast wywołań sklearn dla każdego progu
         thresholds = np.arange(0.1, 0.9, 0.01)
-        f2_scores = []
-        recalls = []
-        precisions = []
+        with stage("threshold_search"):
+            curve = threshold_curve(y_test, y_probs, thresholds)
+        recalls = curve["recall"]
+        precisions = curve["precision"]
         
-        for t in thresholds:
-            y_pred_temp = (y_probs >= t).astype(int)
-            
-            # Obliczamy składowe
-            rec = recall_score(y_test, y_pred_temp, zero_division=0)
-            prec = precision_score(y_test, y_pred_temp, zero_division=0)
-            recalls.append(rec)
-            precisions.append(prec)
+        # F2-Score (kłada nacisk na Recall)
+        f2_scores = fbeta_scores(precisions, recalls, beta=2.0)
             
-            # F2-Score (kłada nacisk na Recall)
-            if (4 * prec + rec) == 0:
-                f2 = 0
-            else:
-                f2 = (5 * prec * rec) / (4 * prec + rec)
-            f2_scores.append(f2)
-            
-        # Wybieramy próg, który daje najlepszy F2 (czyli promuje Recall)
-        best_idx = np.argmax(f2_scores)
-        best_threshold = float(thresholds[best_idx])
-        best_f2 = f2_scores[best_idx]
-        
-        logger.info(f"Znaleziono optymalny Threshold (F2): {best_threshold:.2f} (Recall w tym punkcie: {recalls[best_idx]:.4f})")
+        if threshold is None:
+            # Wybieramy próg, który daje najlepszy F2 (czyli promuje Recall)
+            best_idx = np.argmax(f2_scores)
+            best_threshold = float(thresholds[best_idx])
+            best_f2 = f2_scores[best_idx]
+            logger.info(f"Znaleziono optymalny Threshold (F2): {best_threshold:.2f} (Recall w tym punkcie: {recalls[best_idx]:.4f})")
+        else:
+            # Próg z zewnątrz (ewaluacja krzyżowa) - na zbiorze testowym tylko go oceniamy
+            best_threshold = float(threshold)
+            fixed = threshold_curve(y_test, y_probs, [best_threshold])
+            best_f2 = fbeta_scores(fixed["precision"], fixed["recall"], beta=2.0)[0]
+            logger.info(f"Próg z ewaluacji krzyżowej: {best_threshold:.2f} (F2 na zbiorze testowym: {best_f2:.4f})")
         
         # Finalne predykcje z nowym progiem
         y_final_pred = (y_probs >= best_threshold).astype(int)
@@ -90,28 +116,31 @@ def train_model(df: pd.DataFrame, target_col: str = 'churn'):
             "recall": recall_score(y_test, y_final_pred),
             "precision": precision_score(y_test, y_final_pred),
             "f1": f1_score(y_test, y_final_pred),
+            "f2": float(best_f2),
             "threshold": best_threshold
         }
         mlflow.log_metrics(metrics)
         logger.info(f"Wyniki po optymalizacji progu: {metrics}")
         
         # Wykres Confusion Matrix
-        plt.figure(figsize=(8, 6))
-        cm = confusion_matrix(y_test, y_final_pred)
-        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-        plt.title(f"Confusion Matrix (Thresh: {best_threshold:.2f})")
-        plt.savefig("confusion_matrix.png")
-        mlflow.log_artifact("confusion_matrix.png")
-        plt.close()
+        with stage("confusion_matrix"):
+            plt.figure(figsize=(8, 6))
+            cm = confusion_matrix(y_test, y_final_pred)
+            sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
+            plt.title(f"Confusion Matrix (Thresh: {best_threshold:.2f})")
+            plt.savefig("confusion_matrix.png")
+            mlflow.log_artifact("confusion_matrix.png")
+            plt.close()
+
+        # Profil danych treningowych i metryki - punkt odniesienia dla treningu przyrostowego (dryf, degradacja)
+        with stage("data_profile"):
+            save_profile(build_profile(X_train, load_category_table("models/categories.json"), metrics))
 
         # Zapis modelu i PROGU
-        mlflow.xgboost.log_model(xgb_model=model, name="model")
-        model.save_model("models/xgb_model.json")
-        
-        # Zapisujemy próg do pliku, żeby API wiedziało, jak decydować
-        with open("models/threshold.json", "w") as f:
-            json.dump({"threshold": float(best_threshold)}, f)
-            
-        logger.info("Model zapisany. Próg zapisany w models/threshold.json")
+        with stage("mlflow_log_model"):
+            mlflow.xgboost.log_model(xgb_model=model, name="model")
+        with stage("save_artifacts"):
+            version = save_artifacts(model, best_threshold, {"mlflow_run_id": run.info.run_id, **metrics})
+        mlflow.set_tag("model_bundle", version)
         
         return model
\ No newline at end of file
@@ -1,80 +1,235 @@
 import optuna
 import xgboost as xgb
+import numpy as np
 import pandas as pd
+import argparse
 import json
 import os
 import functools
+import hashlib
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import recall_score
 from src.utils import get_logger
 # Importujemy nasze moduły
-from src.data.load_data import load_data
-from src.data.preprocess import preprocess_data
-from src.features.build_features import build_features
+from src.features.feature_cache import cache_key, load_features
+from src.profiling import stage
 
 logger = get_logger("TUNING")
 
-def objective(trial, X_train, y_train, X_test, y_test):
+EARLY_STOPPING_ROUNDS = 50
+REPORT_EVERY = 10  # co ile drzew raportujemy wynik pośredni do Optuny (pruning)
+
+# Przestrzeń przeszukiwania: parametr -> typ, zakres i skala logarytmiczna (kolejność = kolejność losowania).
+# Jej zmiana zmienia odcisk study (study_fingerprint).
+SEARCH_SPACE = {
+    "n_estimators": {"type": "int", "low": 100, "high": 800, "log": False},
+    "max_depth": {"type": "int", "low": 3, "high": 10, "log": False},
+    "learning_rate": {"type": "float", "low": 0.01, "high": 0.3, "log": False},
+    "subsample": {"type": "float", "low": 0.6, "high": 1.0, "log": False},
+    "colsample_bytree": {"type": "float", "low": 0.6, "high": 1.0, "log": False},
+    "min_child_weight": {"type": "int", "low": 1, "high": 10, "log": False},
+    "gamma": {"type": "float", "low": 0, "high": 5, "log": False},
+    # scale_pos_weight balansuje wagi.
+    "scale_pos_weight": {"type": "float", "low": 1.0, "high": 10.0, "log": False},
+}
+
+def make_recall_metric(y_true):
+    """
+    Metryka liczona przez XGBoost po każdym drzewie na zbiorze walidacyjnym (ta sama co cel tuningu).
+    Etykiety są wczytane raz, a nie przy każdej iteracji.
+    """
+    positives = y_true == 1
+    n_positives = int(positives.sum())
+
+    def recall_at_05(predt, dmatrix):
+        if not n_positives:
+            return "recall_at_05", 0.0
+        return "recall_at_05", float(np.sum((predt >= 0.5) & positives) / n_positives)
+
+    return recall_at_05
+
+class XGBoostPruningCallback(xgb.callback.TrainingCallback):
+    """
+    Raportuje Recall z walidacji do Optuny co `report_every` drzew
+    i przerywa trening (TrialPruned), gdy trial wyraźnie odstaje od pozostałych.
+    """
+    def __init__(self, trial, data_name: str = "valid", metric_name: str = "recall_at_05",
+                 report_every: int = REPORT_EVERY):
+        self.trial = trial
+        self.data_name = data_name
+        self.metric_name = metric_name
+        self.report_every = report_every
+
+    def after_iteration(self, model, epoch: int, evals_log) -> bool:
+        if (epoch + 1) % self.report_every:
+            return False
+        score = evals_log[self.data_name][self.metric_name][-1]
+        self.trial.report(score, step=epoch + 1)
+        if self.trial.should_prune():
+            raise optuna.TrialPruned(f"Przycięty po {epoch + 1} drzewach (recall={score:.4f})")
+        return False
+
+def build_tuning_data(X_train, y_train, X_valid, y_valid, max_bin: int = 256):
+    """
+    Dane dla XGBoost budowane RAZ na cały tuning: QuantileDMatrix (histogramy/kwantyle policzone
+    jednorazowo) dla treningu i walidacji, z tymi samymi binami (ref=dtrain).
+    """
+    dtrain = xgb.QuantileDMatrix(X_train, label=y_train, max_bin=max_bin)
+    dvalid = xgb.QuantileDMatrix(X_valid, label=y_valid, ref=dtrain)
+    return dtrain, dvalid
+
+def suggest_params(trial) -> dict:
+    #Wartości parametrów triala z SEARCH_SPACE
+    suggest = {"int": trial.suggest_int, "float": trial.suggest_float}
+    return {name: suggest[spec["type"]](name, spec["low"], spec["high"], log=spec["log"])
+            for name, spec in SEARCH_SPACE.items()}
+
+def objective(trial, dtrain, dvalid, recall_metric, X_test, y_test, nthread: int = -1):
     # Parametry do optymalizacji
-    params = {
-        'n_estimators': trial.suggest_int('n_estimators', 100, 800),
-        'max_depth': trial.suggest_int('max_depth', 3, 10),
-        'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
-        'subsample': trial.suggest_float('subsample', 0.6, 1.0),
-        'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 1.0),
-        'min_child_weight': trial.suggest_int('min_child_weight', 1, 10),
-        'gamma': trial.suggest_float('gamma', 0, 5),
-        
-        # scale_pos_weight balansuje wagi. 
-        'scale_pos_weight': trial.suggest_float('scale_pos_weight', 1.0, 10.0),
-        
+    params = suggest_params(trial)
+    n_estimators = params.pop('n_estimators')
+    params.update({
         # Stałe
         'objective': 'binary:logistic',
         'eval_metric': 'logloss',
-        'n_jobs': -1
-    }
-    
-    # Trening
-    model = xgb.XGBClassifier(**params)
-    model.fit(X_train, y_train)
-    
-    # Ewaluacja (Optymalizujemy pod Recall!)
-    y_pred = model.predict(X_test)
+        'tree_method': 'hist',
+        'max_bin': dtrain.max_bin,  # musi się zgadzać z binami QuantileDMatrix
+        'nthread': nthread
+    })
+
+    # Trening (natywne API na gotowych QuantileDMatrix) z early stopping (logloss na walidacji)
+    # i pruningiem Optuny (recall na walidacji)
+    callbacks = [
+        xgb.callback.EarlyStopping(rounds=EARLY_STOPPING_ROUNDS, metric_name='logloss',
+                                   data_name='valid', save_best=True),
+        XGBoostPruningCallback(trial),
+    ]
+    booster = xgb.train(params, dtrain, num_boost_round=n_estimators, evals=[(dvalid, 'valid')],
+                        custom_metric=recall_metric, callbacks=callbacks, verbose_eval=False)
+
+    # Liczba drzew po early stopping - tyle użyje finalny trening
+    trial.set_user_attr('best_n_estimators', int(booster.num_boosted_rounds()))
+
+    # Ewaluacja (Optymalizujemy pod Recall!) - predykcja jak XGBClassifier.predict (prawd. > 0.5)
+    y_pred = (booster.inplace_predict(X_test) > 0.5).astype(int)
     recall = recall_score(y_test, y_pred)
-    
+
     return recall
 
-def run_tuning():
+def study_fingerprint(data_path: str, df: pd.DataFrame) -> str:
+    """
+    Odcisk danych, cech i przestrzeni przeszukiwania: klucz cache cech (hash surowych danych + kodu cech)
+    albo - dla macierzy bez pliku źródłowego - hash samej macierzy, plus hash definicji SEARCH_SPACE.
+    Trwałe study z innym odciskiem nie jest wznawiane (triale liczone na innych danych nie mieszają się w best_params).
+    """
+    if os.path.exists(data_path):
+        data_key = cache_key(data_path)
+    else:
+        data_key = str(pd.util.hash_pandas_object(df, index=False).sum()) + ":" + ",".join(df.columns)
+    space_key = hashlib.sha256(json.dumps(SEARCH_SPACE, sort_keys=True).encode()).hexdigest()
+    return hashlib.sha256(f"{data_key}:{space_key}".encode()).hexdigest()[:16]
+
+def _check_fingerprint(study, fingerprint: str, n_finished: int):
+    #Zapisuje odcisk w nowym study; wznawiane study musi mieć ten sam
+    stored = study.user_attrs.get("fingerprint")
+    if stored is None and not n_finished:
+        study.set_user_attr("fingerprint", fingerprint)
+        return
+    if stored != fingerprint:
+        raise ValueError(f"Study '{study.study_name}' policzono na innych danych, cechach albo przestrzeni parametrów "
+                         f"(odcisk {stored} zamiast {fingerprint}). Podaj nowe --study-name albo inny --storage.")
+
+def _make_storage(storage: str):
+    """
+    None -> study w pamięci.
+    Plik *.log / *.journal -> JournalStorage (bezpieczny dla wielu procesów na jednej maszynie).
+    Inaczej URL bazy, np. "sqlite:///models/optuna.db".
+    """
+    if storage is None:
+        return None
+    if storage.endswith((".log", ".journal")):
+        from optuna.storages import JournalStorage
+        from optuna.storages.journal import JournalFileBackend
+        return JournalStorage(JournalFileBackend(storage))
+    return storage
+
+def run_tuning(data_path: str = 'data/raw/Telco-Customer-Churn.csv', df: pd.DataFrame = None,
+               n_trials: int = 30, n_jobs: int = 1, storage: str = None, study_name: str = 'telco_churn_xgb'):
+    """
+    Tuning XGBoost (Optuna). n_jobs trials naraz (wątki XGBoost dzielone między nie).
+    Ze `storage` study jest trwałe: ponowne uruchomienie wznawia je, a kilka procesów
+    z tym samym storage/study_name liczy wspólnie łącznie `n_trials` triali.
+    Study policzone na innych danych / cechach / przestrzeni parametrów nie jest wznawiane (ValueError).
+    """
     logger.info("Rozpoczynam tuning...")
-    
-    data_path = 'data/raw/Telco-Customer-Churn.csv'
-    df = load_data(data_path)
-    df = preprocess_data(df)
-    df = build_features(df, train_mode=True)
-    
+
+    # Macierz cech z pipeline'u albo z cache (bez ponownego preprocessingu i uczenia encodera)
+    if df is None:
+        df = load_features(data_path)
+
     X = df.drop(columns=['churn'])
     y = df['churn']
-    
+
     # Obliczmy wstępny balans (liczba negatywnych / liczba pozytywnych)
     ratio = float(y.value_counts()[0]) / y.value_counts()[1]
     logger.info(f"Balans klas (Ratio): {ratio:.2f}.")
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-    
+    # Osobny zbiór walidacyjny do early stopping / pruningu (zbiór testowy zostaje do oceny triala)
+    X_train, X_valid, y_train, y_valid = train_test_split(X_train, y_train, test_size=0.2, random_state=42, stratify=y_train)
+
+    # Wątki XGBoost dzielimy między równoległe triale, żeby nie było oversubskrypcji rdzeni
+    nthread = max(1, (os.cpu_count() or 1) // max(1, n_jobs))
+
+    # Dane XGBoost budujemy raz i współdzielimy między wszystkimi trialami
+    with stage("build_dmatrix"):
+        dtrain, dvalid = build_tuning_data(X_train, y_train, X_valid, y_valid)
+
     # Dzięki temu Optuna widzi tylko argument 'trial', a dane są "zamrożone"
-    objective_with_data = functools.partial(objective, X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test)
-    
-    study = optuna.create_study(direction='maximize')
-    study.optimize(objective_with_data, n_trials=30) 
-    
-    logger.info(f"Najlepsze parametry: {study.best_params}")
+    objective_with_data = functools.partial(objective, dtrain=dtrain, dvalid=dvalid,
+                                            recall_metric=make_recall_metric(y_valid.to_numpy()),
+                                            X_test=X_test, y_test=y_test, nthread=nthread)
+
+    study = optuna.create_study(
+        direction='maximize',
+        study_name=study_name,
+        storage=_make_storage(storage),
+        load_if_exists=True,
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=50),
+    )
+
+    finished_states = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+    done = len(study.get_trials(deepcopy=False, states=finished_states))
+    _check_fingerprint(study, study_fingerprint(data_path, df), done)
+    if done:
+        logger.info(f"Wznawiam study '{study_name}': {done}/{n_trials} triali już policzonych.")
+    logger.info(f"Triale równolegle: {n_jobs}, wątki XGBoost na trial: {nthread}")
+
+    # Limit liczony łącznie dla wszystkich procesów dzielących storage
+    with stage("trials"):
+        study.optimize(objective_with_data, n_trials=max(0, n_trials - done), n_jobs=n_jobs,
+                       callbacks=[optuna.study.MaxTrialsCallback(n_trials, states=finished_states)])
+
+    best_params = dict(study.best_params)
+    best_params['n_estimators'] = study.best_trial.user_attrs.get('best_n_estimators', best_params['n_estimators'])
+
+    logger.info(f"Najlepsze parametry: {best_params}")
     logger.info(f"Najlepszy Recall: {study.best_value}")
-    
+
     os.makedirs("models", exist_ok=True)
     with open("models/best_params.json", "w") as f:
-        json.dump(study.best_params, f)
-        
+        json.dump(best_params, f)
+
     logger.info("Zapisano najlepsze parametry.")
 
 if __name__ == "__main__":
-    run_tuning()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Tuning hiperparametrów XGBoost (Optuna)")
+    parser.add_argument("--data", default='data/raw/Telco-Customer-Churn.csv')
+    parser.add_argument("--trials", type=int, default=30, help="Łączna liczba triali w study")
+    parser.add_argument("--jobs", type=int, default=1, help="Triale liczone równolegle w tym procesie")
+    parser.add_argument("--storage", default=None,
+                        help="Trwałe study: sqlite:///models/optuna.db albo plik models/optuna.log")
+    parser.add_argument("--study-name", default='telco_churn_xgb')
+    args = parser.parse_args()
+
+    run_tuning(args.data, n_trials=args.trials, n_jobs=args.jobs, storage=args.storage, study_name=args.study_name)
@@ -0,0 +1,207 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from src.utils import get_logger
+
+logger = get_logger("PROFILING")
+
+# Opcjonalne profilowanie etapów pipeline'u (run_pipeline --profile):
+# czas ściany, czas CPU (proces + zakończone procesy potomne), wykorzystanie CPU i szczyt RSS każdego etapu,
+# opcjonalnie cProfile albo próbkujący py-spy per etap. Kod pipeline'u oznacza etapy przez `with stage("nazwa"):` -
+# bez aktywnego profilera to pusty kontekst (koszt jednego sprawdzenia).
+
+# Linux: zapis "5" do /proc/self/clear_refs zeruje VmHWM, więc szczyt RSS mierzymy osobno dla każdego etapu.
+# Gdzie indziej zostaje ru_maxrss - szczyt całego procesu do końca etapu.
+CLEAR_REFS = "/proc/self/clear_refs"
+STATUS = "/proc/self/status"
+CPROFILE_TOP = 15  # funkcji w raporcie JSON (pełne statystyki w plikach .prof)
+SAMPLING_RATE = 100  # próbek na sekundę dla py-spy
+
+def _status_kb(field: str):
+    try:
+        with open(STATUS) as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _maxrss_kb() -> int:
+    # ru_maxrss: kB na Linuksie, bajty na macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+def _reset_peak() -> bool:
+    try:
+        with open(CLEAR_REFS, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _cpu_seconds() -> float:
+    #CPU procesu (wszystkie wątki, np. XGBoost) + zakończonych procesów potomnych (np. workery tuningu)
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+class StageProfiler:
+    """
+    Rejestruje etapy (także zagnieżdżone: "train/fit") w kolejności zakończenia.
+    Każdy etap: wall_s, cpu_s, cpu_utilization (1.0 = jeden pełny rdzeń), rss_start_mb, rss_end_mb, peak_rss_mb.
+    cprofile=True: cProfile każdego etapu najwyższego poziomu -> <output_dir>/<etap>.prof + top funkcji w raporcie.
+    sampling=True: py-spy (jeśli zainstalowany) próbkuje proces i jego potomków w każdym etapie najwyższego
+    poziomu -> <output_dir>/<etap>.speedscope.json (mały narzut, widać też kod natywny, np. XGBoost).
+    """
+    def __init__(self, cprofile: bool = False, sampling: bool = False, output_dir: str = "reports/profile"):
+        self.cprofile = cprofile
+        self.output_dir = output_dir
+        self.sampling = sampling and shutil.which("py-spy") is not None
+        if sampling and not self.sampling:
+            logger.warning("Brak py-spy w PATH - profilowanie próbkujące wyłączone (pip install py-spy)")
+        self.stages = []
+        self._stack = []
+        self._started = time.perf_counter()
+        self._cpu_started = _cpu_seconds()
+        self.per_stage_peak = _reset_peak()
+
+    def _peak_kb(self) -> int:
+        peak = _status_kb("VmHWM") if self.per_stage_peak else None
+        return peak if peak is not None else _maxrss_kb()
+
+    @contextmanager
+    def stage(self, name: str):
+        parent = self._stack[-1] if self._stack else None
+        full_name = f"{parent['name']}/{name}" if parent else name
+        rss_start = _status_kb("VmRSS") or 0
+
+        # Szczyt rodzica do tej chwili zapamiętany przed wyzerowaniem licznika dla etapu-dziecka
+        if parent is not None:
+            parent["peak_kb"] = max(parent["peak_kb"], self._peak_kb())
+        if self.per_stage_peak:
+            _reset_peak()
+        frame = {"name": full_name, "peak_kb": rss_start}
+        self._stack.append(frame)
+
+        profile = cProfile.Profile() if self.cprofile and parent is None else None
+        sampler = self._start_sampler(full_name) if self.sampling and parent is None else None
+        start, cpu_start = time.perf_counter(), _cpu_seconds()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            if sampler is not None:
+                # SIGINT: py-spy kończy próbkowanie i zapisuje plik
+                sampler[0].send_signal(signal.SIGINT)
+                sampler[0].wait()
+            wall, cpu = time.perf_counter() - start, _cpu_seconds() - cpu_start
+            self._stack.pop()
+            frame["peak_kb"] = max(frame["peak_kb"], self._peak_kb())
+            if parent is not None:
+                parent["peak_kb"] = max(parent["peak_kb"], frame["peak_kb"])
+
+            record = {
+                "stage": full_name,
+                "wall_s": wall,
+                "cpu_s": cpu,
+                "cpu_utilization": cpu / wall if wall > 0 else 0.0,
+                "rss_start_mb": rss_start / 1024,
+                "rss_end_mb": (_status_kb("VmRSS") or 0) / 1024,
+                "peak_rss_mb": frame["peak_kb"] / 1024,
+            }
+            if profile is not None:
+                record["cprofile"] = self._save_cprofile(profile, full_name)
+            if sampler is not None:
+                record["sampling_profile"] = sampler[1]
+            self.stages.append(record)
+            logger.info(f"Etap {full_name}: {wall:.2f} s, CPU {cpu:.2f} s ({record['cpu_utilization']:.2f} rdzenia), "
+                        f"szczyt RSS {record['peak_rss_mb']:.0f} MB")
+
+    def _start_sampler(self, name: str) -> tuple:
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{name.replace('/', '.')}.speedscope.json")
+        process = subprocess.Popen(
+            ["py-spy", "record", "--pid", str(os.getpid()), "--rate", str(SAMPLING_RATE), "--subprocesses",
+             "--native", "--format", "speedscope", "--output", path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return process, path
+
+    def _save_cprofile(self, profile: cProfile.Profile, name: str) -> dict:
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{name.replace('/', '.')}.prof")
+        profile.dump_stats(path)
+
+        stats = pstats.Stats(profile, stream=io.StringIO())
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:CPROFILE_TOP]
+        return {
+            "path": path,
+            "top_cumulative": [
+                {"function": f"{filename}:{line}({func})", "calls": nc, "tottime_s": tt, "cumtime_s": ct}
+                for (filename, line, func), (_, nc, tt, ct, _) in top
+            ],
+        }
+
+    def report(self) -> dict:
+        wall = time.perf_counter() - self._started
+        cpu = _cpu_seconds() - self._cpu_started
+        return {
+            "total": {"wall_s": wall, "cpu_s": cpu, "cpu_utilization": cpu / wall if wall > 0 else 0.0,
+                      "peak_rss_mb": _maxrss_kb() / 1024},
+            "per_stage_peak_rss": self.per_stage_peak,
+            "cpu_count": os.cpu_count(),
+            "stages": self.stages,
+        }
+
+    def save(self, path: str) -> dict:
+        report = self.report()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Raport profilowania zapisany w {path}")
+        return report
+
+    def log_to_mlflow(self, run_id: str, report_path: str = None):
+        #Metryki etapów (profile/<etap>/<metryka>) i raport JSON jako artefakt wskazanego runu MLflow
+        import mlflow
+        metrics = {}
+        for record in self.stages:
+            for key in ("wall_s", "cpu_s", "cpu_utilization", "peak_rss_mb"):
+                metrics[f"profile/{record['stage']}/{key}"] = record[key]
+        with mlflow.start_run(run_id=run_id):
+            mlflow.log_metrics(metrics)
+            if report_path is not None:
+                mlflow.log_artifact(report_path, artifact_path="profile")
+
+# --- Aktywny profiler procesu: kod pipeline'u oznacza etapy bez przekazywania profilera przez argumenty ---
+_active = None
+
+@contextmanager
+def profiling(profiler: StageProfiler = None):
+    #Włącza profiler na czas bloku (etapy `stage(...)` w tym czasie są mierzone); None - bez profilowania
+    global _active
+    previous, _active = _active, profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+
+@contextmanager
+def stage(name: str):
+    #Etap pipeline'u: mierzony przez aktywny profiler, bez profilera nic nie robi
+    if _active is None:
+        yield
+        return
+    with _active.stage(name):
+        yield
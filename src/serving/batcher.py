@@ -0,0 +1,97 @@
+import asyncio
+from src.serving.executor import ServiceSaturated
+from src.serving.metrics import BATCH_SIZE
+from src.utils import get_logger
+
+logger = get_logger("MICRO_BATCHER")
+
+class MicroBatcher:
+    """
+    Dynamiczny micro-batching dla /predict.
+    Zbiera równoległe pojedyncze requesty przez max_wait_ms (albo do max_batch_size wierszy)
+    i liczy je jednym wektorowym wywołaniem `await score_fn(list[dict]) -> list[dict]`.
+    Wyjątek na miejscu wyniku (np. odrzucony rekord) trafia tylko do requestu tego rekordu.
+    Kolejka ma limit max_queue wierszy - ponad nim submit rzuca ServiceSaturated.
+    """
+    def __init__(self, score_fn, max_batch_size: int = 64, max_wait_ms: float = 5.0, max_queue: int = 1024):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size musi być >= 1")
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max_queue
+        self._queue = None
+        self._worker = None
+
+    def _ensure_started(self):
+        # Startujemy leniwie, w pętli zdarzeń serwera (przy pierwszym requeście)
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Micro-batcher uruchomiony (max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait * 1000:.1f})")
+
+    @property
+    def queued(self) -> int:
+        #Wiersze czekające na zebranie w paczkę
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, data: dict) -> dict:
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((data, future))
+        except asyncio.QueueFull:
+            raise ServiceSaturated(f"Kolejka micro-batchera pełna ({self.max_queue} wierszy)")
+        return await future
+
+    async def _collect(self) -> list:
+        # Czekamy na pierwszy request, potem dobieramy kolejne aż do limitu czasu lub rozmiaru
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _dispatch(self, batch: list):
+        BATCH_SIZE.observe(len(batch), "microbatch")
+        try:
+            # score_fn liczy poza pętlą zdarzeń (np. w ScoringExecutor)
+            results = await self.score_fn([data for data, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _run(self):
+        # Kolejne paczki zbieramy, gdy poprzednie jeszcze się liczą (równolegle w puli)
+        pending = set()
+        while True:
+            batch = await self._collect()
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
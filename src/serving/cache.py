@@ -0,0 +1,66 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+class PredictionCache:
+    """
+    Ograniczony cache LRU (+ opcjonalny TTL) prawdopodobieństw churnu.
+    Klucz = wersja modelu + hash zakodowanego wiersza cech (float32 po EncodingPlan),
+    więc różne zapisy tego samego profilu (np. totalcharges "29.85" i 29.85) trafiają w ten sam wpis,
+    a po podmianie modelu stare wpisy nie są już osiągalne.
+    Bezpieczny dla wielu wątków puli predykcji.
+    """
+    def __init__(self, max_size: int = 10_000, ttl_s: float = None):
+        if max_size < 1:
+            raise ValueError("max_size musi być >= 1")
+        self.max_size = max_size
+        self.ttl_s = ttl_s or None
+        self._entries = OrderedDict()  # klucz -> (prawdopodobieństwo, czas wstawienia)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(version: str, row) -> tuple:
+        #Kanoniczny klucz: bajty wiersza float32 (blake2b, 16 B) w obrębie wersji modelu
+        return version, hashlib.blake2b(row.tobytes(), digest_size=16).digest()
+
+    def get(self, key):
+        #Prawdopodobieństwo z cache albo None (brak / wpis przeterminowany)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_s is not None and time.monotonic() - entry[1] > self.ttl_s:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, prob: float):
+        with self._lock:
+            self._entries[key] = (prob, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,130 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from src.serving.registry import resolve_bundle, verify_bundle
+from src.utils import get_logger
+
+logger = get_logger("SCORING_EXECUTOR")
+
+class ServiceSaturated(Exception):
+    #Kolejka predykcji jest pełna - API odpowiada 503 zamiast zwiększać opóźnienia
+    pass
+
+def default_nthread(workers: int) -> int:
+    #Wątki XGBoost na workera, tak żeby workers * nthread nie przekraczało liczby rdzeni
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+# --- Tryb procesowy: każdy worker ma własną, wczytaną raz kopię modelu ---
+_worker_model = None
+
+def _init_worker(nthread: int, bundle_dir: str = None, cache_size: int = 0, cache_ttl_s: float = None,
+                 scorer: str = "xgboost", validate: bool = True):
+    global _worker_model
+    from src.serving.inference import ChurnModel
+    # Ta sama paczka co w procesie głównym (a nie "bieżąca" w chwili startu workera)
+    _worker_model = ChurnModel(bundle_dir, cache_size=cache_size, cache_ttl_s=cache_ttl_s,
+                               scorer=scorer, validate=validate)
+    _worker_model.set_nthread(nthread)
+
+def _warmup_worker(_):
+    _worker_model._state.warmup()
+
+def _score_in_worker(method: str, payload):
+    return getattr(_worker_model, method)(payload)
+
+class ScoringExecutor:
+    """
+    Dedykowana, ograniczona pula do liczenia predykcji (osobno od puli wątków Starlette/Gradio).
+    mode="thread": wątki + inplace_predict boostera (zwalnia GIL),
+    mode="process": procesy z modelem wczytanym przy starcie.
+    Najwyżej workers + max_queue zadań naraz; ponad limit -> ServiceSaturated.
+    """
+    def __init__(self, model_service, mode: str = "thread", workers: int = None,
+                 max_queue: int = 64, nthread: int = None):
+        self.model_service = model_service
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = self.workers + max_queue
+        self.nthread = nthread or default_nthread(self.workers)
+        self._inflight = 0
+        self._reload_lock = threading.Lock()
+
+        if mode == "thread":
+            self.model_service.set_nthread(self.nthread)
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scoring")
+        elif mode == "process":
+            self._pool = self._process_pool(self.model_service.bundle_dir)
+        else:
+            raise ValueError(f"Nieznany tryb wykonania: {mode} (dozwolone: thread, process)")
+
+        logger.info(f"Pula predykcji: mode={mode}, workers={self.workers}, "
+                    f"max_queue={max_queue}, xgboost nthread={self.nthread}")
+
+    def _process_pool(self, bundle_dir: str = None) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.nthread, bundle_dir, *self._cache_config(),
+                      self.model_service.scorer, self.model_service.validate),
+        )
+
+    def _cache_config(self) -> tuple:
+        # Każdy worker procesowy ma własny cache o tej samej konfiguracji co w procesie głównym
+        cache = self.model_service.cache
+        return (cache.max_size, cache.ttl_s) if cache is not None else (0, None)
+
+    def reload(self) -> bool:
+        """
+        Podmienia model na bieżącą paczkę bez przerywania ruchu (blokujące - wołać poza pętlą zdarzeń).
+        mode="thread": podmiana w ChurnModel; mode="process": najpierw nowa, rozgrzana pula workerów
+        z nową paczką, potem podmiana - stara pula kończy zadania w toku i jest zamykana.
+        Zwraca False, gdy bieżąca paczka jest już serwowana.
+        """
+        with self._reload_lock:
+            bundle_dir = resolve_bundle()
+            if bundle_dir is None or os.path.basename(bundle_dir) == self.model_service.version:
+                return False
+
+            pool = None
+            if self.mode == "process":
+                verify_bundle(bundle_dir)
+                pool = self._process_pool(bundle_dir)
+                try:
+                    # Workery startują i ładują model teraz, a nie przy pierwszym requeście
+                    list(pool.map(_warmup_worker, range(self.workers)))
+                except Exception:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+
+            self.model_service.reload(bundle_dir)
+            if pool is not None:
+                previous, self._pool = self._pool, pool
+                previous.shutdown(wait=False)
+            return True
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    async def submit(self, method: str, payload):
+        """
+        Uruchamia model_service.<method>(payload) w puli, nie blokując pętli zdarzeń.
+        Licznik jest modyfikowany tylko z pętli zdarzeń, więc nie potrzebuje blokady.
+        """
+        if self._inflight >= self.capacity:
+            raise ServiceSaturated(f"Serwer przeciążony ({self._inflight} zadań w toku)")
+
+        self._inflight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if self.mode == "process":
+                return await loop.run_in_executor(self._pool, _score_in_worker, method, payload)
+            return await loop.run_in_executor(self._pool, getattr(self.model_service, method), payload)
+        finally:
+            self._inflight -= 1
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
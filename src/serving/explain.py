@@ -0,0 +1,60 @@
+import numpy as np
+
+# Wyjaśnienia predykcji: wkłady cech (SHAP) z natywnego pred_contribs XGBoost, liczone dla całej macierzy naraz.
+# Wkłady kolumn one-hot sumujemy z powrotem do pól CustomerData (SHAP jest addytywny, więc suma jest dokładna):
+# kolumny ułożone polami jedno za drugim i jedno np.add.reduceat - stała kolejność sumowania,
+# więc wynik wiersza nie zależy od wielkości paczki (w przeciwieństwie do mnożenia macierzy przez BLAS).
+
+# Ile głównych powodów zwracamy dla klienta
+EXPLAIN_TOP_K = 3
+
+class Explainer:
+    """
+    Wkłady pól klienta do marginesu (log-odds) modelu: margines = base_value + suma wkładów.
+    Dodatni wkład podnosi ryzyko churnu. Pola: kolumny numeryczne i pola kategoryczne z planu kodowania.
+    """
+    def __init__(self, booster, plan):
+        self.booster = booster
+        self.feature_names = list(plan.feature_names)
+        self.fields = list(plan.num_cols) + list(plan.categories)
+
+        # Kolumny cech pogrupowane polami + początek każdego pola (dla np.add.reduceat)
+        positions = {name: idx for idx, name in enumerate(self.feature_names)}
+        order, starts = [], []
+        for col in plan.num_cols:
+            starts.append(len(order))
+            order.append(positions[col])
+        for col, values in plan.categories.items():
+            starts.append(len(order))
+            order += [positions[f"{col}_{value}"] for value in values]
+        self._order = np.array(order, dtype=np.intp)
+        self._starts = np.array(starts, dtype=np.intp)
+
+    def contributions(self, matrix: np.ndarray) -> tuple:
+        #(wkłady pól (n, pola), base_value (n,)) dla macierzy cech w kolejności modelu
+        import xgboost as xgb
+        dmatrix = xgb.DMatrix(matrix, feature_names=self.feature_names)
+        raw = self.booster.predict(dmatrix, pred_contribs=True)  # (n, cechy + 1), ostatnia kolumna = bias
+        return np.add.reduceat(raw[:, self._order], self._starts, axis=1), raw[:, -1]
+
+    def top_reasons(self, contributions: np.ndarray, k: int = EXPLAIN_TOP_K) -> tuple:
+        """
+        Indeksy k pól o największym wkładzie dla każdego wiersza (malejąco) i ich wkłady, jednym argsort.
+        Zwraca (indeksy (n, k), wkłady (n, k)).
+        """
+        k = min(k, len(self.fields))
+        order = np.argsort(-contributions, axis=1, kind="stable")[:, :k]
+        return order, np.take_along_axis(contributions, order, axis=1)
+
+    def explanations(self, contributions: np.ndarray, base: np.ndarray, k: int = EXPLAIN_TOP_K) -> list:
+        #Słowniki dla API: wszystkie wkłady pól + główne powody (tylko pola podnoszące ryzyko)
+        order, top = self.top_reasons(contributions, k)
+        return [
+            {
+                "base_value": float(b),
+                "contributions": dict(zip(self.fields, row.tolist())),
+                "top_reasons": [{"feature": self.fields[idx], "contribution": value}
+                                for idx, value in zip(row_order.tolist(), row_top.tolist()) if value > 0],
+            }
+            for row, b, row_order, row_top in zip(contributions, base, order, top)
+        ]
@@ -0,0 +1,180 @@
+import json
+import os
+import numpy as np
+
+# Spłaszczony model do serwowania bez xgboost / sklearn / pandas: jeden plik, samo NumPy.
+# Układ pliku:
+#   MAGIC | uint64 długość nagłówka | nagłówek JSON | tablice (każda wyrównana do 64 B)
+# Nagłówek opisuje cechy (kolejność, kolumny numeryczne, tabela kategorii), próg, bazowy margin
+# i położenie tablic, więc plik można zmapować do pamięci (np.memmap) bez kopiowania.
+
+FLAT_MODEL_FILE = "model.flat"
+MAGIC = b"CHURNFLAT1"
+ALIGNMENT = 64
+BLOCK_ROWS = 4096  # wiersze liczone naraz (macierz węzłów: wiersze x drzewa)
+
+# Tablice węzłów wszystkich drzew (indeksy dzieci są globalne, liść wskazuje na siebie)
+NODE_ARRAYS = ("feature", "split", "left", "right", "default_left", "value")
+
+def _logit(p: float) -> np.float32:
+    #Margin bazowy jak w XGBoost (base_score jest zapisany jako prawdopodobieństwo)
+    one = np.float32(1.0)
+    return np.float32(-np.log(one / np.float32(p) - one))
+
+def flatten_booster(booster) -> tuple:
+    """
+    Drzewa boostera (binary:logistic, gbtree, podziały numeryczne) -> (tablice węzłów, korzenie, margin bazowy).
+    W węźle: x < split -> lewe dziecko, brak wartości (NaN) -> kierunek default_left.
+    Tablice są od razu w postaci dla ewaluatora - plik można mapować do pamięci bez przeliczeń.
+    Wartość liścia XGBoost trzyma w split_conditions.
+    """
+    model = json.loads(booster.save_raw(raw_format="json"))
+    learner = model["learner"]
+    if learner["objective"]["name"] != "binary:logistic":
+        raise ValueError(f"Nieobsługiwany cel modelu: {learner['objective']['name']}")
+    if learner["gradient_booster"]["name"] != "gbtree":
+        raise ValueError(f"Nieobsługiwany booster: {learner['gradient_booster']['name']}")
+
+    trees = learner["gradient_booster"]["model"]["trees"]
+    arrays = {name: [] for name in NODE_ARRAYS}
+    roots = []
+    offset = 0
+    for tree in trees:
+        if any(tree["split_type"]):
+            raise ValueError("Podziały kategoryczne XGBoost nie są obsługiwane")
+        left = np.asarray(tree["left_children"], dtype=np.int32)
+        right = np.asarray(tree["right_children"], dtype=np.int32)
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        node_ids = np.arange(offset, offset + len(left), dtype=np.int32)
+        leaf = left < 0
+
+        # Liść wskazuje na siebie (cecha 0, split +inf): kolejne kroki ewaluacji go nie zmieniają,
+        # więc wszystkie drzewa schodzą tyle samo kroków bez rozgałęzień w pętli
+        roots.append(offset)
+        arrays["feature"].append(np.where(leaf, 0, np.asarray(tree["split_indices"], dtype=np.int32)))
+        arrays["split"].append(np.where(leaf, np.float32(np.inf), conditions))
+        arrays["left"].append(np.where(leaf, node_ids, left + offset))
+        arrays["right"].append(np.where(leaf, node_ids, right + offset))
+        arrays["default_left"].append(np.asarray(tree["default_left"], dtype=bool))
+        arrays["value"].append(np.where(leaf, conditions, np.float32(0)))
+        offset += len(left)
+
+    nodes = {name: np.concatenate(parts) for name, parts in arrays.items()}
+    base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+    return nodes, np.asarray(roots, dtype=np.int32), _logit(base_score)
+
+def _tree_depth(nodes: dict, roots: np.ndarray) -> int:
+    # Najdłuższa ścieżka od korzenia do liścia (tyle kroków wykonuje ewaluator)
+    depth = 0
+    level = roots
+    while True:
+        inner = level[nodes["left"][level] != level]
+        if not inner.size:
+            return depth
+        level = np.concatenate([nodes["left"][inner], nodes["right"][inner]])
+        depth += 1
+
+def export_flat_model(booster, categories: dict, threshold: float, path: str):
+    """
+    Zapisuje model + tabelę kategorii + próg jako jeden plik (zapis atomowy).
+    categories: kolumna -> lista kategorii (jak models/categories.json).
+    """
+    nodes, roots, base_margin = flatten_booster(booster)
+    arrays = {**nodes, "roots": roots}
+    feature_names = list(booster.feature_names or [])
+    encoded = {f"{col}_{value}" for col, values in categories.items() for value in values}
+
+    header = {
+        "format": MAGIC.decode(),
+        "feature_names": feature_names,
+        "num_cols": [c for c in feature_names if c not in encoded],
+        "categories": categories,
+        "threshold": float(threshold),
+        "base_margin": float(base_margin),
+        "num_trees": int(len(roots)),
+        "max_depth": _tree_depth(nodes, roots),
+        "arrays": {},
+    }
+
+    # Położenia tablic liczymy względem początku części z danymi, potem przesuwamy o długość nagłówka
+    position = 0
+    for name, array in arrays.items():
+        position = -(-position // ALIGNMENT) * ALIGNMENT
+        header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": position}
+        position += array.nbytes
+
+    header_bytes = json.dumps(header).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + header["arrays"][name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, path)
+
+class FlatModel:
+    """
+    Wektorowy ewaluator spłaszczonego modelu (samo NumPy).
+    Margin jest identyczny bit w bit z booster.predict(output_margin=True): drzewa sumowane w float32
+    w kolejności treningu, zaczynając od bazowego marginu. Prawdopodobieństwo (sigmoida) może różnić się
+    od XGBoost o 1-2 ulp float32 (inna implementacja exp).
+    """
+    def __init__(self, path: str, mmap: bool = True):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"To nie jest plik spłaszczonego modelu: {path}")
+            header_len = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_len))
+        data_start = -(-(len(MAGIC) + 8 + header_len) // ALIGNMENT) * ALIGNMENT
+
+        self.path = path
+        self.feature_names = header["feature_names"]
+        self.num_cols = header["num_cols"]
+        self.categories = header["categories"]
+        self.threshold = header["threshold"]
+        self.base_margin = np.float32(header["base_margin"])
+        self.max_depth = header["max_depth"]
+
+        raw = np.memmap(path, dtype=np.uint8, mode="r") if mmap else np.fromfile(path, dtype=np.uint8)
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            start = data_start + spec["offset"]
+            count = int(np.prod(spec["shape"]))
+            setattr(self, name, raw[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"]))
+
+    def _leaf_values(self, X: np.ndarray) -> np.ndarray:
+        # Wszystkie drzewa naraz: macierz bieżących węzłów (wiersze x drzewa), max_depth kroków w dół
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_start = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = np.take(flat, row_start + np.take(self.feature, node))
+            go_left = x < np.take(self.split, node)
+            missing = np.isnan(x)
+            if missing.any():
+                go_left |= missing & np.take(self.default_left, node)
+            node = np.where(go_left, np.take(self.left, node), np.take(self.right, node))
+        return np.take(self.value, node)
+
+    def predict_margin(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        margin = np.empty(X.shape[0], dtype=np.float32)
+        for start in range(0, X.shape[0], BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            leaves = self._leaf_values(block)
+            # Sumowanie sekwencyjne (np.add.accumulate) w float32 - ta sama kolejność co w XGBoost
+            values = np.concatenate([np.full((len(block), 1), self.base_margin, dtype=np.float32), leaves], axis=1)
+            margin[start:start + BLOCK_ROWS] = np.add.accumulate(values, axis=1)[:, -1]
+        return margin
+
+    def predict(self, X) -> np.ndarray:
+        #P(churn) jak booster.inplace_predict dla binary:logistic (float32)
+        margin = self.predict_margin(X)
+        one = np.float32(1.0)
+        return one / (one + np.exp(-margin.astype(np.float64)).astype(np.float32))
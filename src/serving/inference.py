@@ -1,80 +1,454 @@
-import pandas as pd
-import xgboost as xgb
-import joblib
+import numpy as np
+import threading
+import time
 import json
 import os
-from src.data.preprocess import preprocess_data
-from src.features.build_features import build_features
+from src.data.schema import SCHEMA_FILE, DataSchema, InvalidRecords, load_schema
+from src.features.encoding_plan import CATEGORY_TABLE_FILE, EncodingPlan, category_table, load_category_table
+from src.serving.cache import PredictionCache
+from src.serving.explain import EXPLAIN_TOP_K, Explainer
+from src.serving.flat_model import FLAT_MODEL_FILE, FlatModel
+from src.serving.metrics import PREDICTIONS, STAGE_SECONDS
+from src.serving.registry import ARTIFACTS_DIR, resolve_bundle, verify_bundle
 from src.utils import get_logger
 
 logger = get_logger("INFERENCE_SERVICE")
 
-class ChurnModel:
-    def __init__(self):
-        self.model_path = "models/xgb_model.json"
-        self.encoder_path = "models/encoder.joblib"
-        self.threshold_path = "models/threshold.json"
-        
-        self.model = None
-        self.encoder = None
+# Ile wierszy liczymy na rozgrzewkę nowego modelu przed podmianą
+WARMUP_ROWS = 8
+
+# Silniki predykcji: booster XGBoost albo spłaszczony model (samo NumPy, plik model.flat)
+SCORERS = ("xgboost", "flat")
+
+class ModelState:
+    """
+    Niezmienny komplet artefaktów JEDNEGO treningu: model + encoder + plan kodowania + próg.
+    Request bierze referencję raz i liczy do końca na tym samym komplecie,
+    nawet jeśli w międzyczasie model zostanie podmieniony.
+    scorer="flat" liczy na spłaszczonym modelu (model.flat) - bez importu xgboost.
+    """
+    def __init__(self, artifacts_dir: str, version: str, scorer: str = "xgboost"):
+        if scorer not in SCORERS:
+            raise ValueError(f"Nieznany silnik predykcji: {scorer} (dostępne: {', '.join(SCORERS)})")
+        self.artifacts_dir = artifacts_dir
+        self.version = version
+        self.scorer = scorer
+        self._model = None
+        self._encoder = None
+        self._explainer = None
+
+        if scorer == "flat":
+            # 1-2. Drzewa, kolejność cech i tabela kategorii w jednym pliku (mapowanym do pamięci)
+            self.flat = FlatModel(os.path.join(artifacts_dir, FLAT_MODEL_FILE))
+            self.booster = None
+            self.predict = self.flat.predict
+            self.feature_names = list(self.flat.feature_names)
+            categories = self.flat.categories
+        else:
+            # 1. Model XGBoost (sam booster - do predykcji nie potrzeba wrappera sklearn)
+            import xgboost as xgb
+            self.flat = None
+            self.booster = xgb.Booster(model_file=os.path.join(artifacts_dir, "xgb_model.json"))
+            self.predict = self.booster.inplace_predict
+
+            # 2. Kategorie encodera z tabeli JSON; starsze artefakty bez niej - z pickla sklearn
+            table_path = os.path.join(artifacts_dir, CATEGORY_TABLE_FILE)
+            categories = load_category_table(table_path) if os.path.exists(table_path) else category_table(self.encoder)
+            self.feature_names = list(self.booster.feature_names or [])
+
+        # Kolejność kolumn, której oczekuje model + skompilowany plan kodowania
+        self.plan = EncodingPlan.from_category_table(categories, self.feature_names)
+        self.cat_cols = list(self.plan.categories)
+        self.num_cols = self.plan.num_cols
+
+        # 3. Threshold
         self.threshold = 0.5 # Domyślna wartość, nadpiszemy ją
-        
-        self._load_artifacts()
+        threshold_path = os.path.join(artifacts_dir, "threshold.json")
+        if os.path.exists(threshold_path):
+            with open(threshold_path, "r") as f:
+                data = json.load(f)
+                self.threshold = data.get("threshold", 0.5)
+
+        # 4. Schemat danych treningowych jako wektorowe sprawdzenia macierzy cech
+        # (artefakty bez schema.json - tylko znane kategorie i wartości skończone)
+        schema_path = os.path.join(artifacts_dir, SCHEMA_FILE)
+        schema = load_schema(schema_path) if os.path.exists(schema_path) else {"categorical": categories}
+        self.schema = DataSchema(schema, self.plan)
+
+        # Każdy wątek serwera dostaje własny, raz zaalokowany wiersz wejściowy (szerokość zależy od modelu)
+        self._buffers = threading.local()
+
+    # XGBClassifier i encoder sklearn są potrzebne tylko poza ścieżką predykcji
+    # (benchmarki, ścieżka pandas) - ładowane przy pierwszym użyciu
+    @property
+    def model(self):
+        if self._model is None:
+            import xgboost as xgb
+            model = xgb.XGBClassifier()
+            model.load_model(os.path.join(self.artifacts_dir, "xgb_model.json"))
+            self._model = model
+        return self._model
 
-    def _load_artifacts(self):
-        #Ładuje Model, Encoder i Threshold przy starcie.
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            from src.features.build_features import load_encoder
+            self._encoder = load_encoder(os.path.join(self.artifacts_dir, "encoder.joblib"))
+        return self._encoder
+
+    @property
+    def explainer(self) -> Explainer:
+        # pred_contribs liczy tylko XGBoost - przy scorer="flat" booster jest wczytywany przy pierwszym wyjaśnieniu
+        if self._explainer is None:
+            booster = self.booster
+            if booster is None:
+                import xgboost as xgb
+                booster = xgb.Booster(model_file=os.path.join(self.artifacts_dir, "xgb_model.json"))
+            self._explainer = Explainer(booster, self.plan)
+        return self._explainer
+
+    def row_buffer(self):
+        row = getattr(self._buffers, "row", None)
+        if row is None:
+            row = self.plan.new_row()
+            self._buffers.row = row
+        return row
+
+    def warmup(self):
+        #Pierwsze predykcje (alokacje XGBoost, strony mmap, cache) liczymy przed podmianą, a nie na requeście klienta
+        self.predict(self.plan.encode_row({}, out=self.row_buffer()))
+        self.predict(np.zeros((WARMUP_ROWS, self.plan.n_features), dtype=np.float32))
+
+class ChurnModel:
+    """
+    Serwis predykcji z podmienianym modelem.
+    Ładuje bieżącą paczkę z models/bundles (albo stary układ models/*.json, gdy paczek brak);
+    reload() wczytuje nową paczkę obok starej, rozgrzewa ją i podmienia jednym przypisaniem.
+    scorer: "xgboost" (domyślnie) albo "flat" - spłaszczony model NumPy, szybszy dla pojedynczych wierszy.
+    validate: rekordy niezgodne ze schematem danych treningowych są odrzucane (InvalidRecords)
+    zamiast liczone z pustym one-hot.
+    """
+    def __init__(self, bundle_dir: str = None, cache_size: int = 0, cache_ttl_s: float = None,
+                 scorer: str = "xgboost", validate: bool = True):
+        self.scorer = scorer
+        self.validate = validate
+        self._nthread = None
+        self._reload_lock = threading.Lock()
+        # Opcjonalny cache wyników dla powtarzających się profili klientów (cache_size=0 -> wyłączony)
+        self.cache = PredictionCache(cache_size, cache_ttl_s) if cache_size else None
+        self._state = self._load_state(bundle_dir or resolve_bundle())
+
+    def _load_state(self, bundle_dir: str = None) -> ModelState:
+        #Ładuje Model, Encoder i Threshold (z paczki ze sprawdzeniem sum kontrolnych albo z models/).
         try:
-            # 1. Model XGBoost
-            self.model = xgb.XGBClassifier()
-            self.model.load_model(self.model_path)
-            
-            # 2. Encoder
-            self.encoder = joblib.load(self.encoder_path)
-            
-            # 3. Threshold 
-            if os.path.exists(self.threshold_path):
-                with open(self.threshold_path, "r") as f:
-                    data = json.load(f)
-                    self.threshold = data.get("threshold", 0.5)
-            
-            logger.info(f"Artefakty załadowane. Próg decyzji: {self.threshold:.3f}")
-            
+            if bundle_dir is None:
+                state = ModelState(ARTIFACTS_DIR, "legacy", self.scorer)
+            else:
+                manifest = verify_bundle(bundle_dir)
+                state = ModelState(bundle_dir, manifest["version"], self.scorer)
+
+            if self._nthread is not None and state.booster is not None:
+                state.booster.set_param({"nthread": self._nthread})
+
+            logger.info(f"Artefakty załadowane (wersja {state.version}). Próg decyzji: {state.threshold:.3f}")
+            return state
+
         except Exception as e:
             logger.error(f"Błąd ładowania artefaktów: {e}")
             raise e
 
+    def reload(self, bundle_dir: str = None) -> bool:
+        """
+        Podmienia model na bieżącą paczkę (albo wskazaną przez bundle_dir).
+        Ładowanie i rozgrzewka odbywają się obok serwowanego modelu; requesty w toku
+        kończą się na starym komplecie. Zwraca False, gdy ta wersja jest już załadowana.
+        Błąd ładowania (np. zła suma kontrolna) zostawia poprzedni model.
+        """
+        bundle_dir = bundle_dir or resolve_bundle()
+        if bundle_dir is None:
+            return False
+
+        with self._reload_lock:
+            if os.path.basename(os.path.normpath(bundle_dir)) == self.version:
+                return False
+            state = self._load_state(bundle_dir)
+            state.warmup()
+            previous = self.version
+            self._state = state  # atomowa podmiana referencji
+            if self.cache is not None:
+                self.cache.clear()  # wpisy starej wersji i tak nie pasują już do klucza
+
+        logger.info(f"Model podmieniony: {previous} -> {state.version}")
+        return True
+
+    # Atrybuty bieżącego kompletu (zgodność z dotychczasowym API)
+    @property
+    def version(self) -> str:
+        return self._state.version
+
+    @property
+    def bundle_dir(self):
+        #Katalog serwowanej paczki (None dla starego układu models/*.json)
+        return None if self.version == "legacy" else self._state.artifacts_dir
+
+    @property
+    def model(self):
+        return self._state.model
+
+    @property
+    def booster(self):
+        return self._state.booster
+
+    @property
+    def encoder(self):
+        return self._state.encoder
+
+    @property
+    def plan(self) -> EncodingPlan:
+        return self._state.plan
+
+    @property
+    def cat_cols(self) -> list:
+        return self._state.cat_cols
+
+    @property
+    def num_cols(self) -> list:
+        return self._state.num_cols
+
+    @property
+    def feature_names(self) -> list:
+        return self._state.feature_names
+
+    @property
+    def threshold(self) -> float:
+        return self._state.threshold
+
+    @property
+    def schema(self) -> DataSchema:
+        return self._state.schema
+
+    def set_nthread(self, nthread: int):
+        #Liczba wątków XGBoost na jedno wywołanie predykcji (dobierana do puli serwera; obowiązuje też po reload)
+        self._nthread = int(nthread)
+        if self._state.booster is not None:
+            self._state.booster.set_param({"nthread": self._nthread})
+
+    @staticmethod
+    def _build_result(prob: float, threshold: float) -> dict:
+        # Decyzja w oparciu o Twój Threshold (np. 0.62)
+        prediction = 1 if prob >= threshold else 0
+
+        return {
+            "churn_prediction": int(prediction),
+            "churn_probability": float(prob),
+            "threshold_used": threshold,
+            "risk_level": "Critical" if prob > 0.8 else ("High" if prob > threshold else "Low")
+        }
+
+    def _encode(self, state: ModelState, records: list) -> tuple:
+        #(macierz cech, flagi wartości nieliczbowych dla walidacji albo None przy validate=False)
+        start = time.perf_counter()
+        unparsed = np.zeros((len(records), len(state.plan.num_cols)), dtype=bool) if self.validate else None
+        matrix = state.plan.encode_rows(records, unparsed=unparsed)
+        STAGE_SECONDS.observe(time.perf_counter() - start, "encode")
+        return matrix, unparsed
+
+    def _check(self, state: ModelState, matrix: np.ndarray, unparsed: np.ndarray = None) -> np.ndarray:
+        #Maska powodów odrzucenia dla wierszy macierzy (same zera przy validate=False)
+        if not self.validate:
+            return np.zeros(len(matrix), dtype=np.uint64)
+        start = time.perf_counter()
+        mask = state.schema.check(matrix, unparsed)
+        STAGE_SECONDS.observe(time.perf_counter() - start, "validate")
+        return mask
+
+    def _score(self, state: ModelState, matrix: np.ndarray) -> np.ndarray:
+        #Prawdopodobieństwa dla wierszy macierzy; z cache booster liczy tylko wiersze, których w nim nie ma
+        cache = self.cache
+        if cache is None:
+            start = time.perf_counter()
+            probs = state.predict(matrix)
+            STAGE_SECONDS.observe(time.perf_counter() - start, "model")
+            return probs
+
+        start = time.perf_counter()
+        keys = [cache.key(state.version, row) for row in matrix]
+        probs = np.array([cache.get(key) for key in keys], dtype=np.float64)  # brak w cache -> NaN
+        missing = np.flatnonzero(np.isnan(probs))
+        STAGE_SECONDS.observe(time.perf_counter() - start, "cache")
+        if missing.size:
+            start = time.perf_counter()
+            fresh = state.predict(matrix[missing])
+            STAGE_SECONDS.observe(time.perf_counter() - start, "model")
+            probs[missing] = fresh
+            for idx, prob in zip(missing, fresh):
+                cache.put(keys[idx], prob)
+        return probs
+
     def predict(self, data: dict) -> dict:
         """
         Główna funkcja predykcyjna.
         Przyjmuje słownik danych klienta -> Zwraca wynik Churn/No Churn.
+        Szybka ścieżka: dict -> wiersz float32 (EncodingPlan) -> inplace_predict boostera (albo model.flat),
+        bez pandas (wynik identyczny jak preprocess_data + build_features + predict_proba).
+        Czas każdego etapu trafia do metryki churn_stage_seconds.
         """
+        state = self._state  # jeden komplet artefaktów na cały request
         try:
-            # 1. Dict -> DataFrame
-            df_raw = pd.DataFrame([data])
-            
-            # 2. Pipeline
-            df_clean = preprocess_data(df_raw)
-            df_features = build_features(df_clean, train_mode=False)
-            
-            # Usunięcie targetu (jeśli przeszedł w danych)
-            if 'churn' in df_features.columns:
-                df_features = df_features.drop(columns=['churn'])
-            
-            # 3. Predykcja Prawdopodobieństwa
-            # Zwraca np. [0.2, 0.8] -> bierzemy drugą wartość (prawd. Churn)
-            prob = self.model.predict_proba(df_features)[0][1]
-            
-            # 4. Decyzja w oparciu o Twój Threshold (np. 0.62)
-            prediction = 1 if prob >= self.threshold else 0
-            
-            result = {
-                "churn_prediction": int(prediction),
-                "churn_probability": float(prob),
-                "threshold_used": self.threshold,
-                "risk_level": "Critical" if prob > 0.8 else ("High" if prob > self.threshold else "Low")
-            }
+            # 1. Dict -> wiersz float32 (bufor wielokrotnego użytku)
+            start = time.perf_counter()
+            unparsed = np.zeros((1, len(state.plan.num_cols)), dtype=bool) if self.validate else None
+            row = state.plan.encode_row(data, out=state.row_buffer(),
+                                        unparsed=None if unparsed is None else unparsed[0])
+            STAGE_SECONDS.observe(time.perf_counter() - start, "encode")
+
+            bits = int(self._check(state, row, unparsed)[0])
+            if bits:
+                raise InvalidRecords({0: state.schema.describe(bits)})
+
+            # 2. Predykcja Prawdopodobieństwa (dla binary:logistic booster zwraca od razu P(churn))
+            prob = self._score(state, row)[0]
+
+            start = time.perf_counter()
+            result = self._build_result(prob, state.threshold)
+            STAGE_SECONDS.observe(time.perf_counter() - start, "response")
+            PREDICTIONS.inc(state.version, result["churn_prediction"])
             return result
-            
+
+        except InvalidRecords:
+            raise
         except Exception as e:
             logger.error(f"Błąd podczas predykcji: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    def _results(self, state: ModelState, matrix: np.ndarray) -> list:
+        #Wyniki dla wierszy macierzy: jedno wektorowe wywołanie modelu + metryki
+        probs = self._score(state, matrix)
+
+        start = time.perf_counter()
+        results = [self._build_result(prob, state.threshold) for prob in probs]
+        STAGE_SECONDS.observe(time.perf_counter() - start, "response")
+
+        churned = sum(r["churn_prediction"] for r in results)
+        PREDICTIONS.inc(state.version, 1, amount=churned)
+        PREDICTIONS.inc(state.version, 0, amount=len(results) - churned)
+        return results
+
+    def predict_batch(self, records: list) -> list:
+        """
+        Predykcja dla wielu klientów naraz (jedno wektorowe wywołanie boostera).
+        Zwraca wyniki w tej samej kolejności co wejście.
+        Niepoprawny rekord odrzuca całą paczkę: InvalidRecords z powodami dla każdego złego rekordu.
+        """
+        if not records:
+            return []
+        state = self._state
+        try:
+            matrix, unparsed = self._encode(state, records)
+            mask = self._check(state, matrix, unparsed)
+            if mask.any():
+                raise InvalidRecords(state.schema.errors(mask))
+
+            return self._results(state, matrix)
+
+        except InvalidRecords:
+            raise
+        except Exception as e:
+            logger.error(f"Błąd podczas predykcji wsadowej: {e}")
+            raise e
+
+    def predict_each(self, records: list) -> list:
+        """
+        Jak predict_batch, ale niepoprawny rekord nie przerywa paczki - na jego miejscu zwracany jest
+        wyjątek InvalidRecords (micro-batching: zły request nie psuje requestów zebranych razem z nim).
+        """
+        if not records:
+            return []
+        state = self._state
+        try:
+            matrix, unparsed = self._encode(state, records)
+            mask = self._check(state, matrix, unparsed)
+            valid = np.flatnonzero(mask == 0)
+            results = [InvalidRecords({0: state.schema.describe(int(bits))}) if bits else None for bits in mask]
+            if valid.size:
+                for idx, result in zip(valid, self._results(state, matrix[valid])):
+                    results[idx] = result
+            return results
+
+        except Exception as e:
+            logger.error(f"Błąd podczas predykcji wsadowej: {e}")
+            raise e
+
+    def _explain(self, state: ModelState, matrix: np.ndarray) -> tuple:
+        #(wkłady pól, base_value) dla wierszy macierzy - jedno wywołanie pred_contribs
+        start = time.perf_counter()
+        contributions, base = state.explainer.contributions(matrix)
+        STAGE_SECONDS.observe(time.perf_counter() - start, "explain")
+        return contributions, base
+
+    def explain(self, records: list, top_k: int = EXPLAIN_TOP_K) -> list:
+        """
+        Predykcje z wyjaśnieniem dla wielu klientów (jeden wektorowy przebieg pred_contribs).
+        Każdy wynik jak w predict_batch + "explanation": base_value, wkłady wszystkich pól klienta
+        (log-odds, one-hot zsumowane do pól) i top_k głównych powodów ryzyka.
+        Niepoprawny rekord odrzuca całą paczkę (InvalidRecords), jak w predict_batch.
+        """
+        if not records:
+            return []
+        state = self._state
+        try:
+            matrix, unparsed = self._encode(state, records)
+            mask = self._check(state, matrix, unparsed)
+            if mask.any():
+                raise InvalidRecords(state.schema.errors(mask))
+
+            results = self._results(state, matrix)
+            contributions, base = self._explain(state, matrix)
+            for result, explanation in zip(results, state.explainer.explanations(contributions, base, top_k)):
+                result["explanation"] = explanation
+            return results
+
+        except InvalidRecords:
+            raise
+        except Exception as e:
+            logger.error(f"Błąd podczas wyjaśniania predykcji: {e}")
+            raise e
+
+    @property
+    def explainer(self) -> Explainer:
+        #Wyjaśnienia bieżącego modelu; explainer.fields = kolejność kolumn wkładów w score_frame(explain=True)
+        return self._state.explainer
+
+    def predict_proba_frame(self, df) -> np.ndarray:
+        #Prawdopodobieństwa churnu dla ramki po preprocess_data (batch scoring, jeden przebieg modelu)
+        state = self._state
+        return state.predict(state.plan.encode_frame(df))
+
+    def score_frame(self, df, validate: bool = True, explain: bool = False, unparsed: dict = None) -> tuple:
+        """
+        Batch scoring: (prawdopodobieństwa, maska powodów odrzucenia, wkłady pól) dla ramki po preprocess_data.
+        validate=True: odrzucone wiersze nie są liczone (NaN); powody: self.schema.reason_strings(maska).
+        unparsed: maski wartości nieliczbowych z preprocess_data(df_raw, unparsed=...) - takie wiersze są odrzucane.
+        explain=True: wkłady pól (wiersze x self.explainer.fields) z jednego przebiegu pred_contribs, inaczej None.
+        """
+        state = self._state
+        if validate:
+            state.schema.check_columns(df)
+        matrix = state.plan.encode_frame(df)
+        if validate:
+            mask = state.schema.check(matrix, state.schema.unparsed_flags(unparsed, len(matrix)) if unparsed else None)
+        else:
+            mask = np.zeros(len(matrix), dtype=np.uint64)
+        valid = mask == 0
+        if valid.all():
+            contributions = state.explainer.contributions(matrix)[0] if explain else None
+            return state.predict(matrix), mask, contributions
+
+        # Odrzucone wiersze: NaN w wynikach, w kolejności wierszy ramki
+        probs = np.full(len(matrix), np.nan, dtype=np.float32)
+        contributions = np.full((len(matrix), len(state.explainer.fields)), np.nan, dtype=np.float32) if explain else None
+        if valid.any():
+            probs[valid] = state.predict(matrix[valid])
+            if explain:
+                contributions[valid] = state.explainer.contributions(matrix[valid])[0]
+        return probs, mask, contributions
@@ -0,0 +1,135 @@
+import bisect
+import threading
+
+# Minimalny rejestr metryk w formacie tekstowym Prometheusa (bez zależności zewnętrznych).
+# Zapis metryki to słownik + blokada (~1 us), więc instrumentacja może być stale włączona.
+
+# Sekundy: od 50 us (szybka ścieżka predykcji) do kilku sekund (duże paczki)
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                  for labels, value in items]
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # etykiety -> [liczniki kubełków (+Inf na końcu), suma, liczba]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = [(labels, (list(counts), total, n)) for labels, (counts, total, n) in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, n) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {n}")
+        return lines
+
+class CallbackMetric:
+    """
+    Wartości liczone dopiero przy odczycie /metrics (np. rozmiar kolejki, liczniki cache, wersja modelu).
+    fn() -> {krotka etykiet: wartość}
+    """
+    def __init__(self, name: str, help_text: str, kind: str, labelnames: tuple, fn):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                  for labels, value in self.fn().items()]
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metryka {metric.name} jest już zarejestrowana")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def callback(self, name: str, help_text: str, fn, kind: str = "gauge", labelnames: tuple = ()) -> CallbackMetric:
+        #Rejestruje (albo podmienia) metrykę liczoną przy odczycie
+        metric = CallbackMetric(name, help_text, kind, labelnames, fn)
+        self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+# Rejestr procesu serwującego i metryki ścieżki predykcji
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "churn_stage_seconds", "Czas etapu predykcji (encode, validate, cache, model, explain, response)", ("stage",))
+REQUESTS = REGISTRY.counter(
+    "churn_requests_total", "Requesty API wg endpointu i kodu odpowiedzi", ("endpoint", "status"))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "churn_request_seconds", "Czas obsługi requestu API (z kolejką i micro-batchingiem)", ("endpoint",))
+BATCH_SIZE = REGISTRY.histogram(
+    "churn_batch_size", "Liczba wierszy w jednym wywołaniu modelu", ("source",), buckets=BATCH_SIZE_BUCKETS)
+PREDICTIONS = REGISTRY.counter(
+    "churn_predictions_total", "Policzone predykcje wg wersji modelu i decyzji", ("model_version", "prediction"))
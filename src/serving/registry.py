@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+from src.utils import get_logger
+
+logger = get_logger("MODEL_REGISTRY")
+
+# Wersjonowane paczki artefaktów: models/bundles/<wersja>/ (model + encoder + próg z JEDNEGO treningu)
+# models/bundles/CURRENT - nazwa paczki, którą serwujemy
+ARTIFACTS_DIR = "models"
+BUNDLES_DIR = os.path.join(ARTIFACTS_DIR, "bundles")
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+BUNDLE_FILES = ("xgb_model.json", "encoder.joblib", "categories.json", "threshold.json", "model.flat")
+# Dołączane, jeśli istnieją (artefakty sprzed ich wprowadzenia działają bez nich)
+OPTIONAL_BUNDLE_FILES = ("schema.json",)
+
+def _sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+def _write_atomic(path: str, text: str):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def publish_bundle(source_dir: str = ARTIFACTS_DIR, bundles_dir: str = BUNDLES_DIR,
+                   metadata: dict = None, activate: bool = True) -> str:
+    """
+    Kopiuje artefakty treningu (BUNDLE_FILES i istniejące OPTIONAL_BUNDLE_FILES z source_dir)
+    do nowej, niezmiennej paczki z manifestem (sumy SHA-256) i - domyślnie - ustawia ją jako bieżącą.
+    Zwraca nazwę wersji.
+    """
+    names = list(BUNDLE_FILES) + [name for name in OPTIONAL_BUNDLE_FILES
+                                  if os.path.exists(os.path.join(source_dir, name))]
+    checksums = {name: _sha256(os.path.join(source_dir, name)) for name in names}
+    content_hash = hashlib.sha256(json.dumps(checksums, sort_keys=True).encode()).hexdigest()[:8]
+
+    # Te same artefakty co w istniejącej paczce -> nie duplikujemy jej
+    existing = [name for name in list_bundles(bundles_dir) if name.endswith(f"-{content_hash}")]
+    if existing:
+        version = existing[-1]
+        logger.info(f"Paczka z tymi artefaktami już istnieje: {version}")
+        if activate:
+            activate_bundle(version, bundles_dir)
+        return version
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    version = f"{stamp}-{content_hash}"
+
+    # Katalog tymczasowy + atomowa podmiana - serwer nigdy nie zobaczy połowy paczki
+    bundle_dir = os.path.join(bundles_dir, version)
+    tmp_dir = f"{bundle_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name in names:
+        shutil.copyfile(os.path.join(source_dir, name), os.path.join(tmp_dir, name))
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "files": checksums,
+        "metadata": metadata or {},
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_dir, bundle_dir)
+
+    logger.info(f"Opublikowano paczkę modelu {version}")
+    if activate:
+        activate_bundle(version, bundles_dir)
+    return version
+
+def activate_bundle(version: str, bundles_dir: str = BUNDLES_DIR):
+    #Ustawia paczkę jako bieżącą (też rollback do starszej wersji). Serwer podmieni model sam.
+    verify_bundle(os.path.join(bundles_dir, version))
+    _write_atomic(os.path.join(bundles_dir, CURRENT_FILE), version)
+    logger.info(f"Bieżąca paczka modelu: {version}")
+
+def current_version(bundles_dir: str = BUNDLES_DIR):
+    #Nazwa bieżącej paczki albo None (brak paczek -> stary układ models/*.json)
+    try:
+        with open(os.path.join(bundles_dir, CURRENT_FILE), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def resolve_bundle(bundles_dir: str = BUNDLES_DIR):
+    #Katalog bieżącej paczki albo None
+    version = current_version(bundles_dir)
+    return os.path.join(bundles_dir, version) if version else None
+
+def verify_bundle(bundle_dir: str) -> dict:
+    """
+    Sprawdza kompletność paczki i sumy kontrolne z manifestu.
+    Zwraca manifest; przy niezgodności - ValueError (takiej paczki nie wolno serwować).
+    """
+    manifest_path = os.path.join(bundle_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"Brak manifestu paczki: {manifest_path}")
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+
+    for name, expected in manifest["files"].items():
+        path = os.path.join(bundle_dir, name)
+        if not os.path.exists(path) or _sha256(path) != expected:
+            raise ValueError(f"Paczka {manifest['version']}: plik {name} brakuje lub ma złą sumę kontrolną")
+    return manifest
+
+def list_bundles(bundles_dir: str = BUNDLES_DIR) -> list:
+    if not os.path.isdir(bundles_dir):
+        return []
+    return sorted(name for name in os.listdir(bundles_dir)
+                  if os.path.exists(os.path.join(bundles_dir, name, MANIFEST_FILE)))
+
+class BundleWatcher:
+    """
+    Wątek w tle: co `interval` sekund sprawdza models/bundles/CURRENT
+    i po zmianie wywołuje on_change() (ładowanie i podmiana modelu poza ścieżką requestów).
+    served_version() (opcjonalnie) zwraca serwowaną wersję - wtedy porównujemy CURRENT z nią,
+    a nie z ostatnim odczytem, więc rollback w obrębie jednego interwału (np. po /admin/reload) nie ginie.
+    """
+    def __init__(self, on_change, interval: float = 10.0, bundles_dir: str = BUNDLES_DIR, served_version=None):
+        self.on_change = on_change
+        self.interval = interval
+        self.bundles_dir = bundles_dir
+        self.served_version = served_version
+        self._seen = current_version(bundles_dir)
+        self._failed = None  # wersja, której nie udało się załadować - nie ponawiamy co interwał
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bundle-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            version = current_version(self.bundles_dir)
+            served = self.served_version() if self.served_version is not None else self._seen
+            if version is None or version == served or version == self._failed:
+                continue
+            self._seen = version
+            logger.info(f"Wykryto nową paczkę modelu: {version}")
+            try:
+                self.on_change()
+                self._failed = None
+            except Exception as e:
+                # Zła paczka nie zatrzymuje serwera - dalej serwujemy poprzedni model
+                self._failed = version
+                logger.error(f"Nie udało się przeładować modelu: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wersje modelu (paczki artefaktów)")
+    parser.add_argument("--list", action="store_true", help="Lista paczek")
+    parser.add_argument("--publish", action="store_true", help="Paczka z bieżących plików w models/")
+    parser.add_argument("--activate", default=None, help="Ustaw wersję jako bieżącą (np. rollback)")
+    args = parser.parse_args()
+
+    if args.publish:
+        publish_bundle()
+    if args.activate:
+        activate_bundle(args.activate)
+    if args.list or not (args.publish or args.activate):
+        current = current_version()
+        for name in list_bundles():
+            print(f"{'*' if name == current else ' '} {name}")
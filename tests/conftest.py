@@ -0,0 +1,15 @@
+import os
+import pytest
+
+# Testy uruchamiane z katalogu projektu (artefakty z models/): python -m pytest -q tests
+# Samo API, bez obserwowania paczek - ustawione przed importem src.app.main
+os.environ.setdefault("CHURN_UI", "0")
+os.environ.setdefault("CHURN_MODEL_WATCH_S", "0")
+
+@pytest.fixture(scope="session")
+def client():
+    #Jeden klient na całą sesję: lifespan aplikacji (pula predykcji) startuje i kończy się raz
+    from fastapi.testclient import TestClient
+    from src.app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
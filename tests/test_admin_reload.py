@@ -0,0 +1,15 @@
+# /admin/reload: bez CHURN_ADMIN_TOKEN wyłączony (404), z tokenem wymaga zgodnego nagłówka X-Admin-Token
+
+def test_reload_disabled_without_token(client, monkeypatch):
+    import src.app.main as main
+    monkeypatch.setattr(main, "admin_token", None)
+    assert client.post("/admin/reload").status_code == 404
+
+def test_reload_requires_matching_token(client, monkeypatch):
+    import src.app.main as main
+    monkeypatch.setattr(main, "admin_token", "secret")
+    assert client.post("/admin/reload").status_code == 403
+    assert client.post("/admin/reload", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["model_version"] == main.model_service.version
@@ -0,0 +1,88 @@
+import os
+import pytest
+from benchmarks.synthetic import generate_telco_frame
+from src.model import batch_job
+from src.model.batch_job import JobMismatch, run_batch_job, shard_path
+from src.model.predict_model import make_batch_predictions, rejected_path
+
+# Wznawialny batch job: scalony wynik = jedno przejście make_batch_predictions,
+# wznowienie liczy tylko brakujące shardy i nie rusza ukończonych.
+
+ROWS = 3000
+SHARD_ROWS = 500
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+@pytest.fixture(scope="module")
+def data(tmp_path_factory):
+    #Syntetyczne dane Telco z kilkoma wierszami do odrzucenia + wynik jednego przejścia
+    directory = tmp_path_factory.mktemp("batch_job")
+    df = generate_telco_frame(ROWS, seed=7)
+    df.loc[[3, 1200, 2999], "TotalCharges"] = "abc"
+    input_file = str(directory / "input.csv")
+    df.to_csv(input_file, index=False)
+    expected = str(directory / "expected.csv")
+    make_batch_predictions(input_file, expected)
+    return input_file, expected
+
+def test_merge_equals_single_pass(data, tmp_path):
+    input_file, expected = data
+    output = str(tmp_path / "merged.csv")
+    summary = run_batch_job(input_file, str(tmp_path / "job"), shard_rows=SHARD_ROWS, output_file=output)
+
+    assert summary["shards"] > 1
+    assert summary["rows"] + summary["rejected"] == ROWS
+    assert summary["rejected"] == 3
+    assert read_bytes(output) == read_bytes(expected)
+    assert read_bytes(rejected_path(output)) == read_bytes(rejected_path(expected))
+
+def test_resume_skips_finished_shards(data, tmp_path, monkeypatch):
+    input_file, expected = data
+    output_dir, output = str(tmp_path / "job"), str(tmp_path / "merged.csv")
+
+    # Przerwanie w trakcie: trzeci shard kończy się błędem
+    score_shard = batch_job._score_shard
+    calls = []
+    fail_on = [3]
+
+    def failing(model, input_file, part, *args):
+        calls.append(part)
+        if len(calls) in fail_on:
+            raise RuntimeError("przerwane zadanie")
+        return score_shard(model, input_file, part, *args)
+
+    monkeypatch.setattr(batch_job, "_score_shard", failing)
+    with pytest.raises(RuntimeError):
+        run_batch_job(input_file, output_dir, shard_rows=SHARD_ROWS, output_file=output)
+    assert not os.path.exists(output)
+    finished = {idx: os.stat(shard_path(output_dir, idx, "csv")).st_mtime_ns for idx in (0, 1)}
+    assert not os.path.exists(shard_path(output_dir, 2, "csv"))
+
+    # Wznowienie: ukończone shardy pominięte i nietknięte, wynik jak z jednego przejścia
+    calls.clear()
+    fail_on.clear()
+    summary = run_batch_job(input_file, output_dir, shard_rows=SHARD_ROWS, output_file=output)
+    assert summary["skipped"] == 2
+    assert len(calls) == summary["shards"] - 2
+    for idx, mtime in finished.items():
+        assert os.stat(shard_path(output_dir, idx, "csv")).st_mtime_ns == mtime
+    assert read_bytes(output) == read_bytes(expected)
+
+    # Usunięty plik sharda oznaczonego jako ukończony jest liczony ponownie
+    os.remove(shard_path(output_dir, 1, "csv"))
+    calls.clear()
+    summary = run_batch_job(input_file, output_dir, shard_rows=SHARD_ROWS, output_file=output)
+    assert summary["skipped"] == summary["shards"] - 1
+    assert len(calls) == 1
+    assert read_bytes(output) == read_bytes(expected)
+
+def test_changed_parameters_rejected(data, tmp_path):
+    input_file, _ = data
+    output_dir = str(tmp_path / "job")
+    run_batch_job(input_file, output_dir, shard_rows=SHARD_ROWS)
+    with pytest.raises(JobMismatch):
+        run_batch_job(input_file, output_dir, shard_rows=SHARD_ROWS * 2)
+    summary = run_batch_job(input_file, output_dir, shard_rows=SHARD_ROWS * 2, restart=True)
+    assert summary["skipped"] == 0
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from src.serving import cache as cache_module
+from src.serving.cache import PredictionCache
+from test_validation import CUSTOMER
+
+# Cache predykcji: trafienia i chybienia, wypieranie LRU, TTL, klucz zależny od wersji modelu.
+
+ROW = np.arange(4, dtype=np.float32)
+
+class FakeClock:
+    #Zegar time.monotonic sterowany z testu
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", fake)
+    return fake
+
+def test_hit_and_miss():
+    cache = PredictionCache(max_size=10)
+    key = cache.key("v1", ROW)
+    assert cache.get(key) is None
+    cache.put(key, 0.25)
+    assert cache.get(key) == 0.25
+    # Ten sam wiersz (nowa tablica) -> ten sam klucz, inny wiersz -> chybienie
+    assert cache.get(cache.key("v1", ROW.copy())) == 0.25
+    assert cache.get(cache.key("v1", ROW + 1)) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 2, 1)
+    assert stats["hit_rate"] == 0.5
+
+def test_lru_eviction():
+    cache = PredictionCache(max_size=2)
+    a, b, c = (cache.key("v1", ROW + i) for i in range(3))
+    cache.put(a, 0.1)
+    cache.put(b, 0.2)
+    # Odczyt odświeża a - wypierany jest najdawniej używany b
+    assert cache.get(a) == 0.1
+    cache.put(c, 0.3)
+    assert cache.get(b) is None
+    assert cache.get(a) == 0.1
+    assert cache.get(c) == 0.3
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+def test_ttl_expiry(clock):
+    cache = PredictionCache(max_size=10, ttl_s=60)
+    key = cache.key("v1", ROW)
+    cache.put(key, 0.4)
+    clock.now += 60
+    assert cache.get(key) == 0.4
+    clock.now += 1
+    assert cache.get(key) is None
+    # Przeterminowany wpis jest usuwany przy odczycie
+    assert cache.stats()["size"] == 0
+
+def test_no_ttl_never_expires(clock):
+    cache = PredictionCache(max_size=10, ttl_s=0)
+    key = cache.key("v1", ROW)
+    cache.put(key, 0.4)
+    clock.now += 10 ** 9
+    assert cache.get(key) == 0.4
+
+def test_key_changes_with_model_version():
+    cache = PredictionCache(max_size=10)
+    assert cache.key("v1", ROW) != cache.key("v2", ROW)
+    cache.put(cache.key("v1", ROW), 0.7)
+    assert cache.get(cache.key("v2", ROW)) is None
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        PredictionCache(max_size=0)
+
+def test_model_cache_equivalent_inputs_and_version():
+    from src.serving.inference import ChurnModel
+    model = ChurnModel(cache_size=100)
+    expected = ChurnModel().predict(CUSTOMER)
+
+    # Różne zapisy tego samego profilu trafiają w jeden wpis, wynik jak bez cache
+    assert model.predict({**CUSTOMER, "totalcharges": "1000"}) == expected
+    assert model.predict({**CUSTOMER, "totalcharges": 1000.0}) == expected
+    stats = model.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    # Inna wersja modelu -> wpisy poprzedniej nie są osiągalne
+    model._state.version = "other-version"
+    assert model.predict(CUSTOMER) == expected
+    stats = model.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
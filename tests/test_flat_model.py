@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+from src.serving.flat_model import BLOCK_ROWS, FlatModel
+
+# Spłaszczony model z models/model.flat vs booster z models/xgb_model.json (inplace_predict).
+# Wartości cech losowane z progów podziałów (x == split, tuż poniżej i powyżej) oraz NaN (kierunek domyślny).
+
+@pytest.fixture(scope="module")
+def models():
+    flat = FlatModel("models/model.flat")
+    booster = xgb.Booster(model_file="models/xgb_model.json")
+    assert flat.feature_names == booster.feature_names
+    return flat, booster
+
+def random_rows(flat: FlatModel, n: int, nan_share: float, seed: int = 0) -> np.ndarray:
+    #Dla każdej cechy: progi podziałów na tej cesze, +-1 ulp i wartości spoza zakresu
+    rng = np.random.default_rng(seed)
+    inner = flat.left != np.arange(len(flat.left))
+    X = np.empty((n, len(flat.feature_names)), dtype=np.float32)
+    for j in range(X.shape[1]):
+        splits = np.asarray(flat.split[inner & (flat.feature == j)], dtype=np.float32)
+        candidates = np.concatenate([splits, np.nextafter(splits, np.float32(-np.inf)),
+                                     np.nextafter(splits, np.float32(np.inf)), np.float32([-1e6, 0, 1, 1e6])])
+        X[:, j] = rng.choice(candidates, n)
+    X[rng.random(X.shape) < nan_share] = np.nan
+    return X
+
+@pytest.mark.parametrize("nan_share", [0.0, 0.3])
+def test_margin_matches_booster_bit_for_bit(models, nan_share):
+    flat, booster = models
+    # Więcej niż jeden blok ewaluatora
+    X = random_rows(flat, BLOCK_ROWS + 1000, nan_share)
+    expected = booster.inplace_predict(X, predict_type="margin")
+    np.testing.assert_array_equal(flat.predict_margin(X), expected)
+
+def test_all_missing_row_follows_default_directions(models):
+    flat, booster = models
+    X = np.full((1, len(flat.feature_names)), np.nan, dtype=np.float32)
+    np.testing.assert_array_equal(flat.predict_margin(X), booster.inplace_predict(X, predict_type="margin"))
+
+def test_probability_matches_booster(models):
+    flat, booster = models
+    X = random_rows(flat, 2000, nan_share=0.1, seed=1)
+    # Sigmoida: różnica najwyżej kilka ulp float32
+    np.testing.assert_allclose(flat.predict(X), booster.inplace_predict(X), rtol=1e-6, atol=1e-7)
+    assert flat.predict(X[0]).shape == (1,)
@@ -0,0 +1,83 @@
+import math
+import shutil
+import pytest
+from benchmarks.synthetic import generate_telco_frame
+from src.data.preprocess import preprocess_data
+from src.model import incremental
+from src.model.drift import load_profile, save_profile
+from src.model.incremental import TEST_SIZE, FullRetrainRequired, continue_training, train_incremental
+
+# Trening przyrostowy: porcja z jedną klasą / za mała -> pełny trening,
+# a pełny trening awaryjny obejmuje porcje wliczone już w model.
+# Każdy test w osobnym katalogu roboczym z kopią models/ (artefakty projektu nie są zmieniane).
+
+HISTORY_ROWS = 400
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    shutil.copytree("models", tmp_path / "models", ignore=shutil.ignore_patterns("bundles", "training_profile.json"))
+    monkeypatch.chdir(tmp_path)
+    # Profil ostatniego pełnego treningu na HISTORY_ROWS wierszach (część treningowa bez holdoutu)
+    save_profile({"rows": HISTORY_ROWS - math.ceil(TEST_SIZE * HISTORY_ROWS), "metrics": {}})
+    return tmp_path
+
+def write_delta(path, n_rows: int, seed: int, churn: str = None) -> str:
+    df = generate_telco_frame(n_rows, seed=seed, start_id=seed * 10_000)
+    if churn is not None:
+        df["Churn"] = churn
+    df.to_csv(path, index=False)
+    return str(path)
+
+@pytest.fixture
+def full_retrain(monkeypatch):
+    #Pełny trening zastąpiony zapisem danych, na których by się odbył
+    trained = []
+    monkeypatch.setattr(incremental, "build_features", lambda df, **kwargs: df)
+    monkeypatch.setattr(incremental, "train_model", trained.append)
+    return trained
+
+@pytest.mark.parametrize("n_rows, churn", [(200, "No"), (200, "Yes"), (30, None)])
+def test_single_class_or_tiny_delta_requires_full_retrain(workdir, n_rows, churn):
+    df = preprocess_data(generate_telco_frame(n_rows, seed=1))
+    if churn is not None:
+        df["churn"] = int(churn == "Yes")
+    with pytest.raises(FullRetrainRequired, match="za mało danych / jedna klasa"):
+        continue_training(df)
+
+def test_fallback_retrain_includes_earlier_deltas(workdir, full_retrain):
+    history = write_delta(workdir / "history.csv", HISTORY_ROWS, seed=1)
+    earlier = [write_delta(workdir / f"delta{idx}.csv", 100, seed=10 + idx) for idx in range(2)]
+    profile = load_profile()
+    profile["deltas"] = [{"path": path, "rows": 100, "mode": "incremental"} for path in earlier]
+    save_profile(profile)
+
+    # Porcja z jedną klasą -> pełny trening na historii + wcześniejszych porcjach + nowej
+    delta = write_delta(workdir / "delta_new.csv", 50, seed=20, churn="No")
+    result = train_incremental(delta, history)
+
+    assert result["mode"] == "full"
+    assert "jedna klasa" in result["reason"]
+    assert len(full_retrain) == 1
+    assert len(full_retrain[0]) == HISTORY_ROWS + 2 * 100 + 50
+    recorded = load_profile()["deltas"]
+    assert [d["path"] for d in recorded] == [*earlier, delta]
+    assert {d["mode"] for d in recorded} == {"full"}
+
+def test_fallback_retrain_without_earlier_delta_fails(workdir, full_retrain):
+    history = write_delta(workdir / "history.csv", HISTORY_ROWS, seed=1)
+    profile = load_profile()
+    profile["deltas"] = [{"path": str(workdir / "missing.csv"), "rows": 100, "mode": "incremental"}]
+    save_profile(profile)
+
+    delta = write_delta(workdir / "delta_new.csv", 50, seed=20, churn="No")
+    with pytest.raises(FileNotFoundError, match="missing.csv"):
+        train_incremental(delta, history)
+    assert not full_retrain
+
+def test_fallback_retrain_checks_history(workdir, full_retrain):
+    #--history innej długości niż dane ostatniego pełnego treningu z profilu
+    history = write_delta(workdir / "history.csv", HISTORY_ROWS // 2, seed=1)
+    delta = write_delta(workdir / "delta_new.csv", 50, seed=20, churn="No")
+    with pytest.raises(ValueError, match="--history"):
+        train_incremental(delta, history)
+    assert not full_retrain
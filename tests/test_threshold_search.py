@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from sklearn.metrics import precision_score, recall_score
+from src.model.threshold_search import best_threshold, threshold_curve
+
+# Wektorowa krzywa progów vs poprzednia pętla z train_model (osobne wywołania sklearn dla każdego progu).
+# Wyniki zaokrąglone do 2 miejsc: dużo remisów, także dokładnie na progach siatki.
+
+GRID = np.arange(0.1, 0.9, 0.01)
+
+def sklearn_loop(y_true, y_score, thresholds):
+    #Dawna pętla z train_model: precision/recall/F2 dla każdego progu osobno
+    precisions, recalls, f2_scores = [], [], []
+    for t in thresholds:
+        y_pred = (y_score >= t).astype(int)
+        rec = recall_score(y_true, y_pred, zero_division=0)
+        prec = precision_score(y_true, y_pred, zero_division=0)
+        precisions.append(prec)
+        recalls.append(rec)
+        f2_scores.append(0 if (4 * prec + rec) == 0 else (5 * prec * rec) / (4 * prec + rec))
+    return np.array(precisions), np.array(recalls), np.array(f2_scores)
+
+def random_case(seed: int, n: int = 500, decimals: int = 2):
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(0, 2, n)
+    # Wynik skorelowany z etykietą, zaokrąglony -> remisy
+    y_score = np.clip(rng.normal(0.35 + 0.3 * y_true, 0.2), 0, 1).round(decimals)
+    return y_true, y_score
+
+@pytest.mark.parametrize("seed", range(10))
+def test_grid_matches_sklearn_loop(seed):
+    y_true, y_score = random_case(seed)
+    precisions, recalls, f2_scores = sklearn_loop(y_true, y_score, GRID)
+    curve = threshold_curve(y_true, y_score, GRID)
+    np.testing.assert_allclose(curve["precision"], precisions, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(curve["recall"], recalls, rtol=0, atol=1e-12)
+
+    best = best_threshold(y_true, y_score, thresholds=GRID)
+    assert best["index"] == int(np.argmax(f2_scores))
+    assert best["threshold"] == GRID[np.argmax(f2_scores)]
+    assert best["fbeta"] == pytest.approx(f2_scores.max(), abs=1e-12)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_exact_cuts_match_sklearn_loop(seed):
+    y_true, y_score = random_case(seed, decimals=1)
+    curve = threshold_curve(y_true, y_score)
+    # Dokładne cięcia: każdy unikalny wynik, malejąco
+    expected_thresholds = np.unique(y_score)[::-1]
+    np.testing.assert_array_equal(curve["thresholds"], expected_thresholds)
+    precisions, recalls, _ = sklearn_loop(y_true, y_score, expected_thresholds)
+    np.testing.assert_allclose(curve["precision"], precisions, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(curve["recall"], recalls, rtol=0, atol=1e-12)
+
+def test_no_positive_predictions_or_labels():
+    #Próg ponad wszystkimi wynikami (precision = 0 jak zero_division=0) i brak pozytywnych etykiet (recall = 0)
+    y_score = np.array([0.2, 0.4, 0.4, 0.6])
+    for y_true in (np.array([0, 1, 1, 0]), np.zeros(4, dtype=int)):
+        precisions, recalls, _ = sklearn_loop(y_true, y_score, GRID)
+        curve = threshold_curve(y_true, y_score, GRID)
+        np.testing.assert_allclose(curve["precision"], precisions, rtol=0, atol=1e-12)
+        np.testing.assert_allclose(curve["recall"], recalls, rtol=0, atol=1e-12)
@@ -0,0 +1,38 @@
+import copy
+import pandas as pd
+import pytest
+from src.model import tune_model
+from src.model.tune_model import study_fingerprint
+
+# Odcisk study: zależy od danych i od definicji SEARCH_SPACE (a nie od tekstu kodu objective).
+
+FRAME = pd.DataFrame({"tenure": [1, 2, 3], "churn": [0, 1, 0]})
+
+def fingerprint() -> str:
+    #Macierz bez pliku źródłowego - odcisk z hasha samej macierzy
+    return study_fingerprint("brak-pliku.csv", FRAME)
+
+def test_fingerprint_stable():
+    assert fingerprint() == fingerprint()
+
+def test_fingerprint_changes_with_search_space(monkeypatch):
+    before = fingerprint()
+    space = copy.deepcopy(tune_model.SEARCH_SPACE)
+    space["max_depth"]["high"] = 12
+    monkeypatch.setattr(tune_model, "SEARCH_SPACE", space)
+    assert fingerprint() != before
+
+    space["max_depth"]["high"] = 10
+    space["learning_rate"]["log"] = True
+    assert fingerprint() != before
+
+def test_fingerprint_changes_with_data():
+    assert study_fingerprint("brak-pliku.csv", FRAME.assign(tenure=[1, 2, 4])) != fingerprint()
+
+def test_resumed_study_with_other_fingerprint_refused():
+    import optuna
+    study = optuna.create_study(study_name="fp")
+    tune_model._check_fingerprint(study, "abc", 0)
+    tune_model._check_fingerprint(study, "abc", 5)
+    with pytest.raises(ValueError, match="odcisk abc"):
+        tune_model._check_fingerprint(study, "def", 5)
@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+# Walidacja wartości numerycznych: tekst, który nie jest liczbą, jest odrzucany (API: 422, batch: plik *.rejected.*),
+# pusty tekst (nowy klient bez TotalCharges w danych Telco) - liczony jak dotąd jako 0.
+
+CUSTOMER = {
+    "gender": "Male", "seniorcitizen": 0, "partner": "No", "dependents": "No", "tenure": 12,
+    "phoneservice": "Yes", "multiplelines": "No", "internetservice": "DSL", "onlinesecurity": "No",
+    "onlinebackup": "No", "deviceprotection": "No", "techsupport": "No", "streamingtv": "No",
+    "streamingmovies": "No", "contract": "Month-to-month", "paperlessbilling": "Yes",
+    "paymentmethod": "Electronic check", "monthlycharges": 83.3, "totalcharges": "1000",
+}
+
+@pytest.fixture(scope="module")
+def model():
+    from src.serving.inference import ChurnModel
+    return ChurnModel()
+
+def raw_frame(totalcharges: list) -> pd.DataFrame:
+    #Surowe wiersze jak w CSV Telco (nazwy kolumn z pliku), różniące się tylko TotalCharges
+    names = {"seniorcitizen": "SeniorCitizen", "monthlycharges": "MonthlyCharges", "totalcharges": "TotalCharges"}
+    rows = [{"customerID": f"C{idx}", **{names.get(k, k): v for k, v in CUSTOMER.items()}, "TotalCharges": value}
+            for idx, value in enumerate(totalcharges)]
+    return pd.DataFrame(rows)
+
+def test_api_rejects_unparseable_number(client):
+    response = client.post("/predict", json={**CUSTOMER, "totalcharges": "abc"})
+    assert response.status_code == 422
+    assert "totalcharges: wartość nie jest liczbą" in response.text
+
+def test_api_accepts_blank_number(client):
+    response = client.post("/predict", json={**CUSTOMER, "totalcharges": " "})
+    assert response.status_code == 200
+    assert 0.0 <= response.json()["churn_probability"] <= 1.0
+
+def test_blank_number_scored_as_zero(model):
+    assert model.predict({**CUSTOMER, "totalcharges": ""}) == model.predict({**CUSTOMER, "totalcharges": "0"})
+
+def test_batch_rejects_unparseable_number(model):
+    from src.model.predict_model import score_chunk
+    results, rejects = score_chunk(model, raw_frame(["abc", " ", "1000"]))
+    assert results["customerID"].tolist() == ["C1", "C2"]
+    assert rejects["customerID"].tolist() == ["C0"]
+    assert "totalcharges: wartość nie jest liczbą" in rejects["reasons"][0]
+
+def test_batch_without_validation_scores_unparseable_as_zero(model):
+    from src.model.predict_model import score_chunk
+    results, rejects = score_chunk(model, raw_frame(["abc", "0"]), validate=False)
+    assert rejects is None
+    assert results["probability"][0] == results["probability"][1]